@@ -1,20 +1,48 @@
 """The Duolingo integration."""
+from __future__ import annotations
 
 import asyncio
 import logging
+from typing import TYPE_CHECKING
 
 import homeassistant.helpers.config_validation as cv
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_WEBHOOK_ID
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.setup import async_setup_component
 
-from .api import DuolingoApi
+from .api import USER_FIELDS
 from .const import (
-    DOMAIN, PLATFORMS,
+    CONF_DAILY_REQUEST_BUDGET,
+    CONF_FOLLOWED_BY,
+    CONF_MAX_CONCURRENT_FETCHES,
+    CONF_MEMBERS,
+    CONF_MODE,
+    CONF_TOP_N,
+    DATA_HUB,
+    DEFAULT_DAILY_REQUEST_BUDGET,
+    DEFAULT_MAX_CONCURRENT_FETCHES,
+    DEFAULT_TOP_N,
+    DOMAIN,
+    MODE_LEADERBOARD,
+    PLATFORMS,
+    SENSOR,
     STARTUP_MESSAGE,
 )
-from .coordinator import DuolingoDataUpdateCoordinator
-from .dto import UserDto, UserIdentifiersDto
+from .coordinator import (
+    DuolingoDataUpdateCoordinator,
+    history_store,
+    snapshot_store,
+)
+from .dto import UserIdentifiersDto
+from .hub import async_get_hub
+from .leaderboard import DuolingoLeaderboardCoordinator
+from .webhook import async_set_webhook
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+
+    from .hub import DuolingoHub
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
@@ -35,43 +63,138 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     _LOGGER.debug("Entry data: %s", entry.data)
 
+    if entry.data.get(CONF_MODE) == MODE_LEADERBOARD:
+        return await _async_setup_leaderboard(hass, entry)
+
     user_identifiers = UserIdentifiersDto.from_dict(dict(entry.data))
     _LOGGER.debug("Setting up integration with user id: %s",
                   user_identifiers.id)
 
-    api = DuolingoApi(
-        user_id=user_identifiers.id,
-        timezone=hass.config.time_zone
-    )
-
+    hub = async_get_hub(hass)
+    _async_apply_max_concurrent(hub, entry)
     coordinator = DuolingoDataUpdateCoordinator(
         hass=hass,
-        api=api,
+        hub=hub,
         identifiers=user_identifiers,
+        entry_id=entry.entry_id,
+        daily_budget=entry.options.get(
+            CONF_DAILY_REQUEST_BUDGET, DEFAULT_DAILY_REQUEST_BUDGET
+        ),
     )
 
-    await coordinator.async_refresh()
-
-    if not coordinator.last_update_success:
-        raise ConfigEntryNotReady
-
-    hass.data[DOMAIN][entry.entry_id] = coordinator
-
+    # Platforms decide which profile fields the first refresh requests
     platforms_to_setup = [
         platform for platform in PLATFORMS if entry.options.get(platform, True)
     ]
     coordinator.platforms.extend(platforms_to_setup)
 
+    await coordinator.async_fetch_translations()
+    await coordinator.async_restore_history()
+
+    if await coordinator.async_restore_snapshot():
+        # Set up the platforms from the snapshot right away and fetch
+        # fresh data in the background.
+        entry.async_create_background_task(
+            hass,
+            coordinator.async_refresh(),
+            f"{DOMAIN} refresh {entry.entry_id}",
+        )
+    else:
+        await coordinator.async_refresh()
+
+        if not coordinator.last_update_success:
+            hub.async_unregister(coordinator)
+            hub.async_set_max_concurrent(entry.entry_id, None)
+            raise ConfigEntryNotReady
+
+    hass.data[DOMAIN][entry.entry_id] = coordinator
+
     if platforms_to_setup:
         await hass.config_entries.async_forward_entry_setups(
             entry=entry,
             platforms=platforms_to_setup,
         )
 
-    entry.add_update_listener(async_reload_entry)
+    await _async_apply_webhook(hass, entry, coordinator)
+    entry.async_on_unload(coordinator.async_track_midnight())
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    return True
+
+
+async def _async_setup_leaderboard(
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+) -> bool:
+    """Set up a leaderboard entry."""
+    followed_by = entry.data.get(CONF_FOLLOWED_BY)
+    hub = async_get_hub(hass)
+    _async_apply_max_concurrent(hub, entry)
+    coordinator = DuolingoLeaderboardCoordinator(
+        hass=hass,
+        hub=hub,
+        title=entry.title,
+        members=[
+            UserIdentifiersDto.from_dict(member)
+            for member in entry.data.get(CONF_MEMBERS, [])
+        ],
+        followed_by=(
+            UserIdentifiersDto.from_dict(followed_by) if followed_by else None
+        ),
+        top_n=entry.options.get(CONF_TOP_N, DEFAULT_TOP_N),
+    )
+
+    await coordinator.async_fetch_translations()
+    await coordinator.async_refresh()
+    if not coordinator.last_update_success:
+        hub.async_unregister_leaderboard(coordinator)
+        hub.async_set_max_concurrent(entry.entry_id, None)
+        raise ConfigEntryNotReady
+
+    hass.data[DOMAIN][entry.entry_id] = coordinator
+    await hass.config_entries.async_forward_entry_setups(
+        entry=entry,
+        platforms=coordinator.platforms,
+    )
+
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
     return True
 
 
+@callback
+def _async_apply_max_concurrent(hub: DuolingoHub, entry: ConfigEntry) -> None:
+    """Pass the concurrency cap in the options of an entry to the hub."""
+    hub.async_set_max_concurrent(
+        entry.entry_id,
+        entry.options.get(
+            CONF_MAX_CONCURRENT_FETCHES, DEFAULT_MAX_CONCURRENT_FETCHES
+        ),
+    )
+
+
+async def _async_apply_webhook(
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        coordinator: DuolingoDataUpdateCoordinator,
+        *,
+        unload: bool = False,
+) -> None:
+    """Register or unregister the webhook of an entry as in its options.
+
+    The webhook integration is optional and set up on first use only.
+    """
+    webhook_id = None if unload else entry.options.get(CONF_WEBHOOK_ID)
+    if webhook_id == coordinator.webhook_id:
+        return
+
+    if webhook_id is not None and not await async_setup_component(
+            hass, "webhook", {}
+    ):
+        _LOGGER.error("Webhook integration unavailable, pushes are disabled")
+        return
+
+    async_set_webhook(hass, entry.title, webhook_id, coordinator)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     coordinator = hass.data[DOMAIN][entry.entry_id]
@@ -86,11 +209,71 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     )
     if unloaded:
         hass.data[DOMAIN].pop(entry.entry_id)
+        hub = hass.data[DOMAIN][DATA_HUB]
+        if entry.data.get(CONF_MODE) == MODE_LEADERBOARD:
+            hub.async_unregister_leaderboard(coordinator)
+        else:
+            await _async_apply_webhook(hass, entry, coordinator, unload=True)
+            hub.async_unregister(coordinator)
+        hub.async_set_max_concurrent(entry.entry_id, None)
+        if hub.is_empty:
+            hub.async_shutdown()
+            hass.data[DOMAIN].pop(DATA_HUB)
 
     return unloaded
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the snapshot and XP history of a deleted config entry."""
+    await snapshot_store(hass, entry.entry_id).async_remove()
+    await history_store(hass, entry.entry_id).async_remove()
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Reload config entry."""
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+    """Apply changed options in place.
+
+    Only the platforms enabled or disabled in the options are set up or
+    unloaded. The coordinator keeps its data and schedule and refreshes only
+    if a newly enabled platform needs profile fields not fetched so far.
+    """
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    _async_apply_max_concurrent(hass.data[DOMAIN][DATA_HUB], entry)
+    if entry.data.get(CONF_MODE) == MODE_LEADERBOARD:
+        coordinator.async_set_top_n(
+            entry.options.get(CONF_TOP_N, DEFAULT_TOP_N)
+        )
+        return
+
+    coordinator.scheduler.daily_budget = entry.options.get(
+        CONF_DAILY_REQUEST_BUDGET, DEFAULT_DAILY_REQUEST_BUDGET
+    )
+    await _async_apply_webhook(hass, entry, coordinator)
+
+    platforms = [
+        platform for platform in PLATFORMS if entry.options.get(platform, True)
+    ]
+    to_unload = [
+        platform for platform in coordinator.platforms
+        if platform not in platforms
+    ]
+    to_setup = [
+        platform for platform in platforms
+        if platform not in coordinator.platforms
+    ]
+    if not to_unload and not to_setup:
+        return
+
+    for platform in to_unload:
+        if await hass.config_entries.async_forward_entry_unload(
+                entry, platform
+        ):
+            coordinator.platforms.remove(platform)
+            if platform == SENSOR:
+                coordinator.async_untrack_courses()
+
+    fields = {USER_FIELDS[key] for key in coordinator.user_keys}
+    coordinator.platforms.extend(to_setup)
+    if to_setup:
+        await hass.config_entries.async_forward_entry_setups(entry, to_setup)
+    if not {USER_FIELDS[key] for key in coordinator.user_keys} <= fields:
+        await coordinator.async_request_refresh()
@@ -1,14 +1,67 @@
 """Duolingo API client."""
+import asyncio
+import hashlib
 import logging
-from datetime import datetime
+import time
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
 from zoneinfo import ZoneInfo
 
-import requests
+import aiohttp
+from aiohttp import hdrs
+from homeassistant.util.json import json_loads
 
+from .breaker import CircuitBreaker
+from .decoder import decode_profile
 from .dto import UserDto, UserIdentifiersDto
+from .metrics import (
+    BUILD_TIME,
+    DECODE_TIME,
+    REQUEST_LATENCY,
+    REQUESTS,
+    RESPONSE_SIZE,
+    RETRIES,
+    SHORT_CIRCUITED,
+    PollMetrics,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# Profile fields, in the endpoint's `fields=` syntax, read for each UserDto key
+USER_FIELDS: dict[str, str] = {
+    UserDto.ID_KEY: "id",
+    UserDto.NAME_KEY: "name",
+    UserDto.USERNAME_KEY: "username",
+    UserDto.TOTAL_XP_KEY: "totalXp",
+    UserDto.COURSES_XP_KEY: "courses{id,xp}",
+    UserDto.STREAK_TODAY_KEY: "streakData{currentStreak}",
+    UserDto.STREAK_LENGTH_KEY: "streakData{currentStreak}",
+}
+
+# Identity keys are needed by every platform for naming and the device
+IDENTITY_KEYS = (UserDto.ID_KEY, UserDto.NAME_KEY, UserDto.USERNAME_KEY)
+
+# Time after which fields the full document lacked are requested again, e.g.
+# streakData appearing with the first lesson of a day
+ABSENT_FIELDS_RECHECK = timedelta(hours=1)
+
+# Delta fields of pushed profiles, see pushed_user_to_dto
+XP_GAINED_FIELD = "xpGained"
+COURSE_ID_FIELD = "courseId"
+
+
+class DuolingoUnavailableError(Exception):
+    """Raised when the API is rate limiting or failing on its side."""
+
+    def __init__(self, status: int, retry_after: timedelta | None) -> None:
+        """Initialize."""
+        super().__init__(f"Duolingo API responded with {status}")
+        self.status = status
+        self.retry_after = retry_after
+
 
 class DuolingoApi:
     """Client for communicating with Duolingo API."""
@@ -20,18 +73,25 @@ class DuolingoApi:
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
             "AppleWebKit/537.36 (KHTML, like Gecko) "
             "Chrome/91.0.4472.124 Safari/537.36"
-        )
+        ),
+        "Accept": "application/json",
+        # No Accept-Encoding: aiohttp advertises the encodings it can
+        # decode, br only when the brotli package is installed.
     }
 
     @classmethod
-    def get_user_identifiers(cls, username: str) -> UserIdentifiersDto | None:
+    async def async_get_user_identifiers(
+            cls,
+            session: aiohttp.ClientSession,
+            username: str,
+            breaker: CircuitBreaker | None = None,
+    ) -> UserIdentifiersDto | None:
         """Get user ID from username."""
-        url = f"{cls.BASE_URL}/users?username={username}"
-
-        response = requests.get(url, headers=cls.HEADERS, timeout=cls.TIMEOUT)
-        response.raise_for_status()
+        url = f"{cls.BASE_URL}/users"
 
-        json_data = response.json()
+        json_data = await cls._async_get_json(
+            session, url, params={"username": username}, breaker=breaker
+        )
 
         users = json_data.get("users", [])
         if not users:
@@ -51,7 +111,12 @@ class DuolingoApi:
         if dto.id == 0:
             _LOGGER.error("User ID not found for username: %s", username)
             return None
-        if dto.name == "" or dto.username == "" or dto.username != username:
+        # Usernames ignore case, the profile has the registered spelling
+        if (
+                dto.name == ""
+                or dto.username == ""
+                or dto.username.casefold() != username.casefold()
+        ):
             _LOGGER.error(
                 "Incomplete or mismatched user data received for username: %s",
                 username
@@ -61,36 +126,315 @@ class DuolingoApi:
 
         return dto
 
-    def __init__(self, user_id: int, timezone: str) -> None:
+    @classmethod
+    async def async_get_followed_users(
+            cls,
+            session: aiohttp.ClientSession,
+            user_id: int,
+            breaker: CircuitBreaker | None = None,
+    ) -> list[UserIdentifiersDto]:
+        """Get the users a user follows."""
+        url = f"{cls.BASE_URL}/friends/users/{user_id}/following"
+
+        json_data = await cls._async_get_json(session, url, breaker=breaker)
+
+        return [
+            UserIdentifiersDto(
+                id=user.get("userId", 0),
+                name=user.get("displayName", ""),
+                username=user.get("username", ""),
+            )
+            for user in json_data.get("following", {}).get("users", [])
+            if user.get("userId")
+        ]
+
+    @classmethod
+    async def _async_get_json(
+            cls,
+            session: aiohttp.ClientSession,
+            url: str,
+            params: dict[str, str] | None = None,
+            breaker: CircuitBreaker | None = None,
+    ) -> dict:
+        """Perform a GET request on the shared session and decode JSON."""
+        _, _, body = await cls._async_get(session, url, params, breaker=breaker)
+        return json_loads(body)
+
+    @classmethod
+    async def _async_get(
+            cls,
+            session: aiohttp.ClientSession,
+            url: str,
+            params: dict[str, str] | None = None,
+            *,
+            headers: dict[str, str] | None = None,
+            breaker: CircuitBreaker | None = None,
+            metrics: PollMetrics | None = None,
+    ) -> tuple[int, Mapping[str, str], bytes]:
+        """Perform a GET request and return status, headers and raw body.
+
+        Rate limiting and server errors raise DuolingoUnavailableError. They
+        count as failures of the circuit breaker together with connection
+        errors and timeouts, while an open circuit refuses the request with
+        CircuitOpenError before anything is sent.
+        """
+        if breaker is not None:
+            breaker.before_request()
+        if metrics is not None:
+            metrics.increment(REQUESTS)
+        start = time.perf_counter()
+        try:
+            # asyncio.timeout is cancelled together with the calling task, so
+            # an unloaded entry never leaves a request hanging on the pool.
+            async with asyncio.timeout(cls.TIMEOUT):
+                async with session.get(
+                        url,
+                        params=params,
+                        headers={**cls.HEADERS, **(headers or {})},
+                ) as response:
+                    _raise_for_unavailable(response)
+                    response.raise_for_status()
+                    result = (
+                        response.status,
+                        response.headers,
+                        await response.read(),
+                    )
+        except aiohttp.ClientResponseError:
+            # Any other client error means the API itself is reachable
+            if breaker is not None:
+                breaker.record_success()
+            raise
+        except (DuolingoUnavailableError, aiohttp.ClientError, TimeoutError) as err:
+            if breaker is not None:
+                breaker.record_failure(getattr(err, "retry_after", None))
+            raise
+        except asyncio.CancelledError:
+            if breaker is not None:
+                breaker.record_cancelled()
+            raise
+        finally:
+            # Failed requests count too, a slow upstream often times out
+            if metrics is not None:
+                metrics.add(
+                    REQUEST_LATENCY, (time.perf_counter() - start) * 1000
+                )
+
+        if breaker is not None:
+            breaker.record_success()
+        if metrics is not None and result[0] != HTTPStatus.NOT_MODIFIED:
+            metrics.add(RESPONSE_SIZE, len(result[2]))
+        return result
+
+    def __init__(
+            self,
+            session: aiohttp.ClientSession,
+            user_id: int,
+            timezone: str,
+            breaker: CircuitBreaker | None = None,
+    ) -> None:
         """Duolingo API Client."""
+        self._session = session
+        self._breaker = breaker
         self._user_id = user_id
-        self._timezone = timezone
+        # Duolingo API returns dates in user's timezone, Home Assistant's
+        # configured one is used for it
+        self._timezone = ZoneInfo(timezone)
+        self._projection_supported = True
+        # Projected fields the full document lacks as well, and the
+        # monotonic time they were found missing; they are requested again
+        # after ABSENT_FIELDS_RECHECK
+        self._absent_fields: set[str] = set()
+        self._absent_since: float | None = None
+        self._responses: dict[str, _CachedResponse] = {}
+        self.metrics = PollMetrics()
 
-    def get_user_data(self) -> UserDto:
-        """Get data for the configured user."""
+    async def async_get_user_data(
+            self,
+            keys: Iterable[str] | None = None,
+    ) -> UserDto:
+        """Get data for the configured user.
+
+        When ``keys`` is given only the profile fields backing those UserDto
+        keys are requested. The full document is fetched instead if the
+        projected one lacks any of them.
+
+        The previous UserDto object itself is returned when the profile did
+        not change since the last poll.
+        """
         url = f"{self.BASE_URL}/users/{self._user_id}"
 
-        response = requests.get(url, headers=self.HEADERS, timeout=self.TIMEOUT)
-        response.raise_for_status()
+        today = datetime.now(self._timezone)
+        if (
+                self._absent_since is not None
+                and time.monotonic() - self._absent_since
+                >= ABSENT_FIELDS_RECHECK.total_seconds()
+        ):
+            self._absent_fields = set()
+            self._absent_since = None
+
+        fields = ""
+        if keys is not None and self._projection_supported:
+            projected = [
+                field for field in _user_fields(keys)
+                if field not in self._absent_fields
+            ]
+            fields = ",".join(projected)
+            user_data = await self._async_get_profile(url, fields, today)
+            if user_data is None:
+                return self._responses[fields].user
+
+            missing = _missing_fields(user_data, projected)
+            if missing:
+                _LOGGER.debug(
+                    "Projected profile of user %s lacks %s, "
+                    "falling back to the full document",
+                    self._user_id, missing,
+                )
+                fields = ""
+                self.metrics.increment(RETRIES)
+                user_data = await self._async_get_profile(url, fields, today)
+                if user_data is None:
+                    return self._responses[fields].user
+                # Keep projecting without the fields the full document lacks
+                # as well, they are simply absent for this user right now.
+                absent = _missing_fields(user_data, missing)
+                if len(absent) < len(missing):
+                    self._projection_supported = False
+                else:
+                    self._absent_fields.update(absent)
+                    self._absent_since = time.monotonic()
+        else:
+            user_data = await self._async_get_profile(url, fields, today)
+            if user_data is None:
+                return self._responses[fields].user
+
+        start = time.perf_counter()
+        user = _user_data_to_dto(user_data, today)
+        self.metrics.add(BUILD_TIME, (time.perf_counter() - start) * 1000)
+        self._responses[fields].user = user
+        return user
+
+    async def _async_get_profile(
+            self,
+            url: str,
+            fields: str,
+            today: datetime,
+    ) -> dict | None:
+        """Return the decoded profile, or None if it did not change.
+
+        Validators and a digest of the body are kept per projection and only
+        trusted on the day they were stored, as streak_today depends on it.
+        """
+        day = today.date().isoformat()
+        cached = self._responses.get(fields)
+        if cached is not None and (cached.day != day or cached.user is None):
+            cached = None
 
-        user_data = response.json()
+        headers = {}
+        if cached is not None and cached.etag:
+            headers[hdrs.IF_NONE_MATCH] = cached.etag
+        if cached is not None and cached.last_modified:
+            headers[hdrs.IF_MODIFIED_SINCE] = cached.last_modified
+
+        status, response_headers, body = await self._async_get(
+            self._session,
+            url,
+            params={"fields": fields} if fields else None,
+            headers=headers,
+            breaker=self._breaker,
+            metrics=self.metrics,
+        )
+
+        if status == HTTPStatus.NOT_MODIFIED and cached is not None:
+            return self._short_circuit("not modified")
+
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        if cached is not None and digest == cached.digest:
+            return self._short_circuit("same content")
+
+        # Only the parts read into a UserDto are decoded
+        start = time.perf_counter()
+        user_data = decode_profile(body)
+        self.metrics.add(DECODE_TIME, (time.perf_counter() - start) * 1000)
         if user_data is None:
             msg = f"Failed to retrieve data for user: {self._user_id}"
             raise ValueError(msg)
 
-        # Use Home Assistant's configured timezone
-        # Duolingo API returns dates in user's timezone
-        tz = ZoneInfo(self._timezone)
-        today = datetime.now(tz)
+        self._responses[fields] = _CachedResponse(
+            day=day,
+            etag=response_headers.get(hdrs.ETAG),
+            last_modified=response_headers.get(hdrs.LAST_MODIFIED),
+            digest=digest,
+        )
+        return user_data
+
+    def _short_circuit(self, reason: str) -> None:
+        """Count a poll that returned the unchanged profile."""
+        self.metrics.increment(SHORT_CIRCUITED)
+        _LOGGER.debug(
+            "Profile of user %s unchanged (%s), %d polls short-circuited",
+            self._user_id, reason, self.metrics.counters[SHORT_CIRCUITED],
+        )
+
+
+@dataclass(slots=True)
+class _CachedResponse:
+    """Validators and digest of the last profile response for a query."""
+
+    day: str
+    etag: str | None
+    last_modified: str | None
+    digest: bytes
+    user: UserDto | None = None
+
+
+def _raise_for_unavailable(response: aiohttp.ClientResponse) -> None:
+    """Raise DuolingoUnavailableError if the API is rate limiting or failing."""
+    if (
+            response.status == HTTPStatus.TOO_MANY_REQUESTS
+            or response.status >= HTTPStatus.INTERNAL_SERVER_ERROR
+    ):
+        raise DuolingoUnavailableError(
+            response.status,
+            _retry_after(response.headers.get(hdrs.RETRY_AFTER)),
+        )
+
+
+def _retry_after(value: str | None) -> timedelta | None:
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    if value.isdigit():
+        return timedelta(seconds=int(value))
+    try:
+        at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=UTC)
+    return max(at - datetime.now(UTC), timedelta())
+
+
+def _user_fields(keys: Iterable[str]) -> list[str]:
+    """Return the sorted profile fields needed for the given UserDto keys."""
+    return sorted({USER_FIELDS[key] for key in (*IDENTITY_KEYS, *keys)})
 
-        return _user_data_to_dto(user_data, today)
+
+def _missing_fields(data: dict | None, fields: Iterable[str]) -> list[str]:
+    """Return the fields whose top-level key is absent from ``data``."""
+    if data is None:
+        return list(fields)
+    return [
+        field for field in fields
+        if field.split("{", 1)[0] not in data
+    ]
 
 
 def _user_data_to_dto(data: dict, today: datetime) -> UserDto:
     current_streak = data.get("streakData", {}).get("currentStreak")
     if current_streak:
         streak_today = (
-                today.strftime("%Y-%m-%d") == current_streak.get("endDate", "")
+                today.date().isoformat() == current_streak.get("endDate", "")
         )
         streak_length = current_streak.get("length", 0)
     else:
@@ -112,3 +456,64 @@ def _user_data_to_dto(data: dict, today: datetime) -> UserDto:
     )
 
     return dto
+
+
+def pushed_user_to_dto(
+        data: dict,
+        current: UserDto,
+        today: datetime,
+) -> UserDto:
+    """Build a UserDto from a pushed profile, applied to the current user.
+
+    Profile fields absent from data keep their current values, down to the
+    keys of the current streak; a currentStreak of None ends the streak.
+    Pushed courses are merged by id into the current ones, so a partial list
+    does not drop the others; dropped courses are only noticed by polls.
+    XP_GAINED_FIELD adds XP to the total and to the course COURSE_ID_FIELD,
+    and extends the streak today. The current user itself is returned if
+    nothing changed.
+    """
+    day = today.date().isoformat()
+    courses = dict(current.courses_xp)
+    courses.update(
+        (course["id"], course["xp"]) for course in data.get("courses", ())
+    )
+    profile = {
+        "id": current.id,
+        "name": current.name,
+        "username": current.username,
+        "totalXp": current.total_xp,
+    }
+    profile.update(
+        (field, value) for field, value in data.items() if field in profile
+    )
+    streak = {
+        "length": current.streak_length,
+        "endDate": day if current.streak_today else "",
+    }
+    pushed_streak = data.get("streakData", {})
+    if "currentStreak" in pushed_streak:
+        pushed = pushed_streak["currentStreak"]
+        streak = None if pushed is None else {**streak, **pushed}
+    profile["streakData"] = {"currentStreak": streak}
+
+    xp_gained = data.get(XP_GAINED_FIELD, 0)
+    if xp_gained:
+        profile["totalXp"] += xp_gained
+        course_id = data.get(COURSE_ID_FIELD)
+        if course_id:
+            courses[course_id] = courses.get(course_id, 0) + xp_gained
+        streak = profile["streakData"].get("currentStreak") or {}
+        if streak.get("endDate") != day:
+            profile["streakData"] = {
+                "currentStreak": {
+                    "length": streak.get("length", 0) + 1,
+                    "endDate": day,
+                },
+            }
+
+    profile["courses"] = [
+        {"id": course_id, "xp": xp} for course_id, xp in courses.items()
+    ]
+    user = _user_data_to_dto(profile, today)
+    return current if user == current else user
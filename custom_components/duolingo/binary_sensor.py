@@ -1,22 +1,63 @@
 """Support for a Duolingo data sensor."""
 import logging
+from collections.abc import Callable
+from dataclasses import dataclass
 
-from homeassistant.components.binary_sensor import BinarySensorEntity
+from homeassistant.components.binary_sensor import (
+    BinarySensorEntity,
+    BinarySensorEntityDescription,
+)
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import ATTR_ATTRIBUTION
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from . import DuolingoDataUpdateCoordinator
 from .const import (
-    DOMAIN, ATTR_DUO_DATA_PROVIDER, ATTR_DUO_STREAK_TODAY,
+    ATTR_DUO_DATA_PROVIDER,
     ATTR_DUO_STREAK_LENGTH,
+    ATTR_DUO_STREAK_TODAY,
+    DOMAIN,
 )
-from .entity import DuolingoEntity
+from .coordinator import DuolingoDataUpdateCoordinator
+from .dto import UserDto
+from .entity import NAME_KEYS, DuolingoEntity, DuolingoEntityDescription
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def streak_attributes(user: UserDto) -> dict[str, object]:
+    """Return the attributes of the streak of a user."""
+    return {
+        ATTR_ATTRIBUTION: ATTR_DUO_DATA_PROVIDER,
+        ATTR_DUO_STREAK_TODAY: user.streak_today,
+        ATTR_DUO_STREAK_LENGTH: user.streak_length,
+    }
+
+
+@dataclass(frozen=True, kw_only=True)
+class DuolingoBinarySensorEntityDescription(
+    DuolingoEntityDescription, BinarySensorEntityDescription
+):
+    """Describes a binary sensor of a Duolingo user."""
+
+    value_fn: Callable[[DuolingoDataUpdateCoordinator], bool]
+
+
+BINARY_SENSORS: tuple[DuolingoBinarySensorEntityDescription, ...] = (
+    DuolingoBinarySensorEntityDescription(
+        key="streak_today",
+        name_key="streak_today",
+        icon="mdi:fire",
+        user_keys=NAME_KEYS | {
+            UserDto.STREAK_TODAY_KEY,
+            UserDto.STREAK_LENGTH_KEY,
+        },
+        value_fn=lambda coordinator: coordinator.user.streak_today,
+        attributes_fn=streak_attributes,
+    ),
+)
+
+
 async def async_setup_entry(
         hass: HomeAssistant,
         entry: ConfigEntry,
@@ -30,39 +71,18 @@ async def async_setup_entry(
         )
         return
 
-    async_add_devices([DuolingoStreakTodaySensor(coordinator, entry)])
-
+    async_add_devices([
+        DuolingoBinarySensor(coordinator, entry, description)
+        for description in BINARY_SENSORS
+    ])
 
-class DuolingoStreakTodaySensor(DuolingoEntity, BinarySensorEntity):
-    """Implementation of the Duolingo binary sensor."""
 
-    @property
-    def name(self) -> str:
-        """Return the name of the binary_sensor."""
-        return self.translation_sensors("streak_today", {
-            "name": self.user.name,
-        })
+class DuolingoBinarySensor(DuolingoEntity, BinarySensorEntity):
+    """Binary sensor of a Duolingo user, as described by its description."""
 
-    @property
-    def unique_id(self) -> str:
-        """Return a unique ID to use for this entity."""
-        return f"{super().unique_id}_streak_today"
+    entity_description: DuolingoBinarySensorEntityDescription
 
     @property
     def is_on(self) -> bool:
         """Return true if the binary sensor is on."""
-        return self.user.streak_today
-
-    @property
-    def icon(self) -> str:
-        """Return the icon to use in the frontend."""
-        return "mdi:fire"
-
-    @property
-    def extra_state_attributes(self) -> dict[str, object]:
-        """Return the state attributes."""
-        return {
-            ATTR_ATTRIBUTION: ATTR_DUO_DATA_PROVIDER,
-            ATTR_DUO_STREAK_TODAY: self.user.streak_today,
-            ATTR_DUO_STREAK_LENGTH: self.user.streak_length,
-        }
+        return self.entity_description.value_fn(self.coordinator)
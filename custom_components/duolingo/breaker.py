@@ -0,0 +1,149 @@
+"""Circuit breaker and backoff for requests to the Duolingo API."""
+import logging
+import random
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from enum import StrEnum
+
+_LOGGER = logging.getLogger(__name__)
+
+# Backoff of a failing entry: base delay doubled per attempt up to the cap
+BACKOFF_BASE = timedelta(minutes=1)
+BACKOFF_MAX = timedelta(hours=2)
+
+
+def backoff_delay(
+        attempt: int,
+        retry_after: timedelta | None = None,
+) -> timedelta:
+    """Return the delay before retry ``attempt`` (1-based).
+
+    The exponential delay is jittered to between half and all of its value
+    so that entries failing together do not retry together, and is never
+    shorter than a Retry-After requested by the server.
+    """
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(attempt - 1, 0))
+    delay *= random.uniform(0.5, 1.0)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class CircuitState(StrEnum):
+    """State of the circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is refused because the circuit is open."""
+
+    def __init__(self, retry_after: timedelta) -> None:
+        """Initialize."""
+        super().__init__(f"Circuit open, retry in {retry_after}")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Refuse requests locally while the Duolingo API is failing.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests are refused until the cooldown passed. The circuit then lets
+    one probe request through: its success closes the circuit, its failure
+    opens it again for twice the previous cooldown. A response with
+    Retry-After opens the circuit at once for exactly that long.
+    """
+
+    def __init__(
+            self,
+            failure_threshold: int = 3,
+            cooldown: timedelta = timedelta(minutes=5),
+            max_cooldown: timedelta = timedelta(hours=2),
+    ) -> None:
+        """Initialize."""
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failures = 0
+        self.open_until: datetime | None = None
+        self._trips = 0
+        self._probing = False
+        self._listeners: list[Callable[[], None]] = []
+
+    @property
+    def state(self) -> CircuitState:
+        """Return the current state."""
+        if self.open_until is None:
+            return CircuitState.CLOSED
+        if datetime.now(UTC) < self.open_until:
+            return CircuitState.OPEN
+        return CircuitState.HALF_OPEN
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call listener on changes, return a function removing it."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def before_request(self) -> None:
+        """Raise CircuitOpenError if a request may not be made now."""
+        state = self.state
+        if state is CircuitState.CLOSED:
+            return
+        if state is CircuitState.HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        raise CircuitOpenError(
+            max(self.open_until - datetime.now(UTC), timedelta())
+            if state is CircuitState.OPEN
+            else timedelta()
+        )
+
+    def record_success(self) -> None:
+        """Record a request that reached a healthy API."""
+        if not self.failures and self.open_until is None:
+            return
+
+        if self.open_until is not None:
+            _LOGGER.info("Duolingo API recovered, circuit closed")
+        self.failures = 0
+        self._trips = 0
+        self._probing = False
+        self.open_until = None
+        self._notify()
+
+    def record_failure(self, retry_after: timedelta | None = None) -> None:
+        """Record a failed request and open the circuit if needed."""
+        self.failures += 1
+        probe_failed = self._probing
+        self._probing = False
+        if (
+                not probe_failed
+                and retry_after is None
+                and self.failures < self.failure_threshold
+        ):
+            self._notify()
+            return
+
+        self._trips += 1
+        if retry_after is not None:
+            cooldown = retry_after
+        else:
+            cooldown = min(
+                self.max_cooldown, self.cooldown * 2 ** (self._trips - 1)
+            )
+        self.open_until = datetime.now(UTC) + cooldown
+        _LOGGER.warning(
+            "Duolingo API failing, circuit open for %s", cooldown
+        )
+        self._notify()
+
+    def record_cancelled(self) -> None:
+        """Release the probe slot of a request that was cancelled."""
+        self._probing = False
+
+    def _notify(self) -> None:
+        """Call the state listeners."""
+        for listener in list(self._listeners):
+            listener()
@@ -1,19 +1,47 @@
 # ruff: noqa: BLE001
 
 """Adds config flow for Duolingo."""
+import asyncio
 import logging
+import re
 
 import voluptuous as vol
 from homeassistant import config_entries
-from homeassistant.const import CONF_USERNAME
+from homeassistant.components import webhook
+from homeassistant.const import CONF_NAME, CONF_USERNAME, CONF_WEBHOOK_ID
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 
-from .api import DuolingoApi
-from .const import DOMAIN
+from .const import (
+    CONF_DAILY_REQUEST_BUDGET,
+    CONF_FOLLOWED_BY,
+    CONF_MAX_CONCURRENT_FETCHES,
+    CONF_MEMBERS,
+    CONF_MODE,
+    CONF_TOP_N,
+    CONF_WEBHOOK,
+    DEFAULT_DAILY_REQUEST_BUDGET,
+    DEFAULT_MAX_CONCURRENT_FETCHES,
+    DEFAULT_TOP_N,
+    DOMAIN,
+    MODE_ACCOUNT,
+    MODE_LEADERBOARD,
+    PLATFORMS,
+)
 from .dto import UserIdentifiersDto
+from .hub import async_get_hub
+from .webhook import webhook_url
 
 _LOGGER = logging.getLogger(__name__)
 
+# Members of a leaderboard are separated by commas, semicolons or spaces
+_MEMBER_SEPARATOR = re.compile(r"[\s,;]+")
+
+TOP_N_SCHEMA = vol.All(vol.Coerce(int), vol.Range(min=1, max=50))
+MAX_CONCURRENT_FETCHES_SCHEMA = vol.All(
+    vol.Coerce(int), vol.Range(min=1, max=32)
+)
+
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Config flow for Duolingo."""
@@ -24,11 +52,30 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     def __init__(self):
         """Initialize."""
         self._errors = {}
+        self._resolve_tasks: set[asyncio.Task[UserIdentifiersDto | None]] = set()
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+            config_entry: config_entries.ConfigEntry,  # noqa: ARG004 - HA API
+    ) -> "OptionsFlowHandler":
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler()
 
     async def async_step_user(
-            self, user_input: dict[str, object] | None = None
+            self,
+            user_input: dict[str, object] | None = None,  # noqa: ARG002 - HA API
     ) -> FlowResult:
         """Handle a flow initialized by the user."""
+        return self.async_show_menu(
+            step_id="user",
+            menu_options=[MODE_ACCOUNT, MODE_LEADERBOARD],
+        )
+
+    async def async_step_account(
+            self, user_input: dict[str, object] | None = None
+    ) -> FlowResult:
+        """Handle the username of an account to observe."""
         self._errors = {}
 
         if user_input is not None:
@@ -70,7 +117,7 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     ) -> FlowResult:
         """Show the configuration form to edit location data."""
         return self.async_show_form(
-            step_id="user",
+            step_id="account",
             data_schema=vol.Schema(
                 {
                     vol.Required(
@@ -82,16 +129,111 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors=self._errors,
         )
 
+    async def async_step_leaderboard(
+            self, user_input: dict[str, object] | None = None
+    ) -> FlowResult:
+        """Handle the members of a leaderboard."""
+        errors = {}
+        placeholders = {}
+        if user_input is not None:
+            tokens = [
+                token for token in _MEMBER_SEPARATOR.split(
+                    str(user_input.get(CONF_MEMBERS, ""))
+                )
+                if token
+            ]
+            followed_by_name = str(user_input.get(CONF_FOLLOWED_BY, "")).strip()
+            if not tokens and not followed_by_name:
+                errors["base"] = "no_members"
+            else:
+                members, unknown = await self._resolve_members(tokens)
+                followed_by = None
+                if followed_by_name:
+                    followed_by = await self._get_user_identifiers(
+                        followed_by_name
+                    )
+                    if followed_by is None:
+                        unknown.append(followed_by_name)
+                if not unknown:
+                    return self.async_create_entry(
+                        title=str(user_input[CONF_NAME]),
+                        data={
+                            CONF_MODE: MODE_LEADERBOARD,
+                            CONF_MEMBERS: [member.to_dict for member in members],
+                            CONF_FOLLOWED_BY: (
+                                followed_by.to_dict if followed_by else None
+                            ),
+                        },
+                        options={CONF_TOP_N: user_input[CONF_TOP_N]},
+                    )
+                errors["base"] = "members_not_found"
+                placeholders["usernames"] = ", ".join(unknown)
+
+        user_input = user_input or {}
+        return self.async_show_form(
+            step_id="leaderboard",
+            data_schema=vol.Schema({
+                vol.Required(
+                    CONF_NAME, default=user_input.get(CONF_NAME, "")
+                ): str,
+                vol.Optional(
+                    CONF_MEMBERS, default=user_input.get(CONF_MEMBERS, "")
+                ): str,
+                vol.Optional(
+                    CONF_FOLLOWED_BY,
+                    default=user_input.get(CONF_FOLLOWED_BY, ""),
+                ): str,
+                vol.Required(
+                    CONF_TOP_N,
+                    default=user_input.get(CONF_TOP_N, DEFAULT_TOP_N),
+                ): TOP_N_SCHEMA,
+            }),
+            errors=errors,
+            description_placeholders=placeholders,
+        )
+
+    async def _resolve_members(
+            self,
+            tokens: list[str],
+    ) -> tuple[list[UserIdentifiersDto], list[str]]:
+        """Return the members given by id or username and unknown usernames.
+
+        Tokens of digits only are user ids, the others are resolved in
+        parallel.
+        """
+        usernames = [token for token in tokens if not token.isdigit()]
+        resolved = await asyncio.gather(
+            *(self._get_user_identifiers(username) for username in usernames)
+        )
+        members = {
+            int(token): UserIdentifiersDto(int(token), "", "")
+            for token in tokens if token.isdigit()
+        }
+        unknown = []
+        for username, identifiers in zip(usernames, resolved, strict=True):
+            if identifiers is None:
+                unknown.append(username)
+            else:
+                members[identifiers.id] = identifiers
+        return list(members.values()), unknown
+
+    @callback
+    def async_remove(self) -> None:
+        """Cancel the username lookups of an aborted flow."""
+        for task in self._resolve_tasks:
+            task.cancel()
+
     async def _get_user_identifiers(
             self,
             username: str
     ) -> UserIdentifiersDto | None:
-        """Get user ID from username."""
+        """Get user ID from username, through the cache of the hub."""
+        task = self.hass.async_create_task(
+            async_get_hub(self.hass).resolver.async_resolve(username)
+        )
+        self._resolve_tasks.add(task)
         try:
-            dto = await self.hass.async_add_executor_job(
-                DuolingoApi.get_user_identifiers, username
-            )
-            return dto
+            return await task
 
         except Exception as exception:
             _LOGGER.exception(
@@ -99,3 +241,98 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 username, exception,
             )
             return None
+
+        finally:
+            self._resolve_tasks.discard(task)
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Options flow for Duolingo."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._options: dict[str, object] = {}
+
+    async def async_step_init(
+            self, user_input: dict[str, object] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        if self.config_entry.data.get(CONF_MODE) == MODE_LEADERBOARD:
+            return await self.async_step_leaderboard(user_input)
+        options = self.config_entry.options
+        if user_input is not None:
+            self._options = dict(user_input)
+            if not self._options.pop(CONF_WEBHOOK):
+                return self.async_create_entry(title="", data=self._options)
+            # Keep the URL of a webhook enabled before
+            self._options[CONF_WEBHOOK_ID] = (
+                options.get(CONF_WEBHOOK_ID) or webhook.async_generate_id()
+            )
+            return await self.async_step_webhook()
+
+        schema = {
+            vol.Required(platform, default=options.get(platform, True)): bool
+            for platform in PLATFORMS
+        }
+        schema[
+            vol.Required(
+                CONF_DAILY_REQUEST_BUDGET,
+                default=options.get(
+                    CONF_DAILY_REQUEST_BUDGET, DEFAULT_DAILY_REQUEST_BUDGET
+                ),
+            )
+        ] = vol.All(vol.Coerce(int), vol.Range(min=0))
+        schema[
+            vol.Required(
+                CONF_MAX_CONCURRENT_FETCHES,
+                default=options.get(
+                    CONF_MAX_CONCURRENT_FETCHES, DEFAULT_MAX_CONCURRENT_FETCHES
+                ),
+            )
+        ] = MAX_CONCURRENT_FETCHES_SCHEMA
+        schema[
+            vol.Required(CONF_WEBHOOK, default=CONF_WEBHOOK_ID in options)
+        ] = bool
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(schema),
+        )
+
+    async def async_step_webhook(
+            self, user_input: dict[str, object] | None = None
+    ) -> FlowResult:
+        """Show the URL profiles are pushed to."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=self._options)
+
+        return self.async_show_form(
+            step_id="webhook",
+            description_placeholders={
+                "url": webhook_url(self.hass, self._options[CONF_WEBHOOK_ID]),
+            },
+        )
+
+    async def async_step_leaderboard(
+            self, user_input: dict[str, object] | None = None
+    ) -> FlowResult:
+        """Manage the options of a leaderboard."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="leaderboard",
+            data_schema=vol.Schema({
+                vol.Required(
+                    CONF_TOP_N,
+                    default=options.get(CONF_TOP_N, DEFAULT_TOP_N),
+                ): TOP_N_SCHEMA,
+                vol.Required(
+                    CONF_MAX_CONCURRENT_FETCHES,
+                    default=options.get(
+                        CONF_MAX_CONCURRENT_FETCHES, DEFAULT_MAX_CONCURRENT_FETCHES
+                    ),
+                ): MAX_CONCURRENT_FETCHES_SCHEMA,
+            }),
+        )
@@ -12,6 +12,30 @@ BINARY_SENSOR = "binary_sensor"
 SENSOR = "sensor"
 PLATFORMS = [BINARY_SENSOR, SENSOR]
 
+# Options
+CONF_DAILY_REQUEST_BUDGET = "daily_request_budget"
+DEFAULT_DAILY_REQUEST_BUDGET = 0  # Unlimited
+CONF_TOP_N = "top_n"
+DEFAULT_TOP_N = 5
+# Maximum number of user fetches the hub runs at the same time, the lowest
+# value of all entries applies
+CONF_MAX_CONCURRENT_FETCHES = "max_concurrent_fetches"
+DEFAULT_MAX_CONCURRENT_FETCHES = 4
+# Accept profiles pushed through a webhook, its id is kept in the options
+CONF_WEBHOOK = "webhook"
+
+# Entry modes, entries without a mode observe a single account
+CONF_MODE = "mode"
+MODE_ACCOUNT = "account"
+MODE_LEADERBOARD = "leaderboard"
+
+# Leaderboard entry data
+CONF_MEMBERS = "members"
+CONF_FOLLOWED_BY = "followed_by"
+
+# Keys in hass.data[DOMAIN] besides config entry ids
+DATA_HUB = "hub"
+
 # Attribution - extra_state_attributes
 ATTR_DUO_DATA_PROVIDER = "Data provided by Duolingo"
 ATTR_DUO_STREAK_LENGTH = "Streak length days"
@@ -19,6 +43,11 @@ ATTR_DUO_STREAK_TODAY = "Streak extended today"
 ATTR_DUO_NAME = "Name"
 ATTR_DUO_USERNAME = "Username"
 ATTR_DUO_COURSE_ID = "Course ID"
+ATTR_DUO_CIRCUIT_FAILURES = "Consecutive failures"
+ATTR_DUO_CIRCUIT_OPEN_UNTIL = "Open until"
+ATTR_DUO_SNAPSHOT_TIME = "Restored from snapshot taken at"
+ATTR_DUO_RANKING = "Ranking"
+ATTR_DUO_MEMBERS = "Members"
 
 STARTUP_MESSAGE = f"""
 -------------------------------------------------------------------
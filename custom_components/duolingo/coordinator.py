@@ -1,62 +1,468 @@
+"""Coordinator fetching the data of a Duolingo user."""
 import logging
-from datetime import timedelta
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+from types import MappingProxyType
 
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.translation import async_get_translations
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
     UpdateFailed,
 )
+from homeassistant.util import dt as dt_util
 
-from .api import DuolingoApi
-from .const import DOMAIN
+from .breaker import CircuitOpenError, backoff_delay
+from .const import ATTR_DUO_SNAPSHOT_TIME, BINARY_SENSOR, DOMAIN, SENSOR
 from .dto import UserDto, UserIdentifiersDto
+from .history import XpHistory
+from .hub import DuolingoHub
+from .metrics import RETRIES, UPDATE_TIME
+from .scheduler import DEFAULT_INTERVAL, PollScheduler, next_midnight
+from .translations import DuolingoTranslations
 
-SCAN_INTERVAL = timedelta(minutes=20)
+SCAN_INTERVAL = DEFAULT_INTERVAL
+
+# Change key of entities whose names depend on the translations
+TRANSLATIONS_KEY = "translations"
+# Change key of entities whose state depends on the local date
+DAY_KEY = "day"
+
+# Snapshot of the last fetched user, restored on startup
+STORAGE_VERSION = 1
+SNAPSHOT_SAVE_DELAY = 10
+SNAPSHOT_USER = "user"
+SNAPSHOT_FETCHED_AT = "fetched_at"
+# XP history, saved less often as it grows over time
+HISTORY_SAVE_DELAY = 60
+
+# UserDto keys read by the entities of each platform
+PLATFORM_USER_KEYS: dict[str, tuple[str, ...]] = {
+    BINARY_SENSOR: (
+        UserDto.STREAK_TODAY_KEY,
+        UserDto.STREAK_LENGTH_KEY,
+    ),
+    SENSOR: (
+        UserDto.STREAK_LENGTH_KEY,
+        UserDto.TOTAL_XP_KEY,
+        UserDto.COURSES_XP_KEY,
+    ),
+}
 
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
 
-class DuolingoDataUpdateCoordinator(DataUpdateCoordinator):
-    """Class to manage fetching data from the API."""
+def snapshot_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store holding the snapshot of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+
+
+def history_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the store holding the XP history of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.history")
+
+
+class AttributeSnapshots:
+    """Read-only state attributes of the entities of an entry.
+
+    A mapping is built once per builder and arguments, e.g. a course id,
+    and shared by every entity asking for it until the data version
+    changes, that is the user object or the time of restored data.
+    """
+
+    def __init__(self, coordinator: "DuolingoDataUpdateCoordinator") -> None:
+        """Initialize."""
+        self._coordinator = coordinator
+        self._user: UserDto | None = None
+        self._snapshot_time: datetime | None = None
+        self._snapshots: dict[tuple, Mapping[str, object]] = {}
+
+    def get(
+            self,
+            build: Callable[..., dict[str, object]],
+            *args: object,
+    ) -> Mapping[str, object]:
+        """Return the attributes build returns for the user and args."""
+        coordinator = self._coordinator
+        if (
+                coordinator.data is not self._user
+                or coordinator.snapshot_time != self._snapshot_time
+        ):
+            self._user = coordinator.data
+            self._snapshot_time = coordinator.snapshot_time
+            self._snapshots = {}
+
+        key = (build, *args)
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            attributes = build(self._user, *args)
+            if self._snapshot_time is not None:
+                attributes[ATTR_DUO_SNAPSHOT_TIME] = self._snapshot_time
+            snapshot = self._snapshots[key] = MappingProxyType(attributes)
+        return snapshot
+
+
+class DuolingoDataUpdateCoordinator(DataUpdateCoordinator[UserDto]):
+    """Class to manage fetching data from the API.
+
+    The UserDto fetched last is the data of the coordinator itself.
+    """
 
     def __init__(
             self,
             hass: HomeAssistant,
-            api: DuolingoApi,
+            hub: DuolingoHub,
             identifiers: UserIdentifiersDto,
+            entry_id: str,
+            daily_budget: int = 0,
     ) -> None:
         """Initialize."""
-        self.api = api
+        self.hub = hub
         self.identifiers = identifiers
-        self.user = UserDto.from_dict({})
+        self._store = snapshot_store(hass, entry_id)
+        # Time the restored data was fetched, None once fresh data arrived
+        self.snapshot_time: datetime | None = None
+        self._history_store = history_store(hass, entry_id)
+        self.history = XpHistory()
+        self.scheduler = PollScheduler(daily_budget)
+        # Consecutive failed updates, polls back off while there are any
+        self.failures = 0
         self.platforms = []
-        self.translations = {}
+        self.translations = DuolingoTranslations()
+        # UserDto keys changed by the last update, None when all entities
+        # have to write their state
+        self.changed_keys: set[str] | None = None
+        # Courses having entities, and the callback adding those of new ones
+        self.course_ids: set[str] = set()
+        self._add_courses: Callable[[list[str]], None] | None = None
+        self.attribute_snapshots = AttributeSnapshots(self)
+        # Local day whose streak_today the data holds, and the timer
+        # starting the next one
+        self._day: date | None = None
+        self._unsub_midnight: CALLBACK_TYPE | None = None
+        # Webhook receiving pushed profiles, None while pushes are disabled
+        self.webhook_id: str | None = None
 
         super().__init__(
             hass=hass,
             logger=_LOGGER,
             name=DOMAIN,
             update_interval=SCAN_INTERVAL,
+            # Listeners are only notified when the data actually changed
+            always_update=False,
+        )
+        self.data = UserDto.from_dict({})
+
+        # Offset the first scheduled poll so that entries registered at the
+        # same time spread their requests over the whole interval.
+        self._phase = SCAN_INTERVAL * hub.async_register(self)
+        # Shared with the other entries of the same user, like the API client
+        self.metrics = hub.api(identifiers.id).metrics
+
+    @property
+    def user(self) -> UserDto:
+        """Return the current user."""
+        return self.data
+
+    @property
+    def user_keys(self) -> set[str]:
+        """Return the UserDto keys needed by the enabled platforms."""
+        return {
+            key
+            for platform in self.platforms
+            for key in PLATFORM_USER_KEYS.get(platform, ())
+        }
+
+    async def async_restore_snapshot(self) -> bool:
+        """Restore the last saved user, return False if there is none."""
+        snapshot = await self._store.async_load()
+        if not snapshot:
+            return False
+
+        user = UserDto.from_dict(snapshot[SNAPSHOT_USER])
+        fetched_at = dt_util.parse_datetime(snapshot[SNAPSHOT_FETCHED_AT])
+        if fetched_at is None or user.id != self.identifiers.id:
+            return False
+
+        if dt_util.as_local(fetched_at).date() != dt_util.now().date():
+            # The streak has not been extended yet on a new day
+            user = replace(user, streak_today=False)
+
+        self.snapshot_time = fetched_at
+        self.data = user
+        self._day = dt_util.now().date()
+        # Entities have to drop the snapshot time on the first fresh data,
+        # even if it equals the restored one. Reset once they were updated.
+        self.always_update = True
+        return True
+
+    async def async_restore_history(self) -> None:
+        """Restore the XP history saved by earlier runs."""
+        data = await self._history_store.async_load()
+        if data:
+            self.history = XpHistory.from_dict(data)
+
+    @callback
+    def _async_record_history(self, user: UserDto) -> None:
+        """Record the XP of a fetched user and save the history if needed."""
+        if self.history.record(dt_util.now(), user.total_xp, user.courses_xp):
+            self._history_store.async_delay_save(
+                self.history.as_dict, HISTORY_SAVE_DELAY
+            )
+
+    @callback
+    def _async_save_snapshot(self, user: UserDto) -> None:
+        """Save a fetched user to be restored on the next start."""
+        fetched_at = dt_util.utcnow().isoformat()
+        self._store.async_delay_save(
+            lambda: {
+                SNAPSHOT_USER: user.to_dict,
+                SNAPSHOT_FETCHED_AT: fetched_at,
+            },
+            SNAPSHOT_SAVE_DELAY,
         )
 
-    async def _async_update_data(self) -> dict[str, object]:
-        """Update data via library."""
+    @callback
+    def _clear_snapshot(self) -> None:
+        """Forget the restored snapshot once fresh data arrived."""
+        if self.snapshot_time is not None:
+            self.snapshot_time = None
+            self.changed_keys = None
+
+    async def _async_update_data(self) -> UserDto:
+        """Update data via library, timing the whole update."""
+        start = time.perf_counter()
         try:
-            await self.async_fetch_translations()
-            self.user = await self.hass.async_add_executor_job(
-                self.api.get_user_data,
+            return await self._async_fetch_user()
+        finally:
+            self.metrics.add(UPDATE_TIME, (time.perf_counter() - start) * 1000)
+            self.metrics.notify()
+
+    async def _async_fetch_user(self) -> UserDto:
+        """Fetch the user and schedule the next poll."""
+        day = dt_util.now().date()
+        user = self.hub.fresh_user(self)
+        if user is not None:
+            # Forced refresh right after a fetch, nothing to poll
+            _LOGGER.debug(
+                "User %s was fetched just now, not polling again",
+                self.identifiers.id,
             )
-            return self.user.to_dict
+        else:
+            user = await self._async_poll()
 
+        user = self._roll_over(user, day)
+        self._async_save_snapshot(user)
+        self._async_record_history(user)
+        self._schedule_next_poll(user)
+        if user is self.user:
+            # Unchanged profile, keep the current data as is
+            return user
+
+        self._track_changes(user)
+        self._clear_snapshot()
+        return user
+
+    async def _async_poll(self) -> UserDto:
+        """Fetch the user through the hub and count the poll.
+
+        Only a request this entry started counts against its budget, not
+        one of another entry it joined.
+        """
+        if self.failures:
+            self.metrics.increment(RETRIES)
+        requested = not self.hub.is_fetching(self.identifiers.id)
+        try:
+            user = await self.hub.async_fetch(self)
         except Exception as exception:
+            now = dt_util.now()
+            if requested and not isinstance(exception, CircuitOpenError):
+                self.scheduler.record_poll(now)
+            self.changed_keys = None
+            self.failures += 1
+            # Back off, but not below the schedule, e.g. in quiet hours or
+            # with the budget spent
+            self.update_interval = max(
+                backoff_delay(
+                    self.failures, getattr(exception, "retry_after", None)
+                ),
+                self.scheduler.next_interval(
+                    now, streak_today=self.user.streak_today
+                ),
+            )
             raise UpdateFailed(exception) from exception
 
-    async def async_fetch_translations(self) -> None:
-        """Fetch translations."""
-        self.translations = await async_get_translations(
-            self.hass,
-            self.hass.config.language,
-            "common",
-            [DOMAIN],
+        self.failures = 0
+        now = dt_util.now()
+        if requested:
+            self.scheduler.record_poll(now)
+        self.scheduler.record_xp(now, user.total_xp)
+        return user
+
+    def _schedule_next_poll(self, user: UserDto) -> None:
+        """Set the interval until the next poll of a user from the scheduler."""
+        self.update_interval = self.scheduler.next_interval(
+            dt_util.now(), streak_today=user.streak_today
+        ) + self._phase
+        self._phase = timedelta()
+
+    @callback
+    def async_set_user(self, user: UserDto) -> None:
+        """Receive a user fetched on behalf of another entry."""
+        if user is self.user:
+            return
+
+        # Fetched for another entry, so not counted against the budget
+        self.failures = 0
+        self.scheduler.record_xp(dt_util.now(), user.total_xp)
+        self._async_set_received_user(
+            self._roll_over(user, dt_util.now().date())
         )
+
+    @callback
+    def async_push_user(self, user: UserDto) -> None:
+        """Receive a user pushed through the webhook.
+
+        The next poll is postponed even if the user did not change, polls
+        only serve as a safety net while pushes keep arriving.
+        """
+        self.scheduler.record_push(dt_util.now())
+        self._async_set_received_user(
+            self._roll_over(user, dt_util.now().date())
+        )
+
+    @callback
+    def _async_set_received_user(self, user: UserDto) -> None:
+        """Set a user received without polling and schedule the next poll."""
+        self._track_changes(user)
+        self._clear_snapshot()
+        self._async_save_snapshot(user)
+        self._async_record_history(user)
+        self._schedule_next_poll(user)
+        self.async_set_updated_data(user)
+
+    def _roll_over(self, user: UserDto, day: date | None) -> UserDto:
+        """Return user as of today, given the local day it was fetched on.
+
+        A streak extended on an earlier day is not extended today, e.g. for
+        a poll that started before midnight and ended after it.
+        """
+        today = dt_util.now().date()
+        self._day = today
+        if user.streak_today and day != today:
+            return replace(user, streak_today=False)
+        return user
+
+    @callback
+    def async_track_midnight(self) -> CALLBACK_TYPE:
+        """Start a new day at every local midnight, without polling.
+
+        Returns a function that stops tracking.
+        """
+        self._async_schedule_midnight()
+
+        @callback
+        def async_stop() -> None:
+            if self._unsub_midnight is not None:
+                self._unsub_midnight()
+                self._unsub_midnight = None
+
+        return async_stop
+
+    @callback
+    def _async_schedule_midnight(self) -> None:
+        """Schedule the timer at the next local midnight.
+
+        The time zone is looked up on every schedule, so a changed time
+        zone of Home Assistant applies from the next day on.
+        """
+        self._unsub_midnight = async_track_point_in_time(
+            self.hass, self._async_midnight, next_midnight(dt_util.now())
+        )
+
+    @callback
+    def _async_midnight(self, _now: datetime) -> None:
+        """Expire the streak of the previous day and the daily values."""
+        self._async_schedule_midnight()
+        user = self._roll_over(self.user, self._day)
+        self.changed_keys = {DAY_KEY}
+        if user is not self.user:
+            # The next poll is scheduled already, only the data changes
+            self.data = user
+            self.changed_keys.add(UserDto.STREAK_TODAY_KEY)
+        self.async_update_listeners()
+
+    def _track_changes(self, user: UserDto) -> None:
+        """Record which keys a new user changes compared to the current one."""
+        # After a failed update every entity has to become available again
+        if self.last_update_success:
+            self.changed_keys = user.changed_keys(self.user)
+        else:
+            self.changed_keys = None
+
+    @callback
+    def async_track_courses(
+            self,
+            add_courses: Callable[[list[str]], None],
+    ) -> CALLBACK_TYPE:
+        """Call add_courses with the current and every new course id.
+
+        Returns a function that stops tracking.
+        """
+        self.course_ids = set()
+        self._add_courses = add_courses
+        self._async_add_new_courses()
+
+        @callback
+        def async_stop() -> None:
+            if self._add_courses is add_courses:
+                self.async_untrack_courses()
+
+        return async_stop
+
+    @callback
+    def async_untrack_courses(self) -> None:
+        """Stop adding the entities of new courses."""
+        self._add_courses = None
+        self.course_ids = set()
+
+    @callback
+    def _async_add_new_courses(self) -> None:
+        """Pass the courses without entities yet to the course callback."""
+        if self._add_courses is None:
+            return
+        new_courses = [
+            course_id
+            for course_id in self.data.courses_xp
+            if course_id not in self.course_ids
+        ]
+        if new_courses:
+            self.course_ids.update(new_courses)
+            self._add_courses(new_courses)
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Add the entities of new courses, then update all listeners."""
+        self._async_add_new_courses()
+        super().async_update_listeners()
+        if self.snapshot_time is None:
+            # The entities dropped the snapshot time, from now on they are
+            # only updated when the data changed.
+            self.always_update = False
+
+    async def async_fetch_translations(self) -> None:
+        """Fetch translations from the cache shared by all entries."""
+        self.translations = await self.hub.async_get_translations()
+
+    @callback
+    def async_set_translations(
+            self,
+            translations: DuolingoTranslations,
+    ) -> None:
+        """Replace translations and refresh the entity names only."""
+        self.translations = translations
+        self.changed_keys = {TRANSLATIONS_KEY}
+        self.async_update_listeners()
@@ -0,0 +1,46 @@
+"""Decoders for Duolingo profile documents."""
+from collections.abc import Mapping
+
+from homeassistant.util.json import json_loads
+
+# Parts of the profile read into a UserDto. None keeps a value fully, a
+# dict picks keys of an object and a one item list applies its spec to
+# every item of an array. Everything else is dropped.
+PROFILE_SPEC: Mapping[str, object] = {
+    "id": None,
+    "name": None,
+    "username": None,
+    "totalXp": None,
+    "streakData": {"currentStreak": None},
+    "courses": [{"id": None, "xp": None}],
+}
+
+
+def decode_profile(
+        body: bytes,
+        spec: Mapping[str, object] = PROFILE_SPEC,
+) -> dict | None:
+    """Decode the parts of a profile document described by spec.
+
+    The document is decoded in full by the C decoder and projected, so only
+    the parts described by spec outlive the call.
+
+    Returns None if the document is not an object.
+    """
+    data = json_loads(body)
+    if not isinstance(data, dict):
+        return None
+    return project(data, spec)
+
+
+def project(value: object, spec: object) -> object:
+    """Return the parts of a fully decoded value described by spec."""
+    if isinstance(spec, Mapping) and isinstance(value, dict):
+        return {
+            key: project(item, spec[key])
+            for key, item in value.items()
+            if key in spec
+        }
+    if isinstance(spec, list) and isinstance(value, list):
+        return [project(item, spec[0]) for item in value]
+    return value
@@ -0,0 +1,67 @@
+"""Diagnostics support for Duolingo."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_WEBHOOK_ID
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .dto import UserDto
+from .leaderboard import DuolingoLeaderboardCoordinator
+
+# The user id, names and the entry title built from them identify the user,
+# anyone knowing the webhook id can push profiles
+TO_REDACT = {
+    UserDto.ID_KEY,
+    UserDto.NAME_KEY,
+    UserDto.USERNAME_KEY,
+    CONF_WEBHOOK_ID,
+    "title",
+    "unique_id",
+}
+
+
+async def async_get_config_entry_diagnostics(
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+) -> dict[str, object]:
+    """Return the state and poll metrics of a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    if isinstance(coordinator, DuolingoLeaderboardCoordinator):
+        return _leaderboard_diagnostics(entry, coordinator)
+
+    breaker = coordinator.hub.breaker
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "user": async_redact_data(coordinator.user.to_dict, TO_REDACT),
+        "platforms": coordinator.platforms,
+        "last_update_success": coordinator.last_update_success,
+        "failures": coordinator.failures,
+        "update_interval": str(coordinator.update_interval),
+        "snapshot_time": coordinator.snapshot_time,
+        "polls_today": coordinator.scheduler.polls_today,
+        "last_push": coordinator.scheduler.last_push,
+        "circuit_breaker": {
+            "state": breaker.state.value,
+            "failures": breaker.failures,
+            "open_until": breaker.open_until,
+        },
+        "metrics": coordinator.metrics.as_dict(),
+    }
+
+
+def _leaderboard_diagnostics(
+        entry: ConfigEntry,
+        coordinator: DuolingoLeaderboardCoordinator,
+) -> dict[str, object]:
+    """Return the state of a leaderboard entry, without its members."""
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "members": len(coordinator.members),
+        "metrics": {
+            metric: len(ranking)
+            for metric, ranking in coordinator.data.rankings.items()
+        },
+        "top_n": coordinator.top_n,
+        "last_update_success": coordinator.last_update_success,
+        "update_interval": str(coordinator.update_interval),
+    }
@@ -1,7 +1,10 @@
-from dataclasses import dataclass
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass, field, fields
+from types import MappingProxyType
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class UserIdentifiersDto:
     id: int
     name: str
@@ -35,13 +38,15 @@ class UserIdentifiersDto:
         return f"{self.id} ({self.name})"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class UserDto:
     id: int
     name: str
     username: str
     total_xp: int
-    courses_xp: dict[str, int]
+    # Read-only view of a dict whose course ids are interned, so that every
+    # entry tracking the same courses shares the id strings.
+    courses_xp: Mapping[str, int] = field(hash=False)
     streak_today: bool
     streak_length: int
 
@@ -53,6 +58,14 @@ class UserDto:
     STREAK_TODAY_KEY = "streak_today"
     STREAK_LENGTH_KEY = "streak_length"
 
+    def __post_init__(self) -> None:
+        """Freeze courses_xp into a read-only mapping."""
+        if not isinstance(self.courses_xp, MappingProxyType):
+            object.__setattr__(self, "courses_xp", MappingProxyType({
+                sys.intern(course_id): xp
+                for course_id, xp in self.courses_xp.items()
+            }))
+
     @classmethod
     def from_dict(cls, data: dict) -> "UserDto":
         """Create UserDto from dictionary."""
@@ -68,13 +81,41 @@ class UserDto:
 
     @property
     def to_dict(self) -> dict:
-        """Convert UserDto to a dictionary."""
+        """Convert UserDto to a dictionary, e.g. to store it as JSON."""
         return {
             UserDto.ID_KEY: self.id,
             UserDto.NAME_KEY: self.name,
             UserDto.USERNAME_KEY: self.username,
             UserDto.TOTAL_XP_KEY: self.total_xp,
-            UserDto.COURSES_XP_KEY: self.courses_xp,
+            UserDto.COURSES_XP_KEY: dict(self.courses_xp),
             UserDto.STREAK_TODAY_KEY: self.streak_today,
             UserDto.STREAK_LENGTH_KEY: self.streak_length,
         }
+
+    @staticmethod
+    def course_key(course_id: str) -> str:
+        """Return the change key of a single course."""
+        return f"{UserDto.COURSES_XP_KEY}/{course_id}"
+
+    def changed_keys(self, previous: "UserDto") -> set[str]:
+        """Return the keys whose value differs from a previous UserDto.
+
+        A changed course is reported both as ``courses_xp`` and by its
+        ``course_key``.
+        """
+        changed = {
+            key for key in _USER_KEYS
+            if getattr(self, key) != getattr(previous, key)
+        }
+        if UserDto.COURSES_XP_KEY in changed:
+            changed.update(
+                UserDto.course_key(course_id)
+                for course_id in self.courses_xp.keys() | previous.courses_xp.keys()
+                if self.courses_xp.get(course_id)
+                != previous.courses_xp.get(course_id)
+            )
+        return changed
+
+
+# UserDto keys, each named like the field holding its value
+_USER_KEYS = tuple(user_field.name for user_field in fields(UserDto))
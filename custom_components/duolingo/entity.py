@@ -1,60 +1,144 @@
 """DuolingoEntity class."""
 import logging
-import re
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
 
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import ATTR_ATTRIBUTION
+from homeassistant.core import callback
 from homeassistant.helpers.device_registry import (
     DeviceEntryType,
     DeviceInfo,
 )
+from homeassistant.helpers.entity import EntityDescription
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
 )
 from propcache import cached_property
 
-from . import DuolingoDataUpdateCoordinator, UserIdentifiersDto
 from .const import (
-    NAME,
+    ATTR_DUO_COURSE_ID,
+    ATTR_DUO_DATA_PROVIDER,
+    ATTR_DUO_NAME,
+    ATTR_DUO_USERNAME,
     DOMAIN,
+    NAME,
     VERSION,
 )
-from .dto import UserDto
+from .coordinator import TRANSLATIONS_KEY, DuolingoDataUpdateCoordinator
+from .dto import UserDto, UserIdentifiersDto
+from .leaderboard import DuolingoLeaderboardCoordinator
 
 _LOGGER = logging.getLogger(__name__)
 
+# Keys the entity names are built from
+NAME_KEYS = frozenset({UserDto.NAME_KEY, TRANSLATIONS_KEY})
+# Keys of the names and of user_attributes
+USER_KEYS = NAME_KEYS | {UserDto.USERNAME_KEY}
+
+_UNSET = object()
+
+
+def user_attributes(user: UserDto) -> dict[str, object]:
+    """Return the attributes of the entities of a user."""
+    return {
+        ATTR_ATTRIBUTION: ATTR_DUO_DATA_PROVIDER,
+        ATTR_DUO_USERNAME: user.username,
+    }
+
+
+def course_attributes(user: UserDto, course_id: str) -> dict[str, object]:
+    """Return the attributes of the entities of a course."""
+    return {
+        ATTR_ATTRIBUTION: ATTR_DUO_DATA_PROVIDER,
+        ATTR_DUO_NAME: user.name,
+        ATTR_DUO_USERNAME: user.username,
+        ATTR_DUO_COURSE_ID: course_id,
+    }
+
+
+@dataclass(frozen=True, kw_only=True)
+class DuolingoEntityDescription(EntityDescription):
+    """Describes an entity of a Duolingo user.
+
+    The key is the suffix of the unique id.
+    """
+
+    # Alias of the name template in the common sensors translations
+    name_key: str
+    # UserDto and change keys the state, name and attributes are built
+    # from, the state is only written when one of them changes.
+    user_keys: frozenset[str] = NAME_KEYS
+    # Builds the attributes from the user, and the course id for course
+    # entities. They are shared by the entities of an entry.
+    attributes_fn: Callable[..., dict[str, object]] | None = None
+
 
 class DuolingoEntity(CoordinatorEntity):
     """Base entity for Duolingo integration."""
 
+    entity_description: DuolingoEntityDescription
+
+    _cached_name: object = _UNSET
+
     def __init__(
             self,
             coordinator: DuolingoDataUpdateCoordinator,
             config_entry: ConfigEntry,
+            description: DuolingoEntityDescription,
     ) -> None:
         """Initialize the entity."""
         super().__init__(coordinator)
         self.coordinator = coordinator
         self.config_entry = config_entry
-        _LOGGER.debug("Setup new entry: %s", config_entry)
+        self.entity_description = description
+        self.user_keys = description.user_keys
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only if the update changed one of the user keys."""
+        changed_keys = self.coordinator.changed_keys
+        if changed_keys is None or not changed_keys.isdisjoint(NAME_KEYS):
+            self._cached_name = _UNSET
+        if changed_keys is None or not changed_keys.isdisjoint(self.user_keys):
+            self.async_write_ha_state()
+
+    @property
+    def available(self) -> bool:
+        """Return True while updates succeed or restored data is shown."""
+        return (
+            self.coordinator.last_update_success
+            or self.coordinator.snapshot_time is not None
+        )
+
+    @property
+    def extra_state_attributes(self) -> Mapping[str, object] | None:
+        """Return the attributes shared with the entities of the entry."""
+        build = self.entity_description.attributes_fn
+        if build is None:
+            return None
+        return self.coordinator.attribute_snapshots.get(build)
+
+    @property
+    def name(self) -> str | None:
+        """Return the name, built once per user name and language."""
+        if self._cached_name is _UNSET:
+            self._cached_name = self.build_name()
+        return self._cached_name
+
+    def build_name(self) -> str | None:
+        """Build the name of the entity."""
+        return self.translation_sensors(self.entity_description.name_key, {
+            "name": self.user.name,
+        })
 
     def translation_sensors(
             self,
             alias: str,
             data: dict[str, str]
     ) -> str | None:
-        """Return the translated string for course id."""
-        full_key = f"component.{DOMAIN}.common.sensors.{alias}"
-        t_string = self.coordinator.translations.get(full_key)
-        if not t_string:
-            _LOGGER.warning("Translation missing for key: %s", full_key)
-            return None
-
-        for key, value in data.items():
-            pattern = r"\{" + re.escape(key) + r"\}"
-            t_string = re.sub(pattern, str(value), t_string)
-
-        _LOGGER.debug("Translated string for %s: %s", alias, t_string)
-        return t_string
+        """Return the translated sensor name for alias."""
+        return self.coordinator.translations.sensor_name(alias, data)
 
     @property
     def identifiers(self) -> UserIdentifiersDto:
@@ -69,7 +153,7 @@ class DuolingoEntity(CoordinatorEntity):
     @cached_property
     def unique_id(self) -> str:
         """Return a unique ID to use for this entity."""
-        return f"{DOMAIN}_{self.identifiers.id}"
+        return f"{DOMAIN}_{self.identifiers.id}_{self.entity_description.key}"
 
     @cached_property
     def suggested_object_id(self) -> str:
@@ -86,3 +170,74 @@ class DuolingoEntity(CoordinatorEntity):
             manufacturer=NAME,
             entry_type=DeviceEntryType.SERVICE,
         )
+
+
+class DuolingoLeaderboardEntity(CoordinatorEntity):
+    """Base entity of a leaderboard, showing the ranking of one metric."""
+
+    _cached_name: object = _UNSET
+
+    def __init__(
+            self,
+            coordinator: DuolingoLeaderboardCoordinator,
+            config_entry: ConfigEntry,
+            metric: str,
+    ) -> None:
+        """Initialize the entity."""
+        super().__init__(coordinator)
+        self.coordinator = coordinator
+        self.config_entry = config_entry
+        self.metric = metric
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write state only if the update changed the ranking of the metric."""
+        changed = self.coordinator.changed_metrics
+        if changed is None or TRANSLATIONS_KEY in changed:
+            self._cached_name = _UNSET
+        if (
+                changed is None
+                or self.metric in changed
+                or TRANSLATIONS_KEY in changed
+        ):
+            self.async_write_ha_state()
+
+    @property
+    def name(self) -> str | None:
+        """Return the name, built once per language."""
+        if self._cached_name is _UNSET:
+            self._cached_name = self.build_name()
+        return self._cached_name
+
+    def build_name(self) -> str | None:
+        """Build the name of the entity."""
+        return None
+
+    def translation_sensors(
+            self,
+            alias: str,
+            data: dict[str, str]
+    ) -> str | None:
+        """Return the translated sensor name for alias."""
+        return self.coordinator.translations.sensor_name(alias, data)
+
+    @cached_property
+    def unique_id(self) -> str:
+        """Return a unique ID to use for this entity."""
+        return f"{DOMAIN}_leaderboard_{self.config_entry.entry_id}_{self.metric}"
+
+    @cached_property
+    def suggested_object_id(self) -> str:
+        """Return a unique ID to use for this entity."""
+        return self.unique_id
+
+    @cached_property
+    def device_info(self) -> DeviceInfo:
+        """Return device information about this entity."""
+        return DeviceInfo(
+            name=f"Duo {self.coordinator.title} Leaderboard",
+            identifiers={(DOMAIN, f"leaderboard_{self.config_entry.entry_id}")},
+            model=f"Leaderboard Observer {VERSION}",
+            manufacturer=NAME,
+            entry_type=DeviceEntryType.SERVICE,
+        )
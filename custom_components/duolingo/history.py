@@ -0,0 +1,221 @@
+"""Compact XP history of a Duolingo user."""
+from array import array
+from collections.abc import Mapping
+from datetime import date, datetime, timedelta
+
+# Samples are kept for this long, the last older one remains as an anchor
+HISTORY_RETENTION = timedelta(days=31)
+# Samples older than this are downsampled to the last one of each bucket
+HISTORY_FULL_RESOLUTION = timedelta(days=2)
+HISTORY_BUCKET = timedelta(hours=1)
+
+# Window of the rolling XP rate
+RATE_WINDOW = timedelta(hours=24)
+
+# Series key of the total XP, the other series are keyed by course id
+TOTAL_SERIES = "total"
+
+_SERIES = "series"
+_DAY = "day"
+_DAY_START = "day_start"
+_WEEK = "week"
+_WEEK_START = "week_start"
+
+
+class XpSeries:
+    """Append-only XP values of one series, as a step function of time.
+
+    A sample is only appended when the value changed, timestamps are epoch
+    seconds. The start of the rate window moves forward with time, so the
+    rate is computed without searching the samples again.
+    """
+
+    __slots__ = ("_window_start", "times", "values")
+
+    def __init__(
+            self,
+            times: array | None = None,
+            values: array | None = None,
+    ) -> None:
+        """Initialize."""
+        self.times = times if times is not None else array("q")
+        self.values = values if values is not None else array("q")
+        self._window_start = 0
+
+    @property
+    def latest(self) -> int | None:
+        """Return the latest value."""
+        return self.values[-1] if self.values else None
+
+    def append(self, timestamp: int, value: int) -> bool:
+        """Append a sample, return False if the value did not change."""
+        if self.values and self.values[-1] == value:
+            return False
+        self.times.append(timestamp)
+        self.values.append(value)
+        return True
+
+    def rate(self, timestamp: int, window: int) -> float:
+        """Return the XP gained per hour in the window ending at timestamp."""
+        if not self.values:
+            return 0.0
+        start = timestamp - window
+        times = self.times
+        index = self._window_start
+        while index + 1 < len(times) and times[index + 1] <= start:
+            index += 1
+        self._window_start = index
+        return (self.values[-1] - self.values[index]) * 3600 / window
+
+    def compact(self, now: int) -> None:
+        """Downsample old samples and evict the expired ones."""
+        evict_before = now - int(HISTORY_RETENTION.total_seconds())
+        downsample_before = now - int(HISTORY_FULL_RESOLUTION.total_seconds())
+        bucket = int(HISTORY_BUCKET.total_seconds())
+
+        times, values = array("q"), array("q")
+        count = len(self.times)
+        for index, (timestamp, value) in enumerate(
+                zip(self.times, self.values, strict=True)
+        ):
+            following = self.times[index + 1] if index + 1 < count else None
+            if following is not None and following <= evict_before:
+                # A later sample is the anchor of the expired range
+                continue
+            if (
+                    following is not None
+                    and following < downsample_before
+                    and following // bucket == timestamp // bucket
+            ):
+                # Not the last sample of its bucket
+                continue
+            times.append(timestamp)
+            values.append(value)
+
+        self.times, self.values = times, values
+        self._window_start = 0
+
+    def as_list(self) -> list[list[int]]:
+        """Return the samples as JSON serializable lists."""
+        return [self.times.tolist(), self.values.tolist()]
+
+    @classmethod
+    def from_list(cls, data: list[list[int]]) -> "XpSeries":
+        """Create a series from as_list output."""
+        times, values = data
+        return cls(array("q", times), array("q", values))
+
+
+class XpHistory:
+    """XP history of a user with the derived daily, weekly and rate values.
+
+    The XP at the start of the local day and week are kept when the first
+    sample of a new day is recorded, so XP today and this week are a single
+    subtraction.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.series: dict[str, XpSeries] = {}
+        self._day: date | None = None
+        self._day_start = 0
+        self._week: date | None = None
+        self._week_start = 0
+
+    def record(
+            self,
+            now: datetime,
+            total_xp: int,
+            courses_xp: Mapping[str, int],
+    ) -> bool:
+        """Record the XP of a refresh, return True if anything was stored.
+
+        ``now`` has to be aware and in the local time zone of the user.
+        """
+        timestamp = int(now.timestamp())
+        changed = False
+
+        day = now.date()
+        if day != self._day:
+            # The latest total is the XP at the start of the new day
+            total = self.series.get(TOTAL_SERIES)
+            start = total.latest if total is not None else total_xp
+            self._day, self._day_start = day, start
+            week = day - timedelta(days=day.weekday())
+            if week != self._week:
+                self._week, self._week_start = week, start
+            self._compact(timestamp, courses_xp)
+            changed = True
+
+        for key, value in ((TOTAL_SERIES, total_xp), *courses_xp.items()):
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = XpSeries()
+            changed |= series.append(timestamp, value)
+
+        return changed
+
+    def _compact(self, timestamp: int, courses_xp: Mapping[str, int]) -> None:
+        """Compact every series and drop those of long dropped courses."""
+        evict_before = timestamp - int(HISTORY_RETENTION.total_seconds())
+        for key, series in list(self.series.items()):
+            if (
+                    key != TOTAL_SERIES
+                    and key not in courses_xp
+                    and series.times[-1] < evict_before
+            ):
+                del self.series[key]
+            else:
+                series.compact(timestamp)
+
+    def xp_today(self, now: datetime) -> int:
+        """Return the XP earned on the local day of now."""
+        total = self.series.get(TOTAL_SERIES)
+        if total is None or self._day != now.date():
+            return 0
+        return total.latest - self._day_start
+
+    def xp_this_week(self, now: datetime) -> int:
+        """Return the XP earned in the local week of now, from Monday."""
+        total = self.series.get(TOTAL_SERIES)
+        week = now.date() - timedelta(days=now.weekday())
+        if total is None or self._week != week:
+            return 0
+        return total.latest - self._week_start
+
+    def rate(self, key: str, now: datetime) -> float:
+        """Return the XP per hour of a series over the rolling window."""
+        series = self.series.get(key)
+        if series is None:
+            return 0.0
+        return series.rate(
+            int(now.timestamp()), int(RATE_WINDOW.total_seconds())
+        )
+
+    def as_dict(self) -> dict[str, object]:
+        """Return the history as a JSON serializable dictionary."""
+        return {
+            _SERIES: {
+                key: series.as_list() for key, series in self.series.items()
+            },
+            _DAY: self._day.isoformat() if self._day else None,
+            _DAY_START: self._day_start,
+            _WEEK: self._week.isoformat() if self._week else None,
+            _WEEK_START: self._week_start,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, object]) -> "XpHistory":
+        """Create a history from as_dict output."""
+        history = cls()
+        history.series = {
+            key: XpSeries.from_list(samples)
+            for key, samples in data.get(_SERIES, {}).items()
+        }
+        if data.get(_DAY):
+            history._day = date.fromisoformat(data[_DAY])
+            history._day_start = data.get(_DAY_START, 0)
+        if data.get(_WEEK):
+            history._week = date.fromisoformat(data[_WEEK])
+            history._week_start = data.get(_WEEK_START, 0)
+        return history
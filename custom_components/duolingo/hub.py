@@ -0,0 +1,337 @@
+"""Hub sharing Duolingo fetches between all config entries."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from functools import partial
+from typing import TYPE_CHECKING
+
+from homeassistant.const import EVENT_CORE_CONFIG_UPDATE
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.translation import async_get_translations
+from homeassistant.util import dt as dt_util
+
+from .api import DuolingoApi
+from .breaker import CircuitBreaker
+from .const import DATA_HUB, DEFAULT_MAX_CONCURRENT_FETCHES, DOMAIN
+from .resolver import UsernameResolver
+from .translations import DuolingoTranslations
+
+if TYPE_CHECKING:
+    from datetime import date
+
+    from .coordinator import DuolingoDataUpdateCoordinator
+    from .dto import UserDto, UserIdentifiersDto
+    from .leaderboard import DuolingoLeaderboardCoordinator
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+# Fractional part of the golden ratio, spreads any number of phases evenly.
+_PHASE_STEP = 0.6180339887498949
+
+# Age up to which a fetched user is returned instead of fetching it again
+FRESHNESS_WINDOW = timedelta(seconds=30)
+
+
+@callback
+def async_get_hub(hass: HomeAssistant) -> DuolingoHub:
+    """Return the hub stored in hass.data, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    hub = domain_data.get(DATA_HUB)
+    if hub is None:
+        hub = domain_data[DATA_HUB] = DuolingoHub(hass)
+    return hub
+
+
+class DuolingoHub:
+    """Fetch user data for every registered coordinator.
+
+    Fetches run concurrently but never more than the lowest cap set by the
+    config entries at a time. Coordinators tracking the same user id share
+    one API client and one in-flight request, and a fetched result is fanned
+    out to all of them. A user fetched less than FRESHNESS_WINDOW ago is not
+    fetched again, so refreshes forced right after a poll stay local.
+
+    The hub also caches the translations of the configured language for
+    all entries and reloads them when the language changes, and owns the
+    circuit breaker shared by every request to the API and the username
+    resolver of the config flow.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self.hass = hass
+        self._session = async_get_clientsession(hass)
+        self.max_concurrent = DEFAULT_MAX_CONCURRENT_FETCHES
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        # Concurrency cap of every entry setting one
+        self._max_concurrent: dict[str, int] = {}
+        self.breaker = CircuitBreaker()
+        self._apis: dict[int, DuolingoApi] = {}
+        self._coordinators: dict[int, list[DuolingoDataUpdateCoordinator]] = {}
+        self._leaderboards: set[DuolingoLeaderboardCoordinator] = set()
+        self._inflight: dict[int, asyncio.Task[UserDto]] = {}
+        self._waiters: dict[int, set[DuolingoDataUpdateCoordinator]] = {}
+        # Monotonic time, local day, UserDto keys and result of the last
+        # fetch per user
+        self._fetched: dict[
+            int, tuple[float, date, frozenset[str], UserDto]
+        ] = {}
+        self._slot = 0
+        self._translations = DuolingoTranslations()
+        self._translations_lock = asyncio.Lock()
+        self._unsub_core_config: CALLBACK_TYPE | None = None
+        self._resolver: UsernameResolver | None = None
+
+    @property
+    def is_empty(self) -> bool:
+        """Return True if no coordinator or leaderboard is registered."""
+        return not self._coordinators and not self._leaderboards
+
+    @property
+    def resolver(self) -> UsernameResolver:
+        """Return the username resolver, created on first use."""
+        if self._resolver is None:
+            self._resolver = UsernameResolver(
+                self.hass, self._session, self.breaker
+            )
+        return self._resolver
+
+    def create_api(self, user_id: int) -> DuolingoApi:
+        """Return a new API client for a user on the shared session."""
+        return DuolingoApi(
+            session=self._session,
+            user_id=user_id,
+            timezone=self.hass.config.time_zone,
+            breaker=self.breaker,
+        )
+
+    @callback
+    def async_register(self, coordinator: DuolingoDataUpdateCoordinator) -> float:
+        """Register a coordinator and return its polling phase in [0, 1)."""
+        user_id = coordinator.identifiers.id
+        if user_id not in self._apis:
+            self._apis[user_id] = self.create_api(user_id)
+        self._coordinators.setdefault(user_id, []).append(coordinator)
+
+        phase = (self._slot * _PHASE_STEP) % 1
+        self._slot += 1
+        return phase
+
+    @callback
+    def async_unregister(self, coordinator: DuolingoDataUpdateCoordinator) -> None:
+        """Unregister a coordinator."""
+        user_id = coordinator.identifiers.id
+        coordinators = self._coordinators.get(user_id, [])
+        if coordinator in coordinators:
+            coordinators.remove(coordinator)
+        if not coordinators:
+            self._coordinators.pop(user_id, None)
+            self._apis.pop(user_id, None)
+            self._fetched.pop(user_id, None)
+
+    @callback
+    def async_register_leaderboard(
+            self,
+            leaderboard: DuolingoLeaderboardCoordinator,
+    ) -> None:
+        """Register a leaderboard for translation changes."""
+        self._leaderboards.add(leaderboard)
+
+    @callback
+    def async_unregister_leaderboard(
+            self,
+            leaderboard: DuolingoLeaderboardCoordinator,
+    ) -> None:
+        """Unregister a leaderboard."""
+        self._leaderboards.discard(leaderboard)
+
+    @callback
+    def async_set_max_concurrent(
+            self,
+            entry_id: str,
+            max_concurrent: int | None,
+    ) -> None:
+        """Set the concurrency cap of an entry, None removes it.
+
+        A changed cap applies to the fetches started afterwards, those
+        running keep the slots they hold.
+        """
+        if max_concurrent is None:
+            self._max_concurrent.pop(entry_id, None)
+        else:
+            self._max_concurrent[entry_id] = max_concurrent
+        cap = min(
+            self._max_concurrent.values(),
+            default=DEFAULT_MAX_CONCURRENT_FETCHES,
+        )
+        if cap != self.max_concurrent:
+            self.max_concurrent = cap
+            self._semaphore = asyncio.Semaphore(cap)
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Stop listening for core config changes."""
+        if self._unsub_core_config is not None:
+            self._unsub_core_config()
+            self._unsub_core_config = None
+
+    async def async_get_translations(self) -> DuolingoTranslations:
+        """Return the compiled translations of the configured language."""
+        language = self.hass.config.language
+        async with self._translations_lock:
+            if self._translations.language != language:
+                strings = await async_get_translations(
+                    self.hass,
+                    language,
+                    "common",
+                    [DOMAIN],
+                )
+                self._translations = DuolingoTranslations(language, strings)
+
+        if self._unsub_core_config is None:
+            self._unsub_core_config = self.hass.bus.async_listen(
+                EVENT_CORE_CONFIG_UPDATE, self._async_core_config_updated
+            )
+        return self._translations
+
+    async def _async_core_config_updated(self, _event: Event) -> None:
+        """Reload translations and rename entities on a language change."""
+        if self.hass.config.language == self._translations.language:
+            return
+
+        translations = await self.async_get_translations()
+        for coordinators in self._coordinators.values():
+            for coordinator in coordinators:
+                coordinator.async_set_translations(translations)
+        for leaderboard in self._leaderboards:
+            leaderboard.async_set_translations(translations)
+
+    def api(self, user_id: int) -> DuolingoApi:
+        """Return the API client for a registered user id."""
+        return self._apis[user_id]
+
+    def fresh_user(
+            self,
+            coordinator: DuolingoDataUpdateCoordinator,
+    ) -> UserDto | None:
+        """Return the user of a coordinator if it was fetched just now.
+
+        Only a fetch that covered every key the coordinators of the user
+        need counts, e.g. not one made before a platform was enabled, and
+        only one of the current local day, as its streak_today may already
+        have been rolled over at midnight.
+        """
+        user_id = coordinator.identifiers.id
+        fetched = self._fetched.get(user_id)
+        if fetched is None:
+            return None
+        fetched_at, day, keys, user = fetched
+        if (
+                time.monotonic() - fetched_at
+                >= FRESHNESS_WINDOW.total_seconds()
+                or day != dt_util.now().date()
+                or not self._user_keys(user_id) <= keys
+        ):
+            return None
+        return user
+
+    def is_fetching(self, user_id: int) -> bool:
+        """Return True if a fetch of a user is in progress."""
+        task = self._inflight.get(user_id)
+        return task is not None and not task.done()
+
+    async def async_fetch(self, coordinator: DuolingoDataUpdateCoordinator) -> UserDto:
+        """Fetch the user of a coordinator, joining a fetch in progress."""
+        user_id = coordinator.identifiers.id
+        if self.is_fetching(user_id):
+            task = self._inflight[user_id]
+            self._waiters[user_id].add(coordinator)
+        else:
+            # The fetch may start eagerly and even finish, e.g. refused by
+            # the open circuit, before the task is returned, so its waiters
+            # are set up first.
+            self._waiters[user_id] = {coordinator}
+            task = self.hass.async_create_background_task(
+                self._async_fetch(
+                    user_id, self._apis[user_id], self._user_keys(user_id)
+                ),
+                f"{DOMAIN} fetch {user_id}",
+            )
+            if not task.done():
+                self._inflight[user_id] = task
+                task.add_done_callback(
+                    partial(self._async_fetch_done, user_id)
+                )
+
+        # A cancelled caller must not cancel the fetch other entries await.
+        return await asyncio.shield(task)
+
+    @callback
+    def _async_fetch_done(self, user_id: int, task: asyncio.Task) -> None:
+        """Forget a finished fetch, unless a newer one replaced it."""
+        if self._inflight.get(user_id) is task:
+            del self._inflight[user_id]
+
+    @callback
+    def async_push_user(self, user: UserDto) -> None:
+        """Pass a user pushed through a webhook to every entry of the user."""
+        for coordinator in self._coordinators.get(user.id, []):
+            coordinator.async_push_user(user)
+
+    async def async_get_followed_users(
+            self,
+            user_id: int,
+    ) -> list[UserIdentifiersDto]:
+        """Return the users a user follows."""
+        return await DuolingoApi.async_get_followed_users(
+            self._session, user_id, self.breaker
+        )
+
+    async def async_fetch_api(
+            self,
+            api: DuolingoApi,
+            keys: set[str],
+    ) -> UserDto:
+        """Fetch a user with a client of its own, under the concurrency cap."""
+        async with self._semaphore:
+            return await api.async_get_user_data(keys)
+
+    def _user_keys(self, user_id: int) -> set[str]:
+        """Return the UserDto keys any coordinator of a user needs."""
+        return {
+            key
+            for coordinator in self._coordinators.get(user_id, [])
+            for key in coordinator.user_keys
+        }
+
+    async def _async_fetch(
+            self,
+            user_id: int,
+            api: DuolingoApi,
+            keys: set[str],
+    ) -> UserDto:
+        """Fetch a user under the concurrency cap and fan out the result."""
+        try:
+            async with self._semaphore:
+                user = await api.async_get_user_data(keys)
+        except BaseException:
+            # A failed fetch must not be covered up by an older result
+            self._fetched.pop(user_id, None)
+            raise
+        finally:
+            waiters = self._waiters.pop(user_id, set())
+
+        if user_id in self._coordinators:
+            self._fetched[user_id] = (
+                time.monotonic(), dt_util.now().date(), frozenset(keys), user
+            )
+
+        for coordinator in self._coordinators.get(user_id, []):
+            if coordinator not in waiters:
+                coordinator.async_set_user(user)
+
+        return user
@@ -0,0 +1,350 @@
+"""Leaderboard of several Duolingo users."""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import timedelta
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import (
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
+
+from .const import DOMAIN, SENSOR
+from .coordinator import TRANSLATIONS_KEY
+from .dto import UserDto, UserIdentifiersDto
+from .translations import DuolingoTranslations
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from .api import DuolingoApi
+    from .hub import DuolingoHub
+
+LEADERBOARD_INTERVAL = timedelta(minutes=30)
+# Interval at which the followed users of the tracked account are fetched
+FOLLOWING_INTERVAL = timedelta(hours=24)
+
+# Metrics ranked for every member, course metrics are keyed by course_key
+TOTAL_XP_METRIC = UserDto.TOTAL_XP_KEY
+STREAK_METRIC = UserDto.STREAK_LENGTH_KEY
+MEMBER_METRICS = (TOTAL_XP_METRIC, STREAK_METRIC)
+
+# UserDto keys fetched for every member
+LEADERBOARD_KEYS = {
+    UserDto.TOTAL_XP_KEY,
+    UserDto.STREAK_LENGTH_KEY,
+    UserDto.COURSES_XP_KEY,
+}
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+class Ranking:
+    """Members ranked by one value, highest first.
+
+    Every change pushes the new value on a heap and leaves the old entry in
+    place, it is dropped once it reaches the top. Reading the top N pops
+    and pushes back N entries, so neither takes longer than log n for each
+    entry, and the heap is rebuilt when stale entries make up most of it.
+    Ties are ranked by the lower user id.
+    """
+
+    __slots__ = ("_heap", "_values")
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._heap: list[tuple[int, int]] = []
+        self._values: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        """Return the number of ranked members."""
+        return len(self._values)
+
+    def update(self, member: int, value: int) -> bool:
+        """Set the value of a member, return False if it did not change."""
+        if self._values.get(member) == value:
+            return False
+        self._values[member] = value
+        heapq.heappush(self._heap, (-value, member))
+        self._compact()
+        return True
+
+    def remove(self, member: int) -> bool:
+        """Remove a member, return False if it was not ranked."""
+        if self._values.pop(member, None) is None:
+            return False
+        self._compact()
+        return True
+
+    def _compact(self) -> None:
+        """Rebuild the heap once most of its entries are stale."""
+        if len(self._heap) > 2 * len(self._values) + 8:
+            self._heap = [
+                (-value, member) for member, value in self._values.items()
+            ]
+            heapq.heapify(self._heap)
+
+    def top(self, count: int) -> list[tuple[int, int]]:
+        """Return the members and values of the first count ranks."""
+        heap = self._heap
+        result: list[tuple[int, int]] = []
+        kept = []
+        while heap and len(result) < count:
+            entry = heapq.heappop(heap)
+            negated, member = entry
+            if self._values.get(member) != -negated or entry in kept:
+                # Stale, or a duplicate of a value that was set again
+                continue
+            kept.append(entry)
+            result.append((member, -negated))
+        for entry in kept:
+            heapq.heappush(heap, entry)
+        return result
+
+
+class Leaderboard:
+    """Latest users of the members with their rankings by every metric."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.users: dict[int, UserDto] = {}
+        self.rankings: dict[str, Ranking] = {
+            metric: Ranking() for metric in MEMBER_METRICS
+        }
+
+    @staticmethod
+    def _values(user: UserDto | None) -> dict[str, int]:
+        """Return the value of a user for every metric it is ranked by."""
+        if user is None:
+            return {}
+        return {
+            TOTAL_XP_METRIC: user.total_xp,
+            STREAK_METRIC: user.streak_length,
+            **{
+                UserDto.course_key(course_id): xp
+                for course_id, xp in user.courses_xp.items()
+            },
+        }
+
+    def update(self, user: UserDto) -> set[str]:
+        """Rank a fetched user, return the metrics whose ranking changed."""
+        previous = self.users.get(user.id)
+        if previous is user:
+            return set()
+        self.users[user.id] = user
+
+        values = self._values(user)
+        old_values = self._values(previous)
+        renamed = previous is not None and (
+            previous.name != user.name or previous.username != user.username
+        )
+        changed = set()
+        for metric, value in values.items():
+            ranking = self.rankings.get(metric)
+            if ranking is None:
+                ranking = self.rankings[metric] = Ranking()
+            if ranking.update(user.id, value) or renamed:
+                changed.add(metric)
+        for metric in old_values.keys() - values.keys():
+            self.rankings[metric].remove(user.id)
+            changed.add(metric)
+        return changed
+
+    def remove(self, user_id: int) -> set[str]:
+        """Remove a member, return the metrics whose ranking changed."""
+        return {
+            metric for metric in self._values(self.users.pop(user_id, None))
+            if self.rankings[metric].remove(user_id)
+        }
+
+    def top(self, metric: str, count: int) -> list[tuple[UserDto, int]]:
+        """Return the users and values of the first count ranks of a metric."""
+        ranking = self.rankings.get(metric)
+        if ranking is None:
+            return []
+        return [
+            (self.users[member], value)
+            for member, value in ranking.top(count)
+        ]
+
+
+class DuolingoLeaderboardCoordinator(DataUpdateCoordinator[Leaderboard]):
+    """Fetch the members of a leaderboard and keep them ranked.
+
+    Members are the configured users and, if an account is tracked, the
+    users it follows. Their profiles are fetched in parallel under the
+    concurrency cap of the hub, a member whose fetch failed keeps its last
+    values. The Leaderboard is updated in place, so listeners are called
+    after every update and read the changed metrics from changed_metrics.
+    """
+
+    def __init__(
+            self,
+            hass: HomeAssistant,
+            hub: DuolingoHub,
+            *,
+            title: str,
+            members: list[UserIdentifiersDto],
+            followed_by: UserIdentifiersDto | None,
+            top_n: int,
+    ) -> None:
+        """Initialize."""
+        self.hub = hub
+        self.title = title
+        self.top_n = top_n
+        self.platforms = [SENSOR]
+        self.translations = DuolingoTranslations()
+        self._members = {member.id: member for member in members}
+        self._followed_by = followed_by
+        self._following: dict[int, UserIdentifiersDto] = {}
+        self._following_fetched: float | None = None
+        self._apis: dict[int, DuolingoApi] = {}
+        # Metrics changed by the last update, None when all entities have
+        # to write their state
+        self.changed_metrics: set[str] | None = None
+        # Metrics having entities, and the callback adding those of new ones
+        self.metrics: set[str] = set()
+        self._add_metrics: Callable[[list[str]], None] | None = None
+
+        super().__init__(
+            hass=hass,
+            logger=_LOGGER,
+            name=f"{DOMAIN} leaderboard",
+            update_interval=LEADERBOARD_INTERVAL,
+        )
+        self.data = Leaderboard()
+        hub.async_register_leaderboard(self)
+
+    @property
+    def members(self) -> dict[int, UserIdentifiersDto]:
+        """Return the current members by user id."""
+        return {**self._following, **self._members}
+
+    async def _async_update_data(self) -> Leaderboard:
+        """Fetch every member and update the rankings."""
+        await self._async_update_following()
+
+        members = self.members
+        changed: set[str] = set()
+        for user_id in [user_id for user_id in self._apis if user_id not in members]:
+            del self._apis[user_id]
+            changed |= self.data.remove(user_id)
+
+        results = await asyncio.gather(
+            *(self._async_fetch(user_id) for user_id in members),
+            return_exceptions=True,
+        )
+        errors = []
+        for user_id, result in zip(members, results, strict=True):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, Exception):
+                _LOGGER.debug("Fetching member %s failed: %s", user_id, result)
+                errors.append(result)
+            else:
+                changed |= self.data.update(result)
+
+        if members and len(errors) == len(members):
+            self.changed_metrics = None
+            raise UpdateFailed(errors[0]) from errors[0]
+
+        # After a failed update every entity has to become available again
+        self.changed_metrics = changed if self.last_update_success else None
+        return self.data
+
+    async def _async_fetch(self, user_id: int) -> UserDto:
+        """Fetch a member with its own API client."""
+        api = self._apis.get(user_id)
+        if api is None:
+            api = self._apis[user_id] = self.hub.create_api(user_id)
+        return await self.hub.async_fetch_api(api, LEADERBOARD_KEYS)
+
+    async def _async_update_following(self) -> None:
+        """Fetch the users the tracked account follows once a day."""
+        if self._followed_by is None or (
+                self._following_fetched is not None
+                and time.monotonic() - self._following_fetched
+                < FOLLOWING_INTERVAL.total_seconds()
+        ):
+            return
+
+        try:
+            following = await self.hub.async_get_followed_users(
+                self._followed_by.id
+            )
+        except Exception as exception:  # noqa: BLE001
+            # Keep the followed users fetched before
+            _LOGGER.warning(
+                "Failed to fetch the users %s follows: %s",
+                self._followed_by.username, exception,
+            )
+            return
+        self._following = {user.id: user for user in following}
+        self._following[self._followed_by.id] = self._followed_by
+        self._following_fetched = time.monotonic()
+
+    @callback
+    def async_track_metrics(
+            self,
+            add_metrics: Callable[[list[str]], None],
+    ) -> CALLBACK_TYPE:
+        """Call add_metrics with the current and every new metric.
+
+        Returns a function that stops tracking.
+        """
+        self.metrics = set()
+        self._add_metrics = add_metrics
+        self._async_add_new_metrics()
+
+        @callback
+        def async_stop() -> None:
+            if self._add_metrics is add_metrics:
+                self._add_metrics = None
+                self.metrics = set()
+
+        return async_stop
+
+    @callback
+    def _async_add_new_metrics(self) -> None:
+        """Pass the metrics without entities yet to the metric callback."""
+        if self._add_metrics is None:
+            return
+        new_metrics = [
+            metric for metric in self.data.rankings
+            if metric not in self.metrics
+        ]
+        if new_metrics:
+            self.metrics.update(new_metrics)
+            self._add_metrics(new_metrics)
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Add the entities of new metrics, then update all listeners."""
+        self._async_add_new_metrics()
+        super().async_update_listeners()
+
+    async def async_fetch_translations(self) -> None:
+        """Fetch translations from the cache shared by all entries."""
+        self.translations = await self.hub.async_get_translations()
+
+    @callback
+    def async_set_translations(
+            self,
+            translations: DuolingoTranslations,
+    ) -> None:
+        """Replace translations and refresh the entity names only."""
+        self.translations = translations
+        self.changed_metrics = {TRANSLATIONS_KEY}
+        self.async_update_listeners()
+
+    @callback
+    def async_set_top_n(self, top_n: int) -> None:
+        """Change the number of ranks shown and rewrite all entities."""
+        self.top_n = top_n
+        self.changed_metrics = None
+        self.async_update_listeners()
@@ -0,0 +1,112 @@
+"""Rolling performance metrics of the Duolingo polls."""
+from array import array
+from collections.abc import Callable
+
+# Samples kept per histogram, older ones are overwritten
+HISTOGRAM_SIZE = 64
+
+# Histogram keys
+REQUEST_LATENCY = "request_latency"
+RESPONSE_SIZE = "response_size"
+DECODE_TIME = "decode_time"
+BUILD_TIME = "build_time"
+UPDATE_TIME = "update_time"
+# Counter keys
+REQUESTS = "requests"
+RETRIES = "retries"
+SHORT_CIRCUITED = "short_circuited"
+
+HISTOGRAMS = (REQUEST_LATENCY, RESPONSE_SIZE, DECODE_TIME, BUILD_TIME, UPDATE_TIME)
+COUNTERS = (REQUESTS, RETRIES, SHORT_CIRCUITED)
+
+
+class RollingHistogram:
+    """The last samples of a measurement in a fixed size ring."""
+
+    __slots__ = ("_next", "count", "samples")
+
+    def __init__(self, size: int = HISTOGRAM_SIZE) -> None:
+        """Initialize."""
+        self.samples = array("d", bytes(size * 8))
+        self.count = 0
+        self._next = 0
+
+    def add(self, value: float) -> None:
+        """Add a sample, overwriting the oldest one once the ring is full."""
+        self.samples[self._next] = value
+        self._next = (self._next + 1) % len(self.samples)
+        self.count += 1
+
+    @property
+    def last(self) -> float | None:
+        """Return the latest sample."""
+        if not self.count:
+            return None
+        return self.samples[self._next - 1]
+
+    def _values(self) -> list[float]:
+        """Return the samples in the ring, sorted."""
+        return sorted(self.samples[:min(self.count, len(self.samples))])
+
+    def percentile(self, fraction: float) -> float | None:
+        """Return the nearest-rank percentile of the samples in the ring."""
+        values = self._values()
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+    def as_dict(self) -> dict[str, float | int | None]:
+        """Return the summary of the samples."""
+        values = self._values()
+        if not values:
+            return {"count": self.count}
+        return {
+            "count": self.count,
+            "last": self.last,
+            "p50": values[len(values) // 2],
+            "p95": values[min(len(values) - 1, int(0.95 * len(values)))],
+            "max": values[-1],
+        }
+
+
+class PollMetrics:
+    """Histograms and counters of the polls of one user.
+
+    Times are in milliseconds and sizes in bytes. Retries count requests
+    repeated for the full document and updates retried after a failure.
+    Listeners are called once per finished update, not per sample.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.histograms = {key: RollingHistogram() for key in HISTOGRAMS}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self._listeners: list[Callable[[], None]] = []
+
+    def add(self, key: str, value: float) -> None:
+        """Add a sample to a histogram."""
+        self.histograms[key].add(value)
+
+    def increment(self, key: str) -> None:
+        """Increment a counter."""
+        self.counters[key] += 1
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call listener on updates, return a function removing it."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def notify(self) -> None:
+        """Call the listeners after an update."""
+        for listener in list(self._listeners):
+            listener()
+
+    def as_dict(self) -> dict[str, object]:
+        """Return the summaries of all histograms and the counters."""
+        return {
+            **{
+                key: histogram.as_dict()
+                for key, histogram in self.histograms.items()
+            },
+            **self.counters,
+        }
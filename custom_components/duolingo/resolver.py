@@ -0,0 +1,114 @@
+"""Username resolution for the config flow."""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import Counter, OrderedDict
+from datetime import timedelta
+from functools import partial
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant, callback
+
+from .api import DuolingoApi
+from .const import DOMAIN
+
+if TYPE_CHECKING:
+    import aiohttp
+
+    from .breaker import CircuitBreaker
+    from .dto import UserIdentifiersDto
+
+# Lifetime of resolved usernames, and of unknown ones which may be
+# registered any moment
+RESOLVED_TTL = timedelta(hours=1)
+NOT_FOUND_TTL = timedelta(minutes=5)
+# Usernames kept, the least recently used one is evicted first
+CACHE_SIZE = 64
+
+
+def normalize_username(username: str) -> str:
+    """Return the cache key of a username, usernames ignore case."""
+    return username.strip().casefold()
+
+
+class UsernameResolver:
+    """Resolve usernames to user identifiers with the lookup endpoint.
+
+    Concurrent lookups of the same username share one request, which is
+    cancelled once nobody waits for it any more. Found and unknown
+    usernames are cached for a while, failed lookups are not.
+    """
+
+    def __init__(
+            self,
+            hass: HomeAssistant,
+            session: aiohttp.ClientSession,
+            breaker: CircuitBreaker | None = None,
+    ) -> None:
+        """Initialize."""
+        self.hass = hass
+        self._session = session
+        self._breaker = breaker
+        self._cache: OrderedDict[
+            str, tuple[float, UserIdentifiersDto | None]
+        ] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task[UserIdentifiersDto | None]] = {}
+        self._waiters: Counter[str] = Counter()
+
+    async def async_resolve(self, username: str) -> UserIdentifiersDto | None:
+        """Return the identifiers of a username, None if it is unknown."""
+        key = normalize_username(username)
+        cached = self._cache.get(key)
+        if cached is not None:
+            expires, identifiers = cached
+            if expires > time.monotonic():
+                self._cache.move_to_end(key)
+                return identifiers
+            del self._cache[key]
+
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            task = self.hass.async_create_background_task(
+                self._async_lookup(key, username.strip()),
+                f"{DOMAIN} resolve {key}",
+            )
+            # The lookup may start eagerly and even finish, e.g. refused by
+            # the open circuit, before the task is returned
+            if not task.done():
+                self._inflight[key] = task
+                task.add_done_callback(partial(self._async_lookup_done, key))
+
+        self._waiters[key] += 1
+        try:
+            # A cancelled caller must not cancel the lookup others await
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                if not task.done():
+                    task.cancel()
+
+    @callback
+    def _async_lookup_done(self, key: str, task: asyncio.Task) -> None:
+        """Forget a finished lookup, unless a newer one replaced it."""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _async_lookup(
+            self,
+            key: str,
+            username: str,
+    ) -> UserIdentifiersDto | None:
+        """Look a username up and cache the result."""
+        identifiers = await DuolingoApi.async_get_user_identifiers(
+            self._session, username, self._breaker
+        )
+
+        ttl = RESOLVED_TTL if identifiers is not None else NOT_FOUND_TTL
+        self._cache[key] = (time.monotonic() + ttl.total_seconds(), identifiers)
+        self._cache.move_to_end(key)
+        while len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return identifiers
@@ -0,0 +1,138 @@
+"""Streak-aware polling schedule for Duolingo users."""
+from datetime import UTC, date, datetime, time, timedelta
+
+# Interval while nothing in particular is expected to happen
+DEFAULT_INTERVAL = timedelta(minutes=20)
+# Interval while the user is active or the streak is at risk
+ACTIVE_INTERVAL = timedelta(minutes=5)
+# Interval once the streak has been extended today
+EXTENDED_INTERVAL = timedelta(hours=2)
+
+# Time before local midnight in which an unextended streak is at risk
+AT_RISK_WINDOW = timedelta(hours=4)
+# Time after an XP change during which the user is considered active
+ACTIVITY_WINDOW = timedelta(minutes=30)
+# Safety net interval after the last profile pushed through the webhook
+PUSH_INTERVAL = timedelta(hours=6)
+
+# Local night during which no polls are made
+QUIET_START = time(1, 0)
+QUIET_END = time(6, 0)
+
+
+def _until(now: datetime, target: datetime) -> timedelta:
+    """Return the real time until target, correct across DST transitions."""
+    return target.astimezone(UTC) - now.astimezone(UTC)
+
+
+def _at(day: date, at: time, now: datetime) -> datetime:
+    """Return a local datetime on day at the given wall clock time."""
+    return datetime.combine(day, at, tzinfo=now.tzinfo)
+
+
+def _quiet_window(now: datetime, day: date) -> tuple[datetime, datetime]:
+    """Return the start and end of the quiet hours of a local day."""
+    return _at(day, QUIET_START, now), _at(day, QUIET_END, now)
+
+
+def next_midnight(now: datetime) -> datetime:
+    """Return the start of the local day after now.
+
+    A midnight skipped by a DST transition resolves to the instant of the
+    transition, a repeated one to its first occurrence.
+    """
+    return _at(now.date() + timedelta(days=1), time.min, now)
+
+
+class PollScheduler:
+    """Decide when to poll a user next.
+
+    Polls are dense in the hours before local midnight while the streak is
+    not extended yet and shortly after XP was earned, sparse once the streak
+    is extended and suspended during the local night. A daily request budget
+    paces the remaining polls of a day evenly until midnight. While
+    profiles are pushed, only a safety net poll follows the last push.
+    """
+
+    def __init__(self, daily_budget: int = 0) -> None:
+        """Initialize, a daily budget of 0 means unlimited."""
+        self.daily_budget = daily_budget
+        self._day: date | None = None
+        self._polls_today = 0
+        self._last_xp: int | None = None
+        self._last_activity: datetime | None = None
+        self.last_push: datetime | None = None
+
+    @property
+    def polls_today(self) -> int:
+        """Return the number of polls made on the current local day."""
+        return self._polls_today
+
+    def record_poll(self, now: datetime) -> None:
+        """Count a request made for the user against the daily budget."""
+        if self._day != now.date():
+            self._day = now.date()
+            self._polls_today = 0
+        self._polls_today += 1
+
+    def record_xp(self, now: datetime, total_xp: int) -> None:
+        """Remember whether a received profile showed new XP."""
+        if self._last_xp is not None and total_xp != self._last_xp:
+            self._last_activity = now
+        self._last_xp = total_xp
+
+    def record_push(self, now: datetime) -> None:
+        """Remember a pushed profile, which is not counted as a poll."""
+        self.last_push = now
+
+    def next_interval(
+            self, now: datetime, *, streak_today: bool
+    ) -> timedelta:
+        """Return the delay until the next poll.
+
+        ``now`` has to be aware and in the local time zone of the user.
+        """
+        interval = self._next_interval(now, streak_today=streak_today)
+        if self.last_push is not None:
+            interval = max(interval, _until(now, self.last_push + PUSH_INTERVAL))
+
+        # A poll falling into the quiet hours waits for their end
+        at = (now.astimezone(UTC) + interval).astimezone(now.tzinfo)
+        start, end = _quiet_window(now, at.date())
+        if start <= at < end:
+            return _until(now, end)
+        return interval
+
+    def _next_interval(
+            self, now: datetime, *, streak_today: bool
+    ) -> timedelta:
+        """Return the delay until the next poll from the streak and budget."""
+        midnight = next_midnight(now)
+
+        start, end = _quiet_window(now, now.date())
+        if start <= now < end:
+            return _until(now, end)
+
+        if streak_today:
+            interval = EXTENDED_INTERVAL
+        elif (
+                self._last_activity is not None
+                and now - self._last_activity < ACTIVITY_WINDOW
+        ) or _until(now, midnight) <= AT_RISK_WINDOW:
+            interval = ACTIVE_INTERVAL
+        else:
+            interval = DEFAULT_INTERVAL
+
+        if self.daily_budget:
+            polls_today = self._polls_today if self._day == now.date() else 0
+            remaining = self.daily_budget - polls_today
+            if remaining <= 0:
+                # Budget spent, wait for the first poll of the next day
+                return _until(now, _at(midnight.date(), QUIET_END, now))
+            # The remaining polls are spread over the hours left awake
+            awake = _until(now, midnight)
+            if now < start:
+                awake -= _until(start, end)
+            interval = max(interval, awake / remaining)
+
+        return interval
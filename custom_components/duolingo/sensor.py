@@ -1,24 +1,215 @@
 """Support for Duolingo streak sensors."""
 import logging
-import re
-
-from homeassistant.components.sensor import SensorEntity
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import ATTR_ATTRIBUTION
-from homeassistant.core import HomeAssistant
+from homeassistant.const import (
+    ATTR_ATTRIBUTION,
+    EntityCategory,
+    UnitOfInformation,
+    UnitOfTime,
+)
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.typing import StateType
+from homeassistant.util import dt as dt_util
 from propcache import cached_property
 
-from . import DuolingoDataUpdateCoordinator
+from .breaker import CircuitState
 from .const import (
-    DOMAIN, ATTR_DUO_DATA_PROVIDER, ATTR_DUO_USERNAME, ATTR_DUO_COURSE_ID,
-    ATTR_DUO_NAME,
+    ATTR_DUO_CIRCUIT_FAILURES,
+    ATTR_DUO_CIRCUIT_OPEN_UNTIL,
+    ATTR_DUO_DATA_PROVIDER,
+    ATTR_DUO_MEMBERS,
+    ATTR_DUO_RANKING,
+    DOMAIN,
 )
+from .coordinator import DAY_KEY, DuolingoDataUpdateCoordinator
 from .dto import UserDto
-from .entity import DuolingoEntity
+from .entity import (
+    USER_KEYS,
+    DuolingoEntity,
+    DuolingoEntityDescription,
+    DuolingoLeaderboardEntity,
+    course_attributes,
+    user_attributes,
+)
+from .leaderboard import DuolingoLeaderboardCoordinator
+from .metrics import COUNTERS, HISTOGRAMS, RESPONSE_SIZE
 
 _LOGGER = logging.getLogger(__name__)
 
+# Interval at which the rolling XP rates follow the passing time
+RATE_UPDATE_INTERVAL = timedelta(minutes=5)
+
+
+@dataclass(frozen=True, kw_only=True)
+class DuolingoSensorEntityDescription(
+    DuolingoEntityDescription, SensorEntityDescription
+):
+    """Describes a sensor of a Duolingo user."""
+
+    value_fn: Callable[[DuolingoDataUpdateCoordinator], StateType]
+
+
+@dataclass(frozen=True, kw_only=True)
+class DuolingoCourseSensorEntityDescription(
+    DuolingoEntityDescription, SensorEntityDescription
+):
+    """Describes a sensor of every course of a Duolingo user."""
+
+    value_fn: Callable[[DuolingoDataUpdateCoordinator, str], StateType]
+    # Interval at which the value follows the passing time between updates
+    refresh_interval: timedelta | None = None
+
+
+@dataclass(frozen=True, kw_only=True)
+class DuolingoMetricSensorEntityDescription(DuolingoSensorEntityDescription):
+    """Describes the diagnostic sensor of a poll metric."""
+
+    metric: str
+
+
+SENSORS: tuple[DuolingoSensorEntityDescription, ...] = (
+    DuolingoSensorEntityDescription(
+        key="streak_length",
+        name_key="streak_length",
+        icon="mdi:calendar",
+        native_unit_of_measurement="days",
+        user_keys=USER_KEYS | {UserDto.STREAK_LENGTH_KEY},
+        value_fn=lambda coordinator: coordinator.user.streak_length,
+        attributes_fn=user_attributes,
+    ),
+    DuolingoSensorEntityDescription(
+        key="xp",
+        name_key="total_xp",
+        icon="mdi:star",
+        native_unit_of_measurement="XP",
+        user_keys=USER_KEYS | {UserDto.TOTAL_XP_KEY},
+        value_fn=lambda coordinator: coordinator.user.total_xp,
+        attributes_fn=user_attributes,
+    ),
+    # XP earned on the current local day and week, from the XP history.
+    # The values restart every day and week.
+    DuolingoSensorEntityDescription(
+        key="xp_today",
+        name_key="xp_today",
+        icon="mdi:star-plus",
+        native_unit_of_measurement="XP",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        user_keys=USER_KEYS | {UserDto.TOTAL_XP_KEY, DAY_KEY},
+        value_fn=lambda coordinator: coordinator.history.xp_today(
+            dt_util.now()
+        ),
+        attributes_fn=user_attributes,
+    ),
+    DuolingoSensorEntityDescription(
+        key="xp_week",
+        name_key="xp_week",
+        icon="mdi:calendar-star",
+        native_unit_of_measurement="XP",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        user_keys=USER_KEYS | {UserDto.TOTAL_XP_KEY, DAY_KEY},
+        value_fn=lambda coordinator: coordinator.history.xp_this_week(
+            dt_util.now()
+        ),
+        attributes_fn=user_attributes,
+    ),
+)
+
+COURSE_SENSORS: tuple[DuolingoCourseSensorEntityDescription, ...] = (
+    DuolingoCourseSensorEntityDescription(
+        key="xp",
+        name_key="course_xp",
+        icon="mdi:progress-star",
+        native_unit_of_measurement="XP",
+        user_keys=USER_KEYS,
+        value_fn=lambda coordinator, course_id: (
+            coordinator.user.courses_xp.get(course_id, 0)
+        ),
+        attributes_fn=course_attributes,
+    ),
+    # XP per hour over the rolling window of the XP history
+    DuolingoCourseSensorEntityDescription(
+        key="xp_rate",
+        name_key="course_xp_rate",
+        icon="mdi:speedometer",
+        native_unit_of_measurement="XP/h",
+        state_class=SensorStateClass.MEASUREMENT,
+        user_keys=USER_KEYS,
+        value_fn=lambda coordinator, course_id: round(
+            coordinator.history.rate(course_id, dt_util.now()), 2
+        ),
+        attributes_fn=course_attributes,
+        refresh_interval=RATE_UPDATE_INTERVAL,
+    ),
+)
+
+CIRCUIT_BREAKER_SENSOR = DuolingoSensorEntityDescription(
+    key="circuit_breaker",
+    name_key="circuit_breaker",
+    icon="mdi:electric-switch",
+    entity_category=EntityCategory.DIAGNOSTIC,
+    device_class=SensorDeviceClass.ENUM,
+    options=[state.value for state in CircuitState],
+    value_fn=lambda coordinator: coordinator.hub.breaker.state.value,
+)
+
+
+def _metric_description(metric: str) -> DuolingoMetricSensorEntityDescription:
+    """Describe the sensor of a poll metric.
+
+    Histograms report the median of their recent samples as state, counters
+    their total, which restarts with Home Assistant.
+    """
+    if metric in COUNTERS:
+        return DuolingoMetricSensorEntityDescription(
+            key=f"metric_{metric}",
+            name_key=f"metric_{metric}",
+            metric=metric,
+            icon="mdi:chart-bell-curve",
+            entity_category=EntityCategory.DIAGNOSTIC,
+            entity_registry_enabled_default=False,
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            value_fn=lambda coordinator: coordinator.metrics.counters[metric],
+        )
+
+    def median(coordinator: DuolingoDataUpdateCoordinator) -> float | None:
+        value = coordinator.metrics.histograms[metric].percentile(0.5)
+        return None if value is None else round(value, 2)
+
+    size = metric == RESPONSE_SIZE
+    return DuolingoMetricSensorEntityDescription(
+        key=f"metric_{metric}",
+        name_key=f"metric_{metric}",
+        metric=metric,
+        icon="mdi:chart-bell-curve",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        device_class=(
+            SensorDeviceClass.DATA_SIZE if size else SensorDeviceClass.DURATION
+        ),
+        native_unit_of_measurement=(
+            UnitOfInformation.BYTES if size else UnitOfTime.MILLISECONDS
+        ),
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=median,
+    )
+
+
+METRIC_SENSORS: tuple[DuolingoMetricSensorEntityDescription, ...] = tuple(
+    _metric_description(metric) for metric in (*HISTOGRAMS, *COUNTERS)
+)
+
 
 async def async_setup_entry(
         hass: HomeAssistant,
@@ -27,6 +218,18 @@ async def async_setup_entry(
 ) -> None:
     """Set up sensor platform."""
     coordinator = hass.data[DOMAIN][entry.entry_id]
+    if isinstance(coordinator, DuolingoLeaderboardCoordinator):
+        @callback
+        def async_add_metrics(metrics: list[str]) -> None:
+            """Add the sensors of metrics ranked for the first time."""
+            async_add_devices([
+                DuolingoLeaderboardSensor(coordinator, entry, metric)
+                for metric in metrics
+            ])
+
+        entry.async_on_unload(coordinator.async_track_metrics(async_add_metrics))
+        return
+
     if not isinstance(coordinator, DuolingoDataUpdateCoordinator):
         _LOGGER.error(
             "Coordinator is not of type DuolingoDataUpdateCoordinator"
@@ -34,151 +237,234 @@ async def async_setup_entry(
         return
 
     sensors: list[SensorEntity] = [
-        DuolingoStreakLengthSensor(coordinator, entry),
-        DuolingoTotalXPSensor(coordinator, entry),
+        *(
+            DuolingoSensor(coordinator, entry, description)
+            for description in SENSORS
+        ),
+        DuolingoCircuitBreakerSensor(coordinator, entry, CIRCUIT_BREAKER_SENSOR),
+        *(
+            DuolingoMetricSensor(coordinator, entry, description)
+            for description in METRIC_SENSORS
+        ),
     ]
-
-    user_dto = UserDto.from_dict(coordinator.data)
-    for course_id in user_dto.courses_xp.keys():
-        sensors.append(
-            DuolingoCourseXPSensor(coordinator, entry, course_id)
-        )
-
     async_add_devices(sensors)
 
+    @callback
+    def async_add_courses(course_ids: list[str]) -> None:
+        """Add the sensors of courses the user started."""
+        async_add_devices([
+            DuolingoCourseSensor(coordinator, entry, description, course_id)
+            for course_id in course_ids
+            for description in COURSE_SENSORS
+        ])
 
-class DuolingoStreakLengthSensor(DuolingoEntity, SensorEntity):
-    """Implementation of the Duolingo Streak Length sensor."""
+    entry.async_on_unload(coordinator.async_track_courses(async_add_courses))
 
-    @property
-    def name(self) -> str:
-        """Return the name of the sensor."""
-        return self.translation_sensors("streak_length", {
-            "name": self.user.name,
-        })
 
-    @cached_property
-    def unique_id(self) -> str:
-        """Return a unique ID to use for this entity."""
-        return f"{super().unique_id}_streak_length"
+class DuolingoSensor(DuolingoEntity, SensorEntity):
+    """Sensor of a Duolingo user, as described by its description."""
+
+    entity_description: DuolingoSensorEntityDescription
 
     @property
-    def native_value(self) -> int:
+    def native_value(self) -> StateType:
         """Return the state of the sensor."""
-        return self.user.streak_length
+        return self.entity_description.value_fn(self.coordinator)
 
-    @property
-    def native_unit_of_measurement(self) -> str:
-        """Return the unit of measurement."""
-        return "days"
 
-    @property
-    def icon(self) -> str:
-        """Return the icon to use in the frontend."""
-        return "mdi:calendar"
+class DuolingoCourseSensor(DuolingoEntity, SensorEntity):
+    """Sensor of a course of a Duolingo user."""
 
-    @property
-    def extra_state_attributes(self) -> dict[str, object]:
-        """Return the state attributes."""
-        return {
-            ATTR_ATTRIBUTION: ATTR_DUO_DATA_PROVIDER,
-            ATTR_DUO_USERNAME: self.user.username,
+    entity_description: DuolingoCourseSensorEntityDescription
+
+    _last_value: StateType = None
+
+    def __init__(
+            self,
+            coordinator: DuolingoDataUpdateCoordinator,
+            config_entry: ConfigEntry,
+            description: DuolingoCourseSensorEntityDescription,
+            course_id: str,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, config_entry, description)
+        self.course_id = course_id
+        self.user_keys = description.user_keys | {
+            UserDto.course_key(course_id),
         }
 
+    async def async_added_to_hass(self) -> None:
+        """Follow the passing time while no new XP is fetched, if described."""
+        await super().async_added_to_hass()
+        interval = self.entity_description.refresh_interval
+        if interval is not None:
+            self.async_on_remove(
+                async_track_time_interval(
+                    self.hass, self._async_time_passed, interval
+                )
+            )
+
+    @callback
+    def _async_time_passed(self, _now: datetime) -> None:
+        """Write the state if the passed time changed the value."""
+        value = self.native_value
+        if value != self._last_value:
+            self._last_value = value
+            self.async_write_ha_state()
 
-class DuolingoTotalXPSensor(DuolingoEntity, SensorEntity):
-    """Implementation of the Duolingo Total XP sensor."""
+    def translation_courses(self, course_id: str) -> str:
+        """Return the translated string for course id."""
+        return self.coordinator.translations.course_name(course_id)
 
     @property
-    def name(self) -> str:
-        """Return the name of the sensor."""
-        return self.translation_sensors("total_xp", {
+    def course_name(self) -> str:
+        """Return the translated course name."""
+        return self.translation_courses(self.course_id)
+
+    def build_name(self) -> str | None:
+        """Build the name of the sensor."""
+        return self.translation_sensors(self.entity_description.name_key, {
             "name": self.user.name,
+            "course_name": self.course_name
         })
 
     @cached_property
     def unique_id(self) -> str:
         """Return a unique ID to use for this entity."""
-        return f"{super().unique_id}_xp"
+        return (
+            f"{DOMAIN}_{self.identifiers.id}_{self.course_id}"
+            f"_{self.entity_description.key}"
+        )
+
+    @property
+    def available(self) -> bool:
+        """Return False once the user dropped the course."""
+        return super().available and self.course_id in self.user.courses_xp
 
     @property
-    def native_value(self) -> int:
+    def native_value(self) -> StateType:
         """Return the state of the sensor."""
-        return self.user.total_xp
+        return self.entity_description.value_fn(self.coordinator, self.course_id)
 
     @property
-    def native_unit_of_measurement(self) -> str:
-        """Return the unit of measurement."""
-        return "XP"
+    def extra_state_attributes(self) -> Mapping[str, object] | None:
+        """Return the attributes shared with the sensors of the course."""
+        return self.coordinator.attribute_snapshots.get(
+            self.entity_description.attributes_fn, self.course_id
+        )
+
+
+class DuolingoDiagnosticSensor(DuolingoSensor):
+    """Diagnostic sensor of the polling itself, not of the user."""
 
     @property
-    def icon(self) -> str:
-        """Return the icon to use in the frontend."""
-        return "mdi:star"
+    def available(self) -> bool:
+        """Stay available while updates fail, that is when it matters."""
+        return True
+
+
+class DuolingoCircuitBreakerSensor(DuolingoDiagnosticSensor):
+    """Diagnostic sensor of the circuit breaker shared by all entries."""
+
+    async def async_added_to_hass(self) -> None:
+        """Write state whenever the circuit breaker changes."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.hub.breaker.add_listener(self.async_write_ha_state)
+        )
 
     @property
     def extra_state_attributes(self) -> dict[str, object]:
-        """Return the state attributes."""
+        """Return the state of the circuit breaker."""
+        breaker = self.coordinator.hub.breaker
         return {
             ATTR_ATTRIBUTION: ATTR_DUO_DATA_PROVIDER,
-            ATTR_DUO_USERNAME: self.user.username,
+            ATTR_DUO_CIRCUIT_FAILURES: breaker.failures,
+            ATTR_DUO_CIRCUIT_OPEN_UNTIL: breaker.open_until,
         }
 
 
-class DuolingoCourseXPSensor(DuolingoEntity, SensorEntity):
-    """Implementation of the Duolingo Course XP sensor."""
+class DuolingoMetricSensor(DuolingoDiagnosticSensor):
+    """Diagnostic sensor of a poll metric of the user, disabled by default."""
 
-    def __init__(self, coordinator, config_entry, course_id: str):
-        super().__init__(coordinator, config_entry)
-        self.course_id = course_id
+    entity_description: DuolingoMetricSensorEntityDescription
 
-    def translation_courses(self, course_id: str) -> str:
-        """Return the translated string for course id."""
-        match = re.search(r"_(\w+)_", course_id)
-        key = match.group(1) if match else course_id
-        full_key = f"component.{DOMAIN}.common.courses.{key}"
-        _LOGGER.debug(f"Translating course key: {full_key}")
-        return self.coordinator.translations.get(full_key, key)
+    async def async_added_to_hass(self) -> None:
+        """Write state after every update, even of an unchanged profile."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.metrics.add_listener(self.async_write_ha_state)
+        )
 
     @property
-    def course_name(self) -> str:
-        """Return the translated course name."""
-        return self.translation_courses(self.course_id)
+    def extra_state_attributes(self) -> dict[str, object] | None:
+        """Return the recent samples summary of a histogram."""
+        metric = self.entity_description.metric
+        if metric in COUNTERS:
+            return None
+        return {
+            key: round(value, 2)
+            for key, value in (
+                self.coordinator.metrics.histograms[metric].as_dict().items()
+            )
+        }
 
-    @property
-    def name(self) -> str:
-        """Return the name of the sensor."""
-        return self.translation_sensors("course_xp", {
-            "name": self.user.name,
-            "course_name": self.course_name
-        })
 
-    @cached_property
-    def unique_id(self) -> str:
-        """Return a unique ID to use for this entity."""
-        return f"{super().unique_id}_{self.course_id}_xp"
+class DuolingoLeaderboardSensor(DuolingoLeaderboardEntity, SensorEntity):
+    """Leader of a leaderboard metric, with the top ranks as attribute."""
 
     @property
-    def native_value(self) -> int:
-        """Return the state of the sensor."""
-        return self.user.courses_xp.get(self.course_id, 0)
+    def course_id(self) -> str | None:
+        """Return the course of a course XP metric."""
+        prefix = UserDto.course_key("")
+        if self.metric.startswith(prefix):
+            return self.metric.removeprefix(prefix)
+        return None
+
+    def build_name(self) -> str | None:
+        """Build the name of the sensor."""
+        course_id = self.course_id
+        if course_id is None:
+            return self.translation_sensors(f"leaderboard_{self.metric}", {
+                "name": self.coordinator.title,
+            })
+        return self.translation_sensors("leaderboard_course_xp", {
+            "name": self.coordinator.title,
+            "course_name": self.coordinator.translations.course_name(course_id),
+        })
 
     @property
-    def native_unit_of_measurement(self) -> str:
-        """Return the unit of measurement."""
-        return "XP"
+    def native_value(self) -> str | None:
+        """Return the name of the leader."""
+        top = self.coordinator.data.top(self.metric, 1)
+        if not top:
+            return None
+        user, _ = top[0]
+        return user.name or user.username
 
     @property
     def icon(self) -> str:
         """Return the icon to use in the frontend."""
-        return "mdi:progress-star"
+        return "mdi:podium"
 
     @property
     def extra_state_attributes(self) -> dict[str, object]:
-        """Return the state attributes."""
+        """Return the top ranks."""
+        leaderboard = self.coordinator.data
+        ranking = leaderboard.rankings.get(self.metric)
         return {
             ATTR_ATTRIBUTION: ATTR_DUO_DATA_PROVIDER,
-            ATTR_DUO_NAME: self.user.name,
-            ATTR_DUO_USERNAME: self.user.username,
-            ATTR_DUO_COURSE_ID: self.course_id,
+            ATTR_DUO_RANKING: [
+                {
+                    "rank": rank,
+                    "name": user.name,
+                    "username": user.username,
+                    "value": value,
+                }
+                for rank, (user, value) in enumerate(
+                    leaderboard.top(self.metric, self.coordinator.top_n),
+                    start=1,
+                )
+            ],
+            ATTR_DUO_MEMBERS: len(ranking) if ranking is not None else 0,
         }
@@ -0,0 +1,96 @@
+"""Compiled translations for Duolingo entity names."""
+import logging
+import re
+from collections.abc import Mapping
+from functools import lru_cache
+from string import Formatter
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+_SENSORS_PREFIX = f"component.{DOMAIN}.common.sensors."
+_COURSES_PREFIX = f"component.{DOMAIN}.common.courses."
+
+_COURSE_KEY_PATTERN = re.compile(r"_(\w+)_")
+
+
+@lru_cache(maxsize=256)
+def course_translation_key(course_id: str) -> str:
+    """Return the translation key of a course id, e.g. ES for DUOLINGO_ES_EN."""
+    match = _COURSE_KEY_PATTERN.search(course_id)
+    return match.group(1) if match else course_id
+
+
+class NameTemplate:
+    """Translation string split once into literals and placeholders."""
+
+    __slots__ = ("_parts",)
+
+    def __init__(self, template: str) -> None:
+        """Compile the template."""
+        try:
+            self._parts = tuple(
+                (literal, field)
+                for literal, field, _, _ in Formatter().parse(template)
+            )
+        except ValueError:
+            # Unbalanced braces, keep the string as it is
+            self._parts = ((template, None),)
+
+    def render(self, values: Mapping[str, object]) -> str:
+        """Return the template with its placeholders replaced."""
+        return "".join(
+            literal + (
+                "" if field is None
+                else str(values[field]) if field in values
+                else f"{{{field}}}"
+            )
+            for literal, field in self._parts
+        )
+
+
+class DuolingoTranslations:
+    """Name templates and course names of one language."""
+
+    def __init__(
+            self,
+            language: str | None = None,
+            strings: Mapping[str, str] | None = None,
+    ) -> None:
+        """Compile the common translations of the integration."""
+        strings = strings or {}
+        self.language = language
+        self._templates = {
+            key.removeprefix(_SENSORS_PREFIX): NameTemplate(value)
+            for key, value in strings.items()
+            if key.startswith(_SENSORS_PREFIX)
+        }
+        self._courses = {
+            key.removeprefix(_COURSES_PREFIX): value
+            for key, value in strings.items()
+            if key.startswith(_COURSES_PREFIX)
+        }
+        self._course_names: dict[str, str] = {}
+
+    def sensor_name(
+            self,
+            alias: str,
+            values: Mapping[str, object],
+    ) -> str | None:
+        """Return the translated sensor name for an alias."""
+        template = self._templates.get(alias)
+        if template is None:
+            _LOGGER.warning(
+                "Translation missing for key: %s%s", _SENSORS_PREFIX, alias
+            )
+            return None
+        return template.render(values)
+
+    def course_name(self, course_id: str) -> str:
+        """Return the translated name of a course id."""
+        name = self._course_names.get(course_id)
+        if name is None:
+            key = course_translation_key(course_id)
+            name = self._course_names[course_id] = self._courses.get(key, key)
+        return name
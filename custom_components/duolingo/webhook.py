@@ -0,0 +1,124 @@
+"""Webhook receiving pushed Duolingo profiles."""
+from __future__ import annotations
+
+import logging
+from functools import partial
+from http import HTTPStatus
+from typing import TYPE_CHECKING
+
+import voluptuous as vol
+from aiohttp import hdrs, web
+from homeassistant.components import webhook
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.network import NoURLAvailableError
+from homeassistant.util import dt as dt_util
+
+from .api import COURSE_ID_FIELD, XP_GAINED_FIELD, pushed_user_to_dto
+from .const import DOMAIN
+from .resolver import normalize_username
+
+if TYPE_CHECKING:
+    from .coordinator import DuolingoDataUpdateCoordinator
+
+# A full or partial profile as served by Duolingo, or XP deltas. Fields not
+# read into a UserDto are allowed and ignored.
+PUSH_SCHEMA = vol.Schema(
+    {
+        vol.Required("id"): int,
+        vol.Optional("name"): str,
+        vol.Optional("username"): str,
+        vol.Optional("totalXp"): vol.All(int, vol.Range(min=0)),
+        vol.Optional("courses"): [
+            vol.Schema(
+                {vol.Required("id"): str, vol.Required("xp"): int},
+                extra=vol.ALLOW_EXTRA,
+            )
+        ],
+        vol.Optional("streakData"): vol.Schema(
+            {
+                vol.Optional("currentStreak"): vol.Any(
+                    None,
+                    vol.Schema(
+                        {
+                            vol.Optional("length"): int,
+                            vol.Optional("endDate"): str,
+                        },
+                        extra=vol.ALLOW_EXTRA,
+                    ),
+                ),
+            },
+            extra=vol.ALLOW_EXTRA,
+        ),
+        vol.Optional(XP_GAINED_FIELD): vol.All(int, vol.Range(min=0)),
+        vol.Optional(COURSE_ID_FIELD): str,
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+def webhook_url(hass: HomeAssistant, webhook_id: str) -> str:
+    """Return the URL of a webhook, only its path if no URL is configured."""
+    try:
+        return webhook.async_generate_url(hass, webhook_id)
+    except NoURLAvailableError:
+        return webhook.async_generate_path(webhook_id)
+
+
+@callback
+def async_set_webhook(
+        hass: HomeAssistant,
+        title: str,
+        webhook_id: str | None,
+        coordinator: DuolingoDataUpdateCoordinator,
+) -> None:
+    """Push profiles posted to a webhook to a coordinator.
+
+    The webhook registered for the coordinator before is unregistered, a
+    webhook_id of None only unregisters it.
+    """
+    if coordinator.webhook_id is not None:
+        webhook.async_unregister(hass, coordinator.webhook_id)
+    if webhook_id is not None:
+        webhook.async_register(
+            hass,
+            DOMAIN,
+            f"Duolingo {title}",
+            webhook_id,
+            partial(_async_handle_webhook, coordinator),
+            allowed_methods=[hdrs.METH_POST],
+        )
+    coordinator.webhook_id = webhook_id
+
+
+async def _async_handle_webhook(
+        coordinator: DuolingoDataUpdateCoordinator,
+        _hass: HomeAssistant,
+        _webhook_id: str,
+        request: web.Request,
+) -> web.Response | None:
+    """Validate a pushed profile and pass it to the entries of the user."""
+    try:
+        data = PUSH_SCHEMA(await request.json())
+    except (ValueError, vol.Invalid) as exception:
+        _LOGGER.debug("Invalid profile pushed: %s", exception)
+        return web.Response(
+            status=HTTPStatus.BAD_REQUEST, text=f"Invalid profile: {exception}"
+        )
+
+    identifiers = coordinator.identifiers
+    username = data.get("username")
+    if data["id"] != identifiers.id or (
+            username is not None
+            and normalize_username(username)
+            != normalize_username(identifiers.username)
+    ):
+        return web.Response(
+            status=HTTPStatus.BAD_REQUEST,
+            text="Profile of another user",
+        )
+
+    user = pushed_user_to_dto(data, coordinator.user, dt_util.now())
+    coordinator.hub.async_push_user(user)
+    return None
@@ -0,0 +1,178 @@
+"""Benchmark the profile decoder against full JSON decoding.
+
+Compares decode time and peak memory of ``decode_profile`` with the stdlib
+``json`` module and Home Assistant's ``json_loads`` on large profile
+documents. By default documents
+shaped like the full profile of a user with many courses are generated;
+recorded payloads can be given instead:
+
+    python script/bench_decode.py
+    python script/bench_decode.py --payload profile.json --payload other.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+from homeassistant.util.json import json_loads  # noqa: E402
+
+from custom_components.duolingo.decoder import (  # noqa: E402
+    PROFILE_SPEC,
+    decode_profile,
+    project,
+)
+
+DECODERS: dict[str, Callable[[bytes], object]] = {
+    "json": json.loads,
+    "json_loads": json_loads,
+    "projected": decode_profile,
+}
+
+
+# Learning languages of the generated courses, then numbered ones
+LANGUAGES = (
+    "ES", "FR", "DE", "IT", "PT", "NL", "GA", "SV", "DA", "NO", "JA", "KO",
+    "ZH", "TR", "EL", "HE", "HI", "VI", "PL", "CS", "RO", "UK",
+)
+
+
+def generate_profile(courses: int, skills: int, seed: int = 0) -> bytes:
+    """Return a full profile document of the given size, anonymized."""
+    rng = random.Random(seed)
+
+    def skill(index: int) -> dict:
+        return {
+            "id": f"{rng.getrandbits(128):032x}",
+            "name": f"Skill {index}",
+            "shortName": f"S{index}",
+            "finishedLevels": rng.randint(0, 5),
+            "finishedLessons": rng.randint(0, 20),
+            "levels": 5,
+            "lessons": 20,
+            "strength": rng.random(),
+            "iconId": rng.randint(0, 100),
+            "explanation": {"url": f"https://example.invalid/tips/{index}"},
+            "accessible": True,
+            "hasLevelReview": bool(rng.getrandbits(1)),
+        }
+
+    def course(index: int) -> dict:
+        language = LANGUAGES[index] if index < len(LANGUAGES) else f"L{index}"
+        return {
+            "id": f"DUOLINGO_{language}_EN",
+            "title": f"Language {index}",
+            "learningLanguage": language.lower(),
+            "fromLanguage": "en",
+            "xp": rng.randint(0, 100_000),
+            "crowns": rng.randint(0, 500),
+            "healthEnabled": True,
+            "placementTestAvailable": False,
+            "authorId": "duolingo",
+            "preload": False,
+        }
+
+    document = {
+        "id": 1,
+        "name": "Anonymous",
+        "username": "anonymous",
+        "totalXp": 123_456,
+        "bio": "",
+        "picture": "https://example.invalid/avatar",
+        "creationDate": 1_500_000_000,
+        "courses": [course(index) for index in range(courses)],
+        "currentCourse": {
+            "id": f"DUOLINGO_{LANGUAGES[0]}_EN",
+            "skills": [[skill(index)] for index in range(skills)],
+            "path": [
+                {"unitIndex": index, "levels": [skill(index)]}
+                for index in range(skills // 2)
+            ],
+        },
+        "streakData": {
+            "currentStreak": {
+                "startDate": "2024-01-01",
+                "endDate": "2024-06-01",
+                "length": 153,
+                "lastExtendedDate": "2024-06-01",
+            },
+            "previousStreak": {"startDate": "2023-01-01", "length": 10},
+            "xpGoal": 50,
+            "updatedTimestamp": 1_717_200_000,
+        },
+        "xpGains": [
+            {"time": 1_717_200_000 - index * 600, "xp": rng.randint(1, 40),
+             "eventType": "LESSON", "skillId": f"{index:032x}"}
+            for index in range(skills * 2)
+        ],
+        "achievements": [
+            {"name": f"achievement_{index}", "tier": rng.randint(0, 10)}
+            for index in range(100)
+        ],
+    }
+    return json.dumps(document).encode()
+
+
+def measure(
+        decoder: Callable[[bytes], object],
+        body: bytes,
+        runs: int,
+) -> tuple[float, float]:
+    """Return the median decode time in ms and the peak memory in KiB."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        decoder(body)
+        times.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    result = decoder(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return statistics.median(times), peak / 1024
+
+
+def main() -> int:
+    """Run the benchmark on generated or recorded payloads."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payload", action="append", type=Path, default=[])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    payloads = {path.name: path.read_bytes() for path in args.payload} or {
+        f"{courses} courses, {skills} skills": generate_profile(courses, skills)
+        for courses, skills in ((10, 100), (60, 400), (60, 2000))
+    }
+
+    for name, body in payloads.items():
+        expected = decode_profile(body)
+        print(f"{name} ({len(body) / 1024:.0f} KiB)")
+        for decoder_name, decoder in DECODERS.items():
+            elapsed, peak = measure(decoder, body, args.runs)
+            print(
+                f"  {decoder_name:<10} {elapsed:8.2f} ms"
+                f"   peak {peak:10.1f} KiB"
+            )
+        if project(expected, PROFILE_SPEC) != project(
+                json_loads(body), PROFILE_SPEC
+        ):
+            print("  FAIL: decoded profile differs from the full document")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Benchmark the load time of the Duolingo integration.
+
+Measures the cold import of the integration package, its config flow and
+platform modules, each in a fresh interpreter that has already imported the
+Home Assistant modules a running instance always has, and the wall time of
+``async_setup_entry`` against a local stub of the Duolingo API, both with a
+first refresh over the network and with a restored snapshot.
+
+Run from the repository root; requires requirements_test.txt:
+
+    python script/bench_load.py --max-import-ms 25
+
+Exits with status 1 when the median cold import of the package exceeds
+``--max-import-ms`` or the median setup exceeds ``--max-setup-ms``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Modules loaded by any running Home Assistant before the integration
+PRELOADED = (
+    "homeassistant.core",
+    "homeassistant.config_entries",
+    "homeassistant.helpers.aiohttp_client",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.translation",
+    "homeassistant.helpers.update_coordinator",
+    "homeassistant.components.binary_sensor",
+    "homeassistant.components.sensor",
+)
+
+# Module groups imported one after another in each cold import run
+IMPORT_STEPS = {
+    "package": ("custom_components.duolingo",),
+    "config_flow": ("custom_components.duolingo.config_flow",),
+    "platforms": (
+        "custom_components.duolingo.binary_sensor",
+        "custom_components.duolingo.sensor",
+    ),
+}
+
+_IMPORT_PROBE = """
+import importlib, json, sys, time
+sys.path.insert(0, {root!r})
+for name in {preloaded!r}:
+    importlib.import_module(name)
+result = {{}}
+for step, modules in {steps!r}.items():
+    start = time.perf_counter()
+    for name in modules:
+        importlib.import_module(name)
+    result[step] = (time.perf_counter() - start) * 1000
+print(json.dumps(result))
+"""
+
+PROFILE = {
+    "name": "Bench",
+    "username": "bench",
+    "totalXp": 12345,
+    "courses": [
+        {"id": "DUOLINGO_ES_EN", "xp": 5000},
+        {"id": "DUOLINGO_FR_EN", "xp": 7345},
+    ],
+    "streakData": {"currentStreak": {"length": 42, "endDate": "2000-01-01"}},
+}
+
+
+def measure_imports(runs: int) -> dict[str, list[float]]:
+    """Return the cold import times in ms of each step over all runs."""
+    probe = _IMPORT_PROBE.format(
+        root=str(ROOT), preloaded=PRELOADED, steps=IMPORT_STEPS
+    )
+    times: dict[str, list[float]] = {step: [] for step in IMPORT_STEPS}
+    for _ in range(runs):
+        output = subprocess.run(  # noqa: S603 - runs the probe above
+            [sys.executable, "-c", probe],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        for step, value in json.loads(output).items():
+            times[step].append(value)
+    return times
+
+
+async def _async_start_api(delay: float) -> tuple[object, str]:
+    """Start a stub of the profile endpoint, return its runner and URL."""
+    # Only needed by the setup runs
+    from aiohttp import web  # noqa: PLC0415
+
+    async def user(request: web.Request) -> web.Response:
+        await asyncio.sleep(delay)
+        return web.json_response(
+            {**PROFILE, "id": int(request.match_info["id"])}
+        )
+
+    app = web.Application()
+    app.router.add_get("/users/{id}", user)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # noqa: SLF001
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def async_measure_setup(
+        runs: int,
+        delay: float,
+) -> dict[str, list[float]]:
+    """Return the setup times in ms with a network refresh and a snapshot."""
+    # The cold import runs need neither the test requirements nor the
+    # integration in this interpreter
+    from pytest_homeassistant_custom_component.common import (  # noqa: PLC0415
+        MockConfigEntry,
+        async_test_home_assistant,
+    )
+
+    # isort: split
+    # homeassistant.loader cannot be imported before homeassistant.core
+    from homeassistant import loader  # noqa: PLC0415
+
+    from custom_components.duolingo.api import DuolingoApi  # noqa: PLC0415
+    from custom_components.duolingo.const import DOMAIN  # noqa: PLC0415
+    from custom_components.duolingo.coordinator import (  # noqa: PLC0415
+        SNAPSHOT_FETCHED_AT,
+        SNAPSHOT_USER,
+        snapshot_store,
+    )
+    from custom_components.duolingo.dto import UserDto  # noqa: PLC0415
+
+    runner, DuolingoApi.BASE_URL = await _async_start_api(delay)
+    times: dict[str, list[float]] = {"network": [], "snapshot": []}
+    with tempfile.TemporaryDirectory() as config_dir:
+        async with async_test_home_assistant(storage_dir=config_dir) as hass:
+            hass.data.pop(loader.DATA_CUSTOM_COMPONENTS)
+            for run in range(runs):
+                for mode, result in times.items():
+                    user_id = run * len(times) + len(result) + 1
+                    entry = MockConfigEntry(
+                        domain=DOMAIN,
+                        data={"id": user_id, "name": "Bench", "username": "bench"},
+                    )
+                    entry.add_to_hass(hass)
+                    if mode == "snapshot":
+                        await snapshot_store(hass, entry.entry_id).async_save({
+                            SNAPSHOT_USER: UserDto.from_dict(
+                                {UserDto.ID_KEY: user_id}
+                            ).to_dict,
+                            SNAPSHOT_FETCHED_AT: "2000-01-01T00:00:00+00:00",
+                        })
+
+                    start = time.perf_counter()
+                    assert await hass.config_entries.async_setup(entry.entry_id)
+                    result.append((time.perf_counter() - start) * 1000)
+
+                    await hass.async_block_till_done()
+                    await hass.config_entries.async_unload(entry.entry_id)
+            await hass.async_stop(force=True)
+    await runner.cleanup()
+    return times
+
+
+def _report(title: str, times: dict[str, list[float]]) -> None:
+    """Print the median, min and max of each measurement."""
+    print(title)
+    for name, values in times.items():
+        print(
+            f"  {name:<12} median {statistics.median(values):8.2f} ms"
+            f"   min {min(values):8.2f}   max {max(values):8.2f}"
+        )
+
+
+def main() -> int:
+    """Run the benchmark and check the thresholds."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument(
+        "--latency", type=float, default=0.05,
+        help="response delay of the stub API in seconds",
+    )
+    parser.add_argument("--max-import-ms", type=float, default=25.0)
+    parser.add_argument("--max-setup-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    imports = measure_imports(args.runs)
+    _report(f"Cold import ({args.runs} runs)", imports)
+    setups = asyncio.run(async_measure_setup(args.runs, args.latency))
+    _report(
+        f"async_setup_entry ({args.runs} runs, {args.latency * 1000:.0f} ms "
+        "API latency, first run includes the platform imports)",
+        setups,
+    )
+
+    failed = False
+    package = statistics.median(imports["package"])
+    if package > args.max_import_ms:
+        print(f"FAIL: cold import {package:.2f} ms > {args.max_import_ms} ms")
+        failed = True
+    if args.max_setup_ms is not None:
+        for name, values in setups.items():
+            setup = statistics.median(values)
+            if setup > args.max_setup_ms:
+                print(
+                    f"FAIL: {name} setup {setup:.2f} ms > {args.max_setup_ms} ms"
+                )
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
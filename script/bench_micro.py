@@ -0,0 +1,392 @@
+"""Microbenchmarks of the parse and entity hot paths.
+
+Runs on the anonymized profile payloads in script/payloads (1, 10 and 60
+courses, full and projected documents) and compares the results with the
+stored baseline:
+
+    python script/bench_micro.py                    # compare, exit 1 on regression
+    python script/bench_micro.py --save-baseline    # record a new baseline
+    python script/bench_micro.py --generate-payloads
+
+Timings are the median of several repeats, in microseconds per call. A
+benchmark regressed when it is slower than its baseline by more than the
+threshold of its kind and by more than NOISE_FLOOR. Baselines are only
+comparable on the machine they were recorded on, record a new one before
+comparing changes on another machine.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Self
+from zoneinfo import ZoneInfo
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+from custom_components.duolingo.api import _user_data_to_dto  # noqa: E402
+from custom_components.duolingo.coordinator import (  # noqa: E402
+    AttributeSnapshots,
+)
+from custom_components.duolingo.decoder import (  # noqa: E402
+    PROFILE_SPEC,
+    decode_profile,
+    project,
+)
+from custom_components.duolingo.dto import (  # noqa: E402
+    UserDto,
+    UserIdentifiersDto,
+)
+from custom_components.duolingo.sensor import (  # noqa: E402
+    COURSE_SENSORS,
+    DuolingoCourseSensor,
+)
+from custom_components.duolingo.translations import (  # noqa: E402
+    DuolingoTranslations,
+)
+
+PAYLOADS = Path(__file__).resolve().parent / "payloads"
+BASELINE = Path(__file__).resolve().parent / "bench_micro_baseline.json"
+TRANSLATIONS = ROOT / "custom_components" / "duolingo" / "translations"
+
+# Allowed slowdown against the baseline by benchmark name prefix. Refreshes
+# run through the event loop and the store and vary more between runs.
+DEFAULT_THRESHOLD = 0.4
+THRESHOLDS = {
+    "refresh_": 0.6,
+}
+# Slowdown in microseconds below which no benchmark counts as regressed,
+# sub-microsecond calls easily vary by that much
+NOISE_FLOOR = 2.0
+
+# Courses and skills of the generated payloads
+SIZES = {1: 20, 10: 60, 60: 150}
+KINDS = ("full", "projected")
+
+TZ = ZoneInfo("Europe/Kyiv")
+
+
+def payload_path(courses: int, kind: str) -> Path:
+    """Return the file of a payload."""
+    return PAYLOADS / f"profile_{courses}_courses_{kind}.json"
+
+
+def generate_payloads() -> None:
+    """Write the anonymized payloads, full and projected, of every size."""
+    # Generating payloads is rare, the benchmarks do not load the generator
+    from bench_decode import generate_profile  # noqa: PLC0415
+
+    PAYLOADS.mkdir(exist_ok=True)
+    for courses, skills in SIZES.items():
+        document = json.loads(generate_profile(courses, skills))
+        for kind, data in (
+                ("full", document),
+                ("projected", project(document, PROFILE_SPEC)),
+        ):
+            payload_path(courses, kind).write_text(
+                json.dumps(data, separators=(",", ":")) + "\n"
+            )
+
+
+def median_of(
+        func: Callable[[], object],
+        repeat: int,
+        target: float = 0.05,
+) -> float:
+    """Return the median time of func in microseconds per call.
+
+    Each repeat runs func for about target seconds.
+    """
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * target / elapsed))
+    return statistics.median(
+        timer.repeat(repeat=repeat, number=number)
+    ) / number * 1e6
+
+
+def _translations() -> DuolingoTranslations:
+    """Return the compiled English translations."""
+    strings = json.loads((TRANSLATIONS / "en.json").read_text())["common"]
+    return DuolingoTranslations("en", {
+        f"component.duolingo.common.{group}.{key}": value
+        for group, values in strings.items()
+        for key, value in values.items()
+    })
+
+
+def sync_benchmarks(repeat: int) -> Iterator[tuple[str, float]]:
+    """Yield the names and results of the benchmarks without event loop."""
+    today = datetime.now(TZ)
+    translations = _translations()
+
+    for courses, kind in itertools.product(SIZES, KINDS):
+        body = payload_path(courses, kind).read_bytes()
+        suffix = f"{courses}_courses_{kind}"
+        yield f"decode_profile[{suffix}]", median_of(
+            lambda body=body: decode_profile(body), repeat
+        )
+        data = decode_profile(body)
+        yield f"user_data_to_dto[{suffix}]", median_of(
+            lambda data=data: _user_data_to_dto(data, today), repeat
+        )
+
+        if kind != "full":
+            continue
+        user = _user_data_to_dto(data, today)
+        as_dict = user.to_dict
+        yield f"dto_from_dict[{courses}_courses]", median_of(
+            lambda as_dict=as_dict: UserDto.from_dict(as_dict), repeat
+        )
+        yield f"dto_to_dict[{courses}_courses]", median_of(
+            lambda user=user: user.to_dict, repeat
+        )
+
+        coordinator = SimpleNamespace(
+            data=user,
+            user=user,
+            identifiers=UserIdentifiersDto(user.id, user.name, user.username),
+            translations=translations,
+            snapshot_time=None,
+        )
+        coordinator.attribute_snapshots = AttributeSnapshots(coordinator)
+        sensor = DuolingoCourseSensor(
+            coordinator,
+            SimpleNamespace(),
+            COURSE_SENSORS[0],
+            next(iter(user.courses_xp)),
+        )
+        yield f"translation_sensors[{courses}_courses]", median_of(
+            lambda sensor=sensor: sensor.translation_sensors(
+                "course_xp", {"name": "Anonymous", "course_name": "Spanish"}
+            ),
+            repeat,
+        )
+        yield f"course_sensor_name[{courses}_courses]", median_of(
+            lambda sensor=sensor: sensor.name, repeat
+        )
+        yield f"course_sensor_attributes[{courses}_courses]", median_of(
+            lambda sensor=sensor: sensor.extra_state_attributes, repeat
+        )
+
+
+class _FakeResponse:
+    """Response of the fake session, always 200 with the given body."""
+
+    status = 200
+    headers: dict[str, str] = {}  # noqa: RUF012
+
+    def __init__(self, body: bytes) -> None:
+        self._body = body
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        return None
+
+    def raise_for_status(self) -> None:
+        return None
+
+    async def read(self) -> bytes:
+        return self._body
+
+
+class FakeSession:
+    """Session answering every request with the next of the given bodies."""
+
+    def __init__(self, bodies: list[bytes]) -> None:
+        """Initialize."""
+        self.requests = 0
+        self._bodies = itertools.cycle(bodies)
+
+    def get(self, _url: str, **_kwargs: object) -> _FakeResponse:
+        """Count the request and answer it with the next body."""
+        self.requests += 1
+        return _FakeResponse(next(self._bodies))
+
+
+async def async_refresh_benchmarks(
+        iterations: int,
+        repeat: int,
+) -> list[tuple[str, float]]:
+    """Return the time of a coordinator refresh per payload size.
+
+    The result is the mean over the median of repeat batches of iterations.
+    """
+    # Only the refresh benchmarks need the test requirements
+    from pytest_homeassistant_custom_component.common import (  # noqa: PLC0415
+        async_test_home_assistant,
+    )
+
+    from custom_components.duolingo import hub as hub_module  # noqa: PLC0415
+    from custom_components.duolingo.const import SENSOR  # noqa: PLC0415
+    from custom_components.duolingo.coordinator import (  # noqa: PLC0415
+        DuolingoDataUpdateCoordinator,
+    )
+    from custom_components.duolingo.hub import DuolingoHub  # noqa: PLC0415
+
+    # Refreshes right after a fetch would be served from its result, the
+    # benchmark measures the polls
+    hub_module.FRESHNESS_WINDOW = timedelta()
+    results = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        async with async_test_home_assistant(storage_dir=config_dir) as hass:
+            for courses, kind in itertools.product(SIZES, KINDS):
+                body = payload_path(courses, kind).read_bytes()
+                document = json.loads(body)
+                bumped = json.dumps(
+                    {**document, "totalXp": document["totalXp"] + 1}
+                ).encode()
+
+                for name, bodies in (
+                        ("changed", [body, bumped]),
+                        ("unchanged", [body]),
+                ):
+                    hub = DuolingoHub(hass)
+                    hub._session = FakeSession(bodies)  # noqa: SLF001
+                    coordinator = DuolingoDataUpdateCoordinator(
+                        hass,
+                        hub,
+                        UserIdentifiersDto(document["id"], "Anonymous", "anon"),
+                        f"bench_{courses}_{kind}_{name}",
+                    )
+                    coordinator.platforms.append(SENSOR)
+                    await coordinator.async_refresh()
+
+                    batches = []
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        for _ in range(iterations):
+                            await coordinator.async_refresh()
+                        batches.append(time.perf_counter() - start)
+                    assert coordinator.last_update_success
+                    results.append((
+                        f"refresh_{name}[{courses}_courses_{kind}]",
+                        statistics.median(batches) / iterations * 1e6,
+                    ))
+                    hub.async_unregister(coordinator)
+                    await coordinator.async_shutdown()
+            await hass.async_stop(force=True)
+    return results
+
+
+def run(args: argparse.Namespace) -> dict[str, float]:
+    """Run all benchmarks once."""
+    results = dict(sync_benchmarks(args.repeat))
+    results.update(
+        asyncio.run(async_refresh_benchmarks(args.iterations, args.repeat))
+    )
+    return results
+
+
+def threshold_of(name: str) -> float:
+    """Return the allowed relative slowdown of a benchmark."""
+    return next(
+        (
+            threshold for prefix, threshold in THRESHOLDS.items()
+            if name.startswith(prefix)
+        ),
+        DEFAULT_THRESHOLD,
+    )
+
+
+def _regressions(
+        results: dict[str, float],
+        baseline: dict[str, float],
+        threshold: float | None,
+) -> list[str]:
+    """Return the benchmarks slower than their baseline beyond the noise.
+
+    A threshold of None applies the threshold of every benchmark's kind.
+    """
+    return [
+        name for name, value in results.items()
+        if name in baseline
+        and value - baseline[name] > max(
+            NOISE_FLOOR,
+            baseline[name] * (
+                threshold_of(name) if threshold is None else threshold
+            ),
+        )
+    ]
+
+
+def main() -> int:
+    """Run the benchmarks and compare them with the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument(
+        "--threshold", type=float, default=None,
+        help=(
+            "allowed slowdown of every benchmark against the baseline, 0.25"
+            " for 25%%, instead of the threshold of its kind"
+        ),
+    )
+    parser.add_argument(
+        "--retries", type=int, default=2,
+        help="runs repeated while benchmarks exceed the threshold",
+    )
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--generate-payloads", action="store_true")
+    args = parser.parse_args()
+
+    if args.generate_payloads:
+        generate_payloads()
+        return 0
+
+    results = run(args)
+
+    if args.save_baseline:
+        BASELINE.write_text(
+            json.dumps(
+                {name: round(value, 3) for name, value in results.items()},
+                indent=2,
+            ) + "\n"
+        )
+        print(f"Baseline of {len(results)} benchmarks saved to {BASELINE.name}")
+        return 0
+
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    for _ in range(args.retries):
+        # Measure again to tell regressions from noise, keeping the best
+        if not _regressions(results, baseline, args.threshold):
+            break
+        for name, value in run(args).items():
+            results[name] = min(results[name], value)
+
+    regressions = _regressions(results, baseline, args.threshold)
+    for name, value in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:<48} {value:12.2f} us   (no baseline)")
+            continue
+        change = value / reference - 1
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:<48} {value:12.2f} us   {change:+7.1%}{flag}")
+
+    if regressions:
+        print(
+            f"FAIL: {len(regressions)} benchmarks are slower than the "
+            "baseline by more than their threshold"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
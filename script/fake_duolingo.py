@@ -0,0 +1,403 @@
+"""Local stand-in for the Duolingo profile API.
+
+Serves ``/2017-06-30/users?username=``, ``/2017-06-30/users/{id}`` and
+``/2017-06-30/friends/users/{id}/following`` with synthetic, anonymized
+profiles of a configurable size, honours ``fields=``
+projections and ``If-None-Match``, and injects latency, server errors and
+rate limiting. Real responses can be recorded through it and replayed
+later:
+
+    python script/fake_duolingo.py --port 8080 --latency 0.2 --error-rate 0.05
+    python script/fake_duolingo.py --record recorded/ --upstream https://www.duolingo.com
+    python script/fake_duolingo.py --replay recorded/
+
+Point the integration at it by setting ``DuolingoApi.BASE_URL`` to
+``http://127.0.0.1:8080/2017-06-30``. Recorded responses contain the real
+profiles of the requested users, keep them out of the repository.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+from aiohttp import ClientSession, hdrs, web
+from bench_decode import generate_profile
+
+API_PATH = "/2017-06-30"
+
+# Response headers kept in recordings
+_RECORDED_HEADERS = (hdrs.CONTENT_TYPE, hdrs.ETAG, hdrs.LAST_MODIFIED)
+# Users followed by every user
+FOLLOWING_COUNT = 5
+
+
+@dataclass(slots=True)
+class FakeConfig:
+    """Behaviour of the fake server."""
+
+    # Response delay in seconds, plus a uniform random part up to jitter
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Size of the synthetic profiles
+    courses: int = 10
+    skills: int = 60
+    # Probability that a profile request gains XP before it is answered
+    activity: float = 0.1
+    # Probability of answering with 503
+    error_rate: float = 0.0
+    # Requests per second answered before 429s, 0 for no limit
+    rate_limit: float = 0.0
+    burst: int = 10
+    # Directory to record upstream responses to or to replay them from
+    record: Path | None = None
+    replay: Path | None = None
+    upstream: str = "https://www.duolingo.com"
+    seed: int = 0
+
+
+def parse_fields(fields: str) -> dict[str, dict | None]:
+    """Parse a ``fields=`` projection like ``id,courses{id,xp}``."""
+    spec: dict[str, dict | None] = {}
+    stack = [spec]
+    name = ""
+    for char in [*fields, ","]:
+        if char in ",{}":
+            if name:
+                stack[-1][name.strip()] = None
+            if char == "{":
+                stack[-1][name.strip()] = nested = {}
+                stack.append(nested)
+            elif char == "}":
+                stack.pop()
+            name = ""
+        else:
+            name += char
+    return spec
+
+
+def project(value: object, spec: dict | None) -> object:
+    """Return the parts of value selected by a parsed projection."""
+    if spec is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, spec) for item in value]
+    if isinstance(value, dict):
+        return {
+            key: project(value[key], nested)
+            for key, nested in spec.items()
+            if key in value
+        }
+    return value
+
+
+class _TokenBucket:
+    """Rate limiter allowing rate requests per second after a burst."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token, return 0 or the seconds until one is available."""
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class FakeDuolingo:
+    """aiohttp application serving the profile endpoints."""
+
+    def __init__(self, config: FakeConfig) -> None:
+        """Initialize."""
+        self.config = config
+        # Requests per endpoint and per answered status
+        self.requests: Counter[str] = Counter()
+        self.statuses: Counter[int] = Counter()
+        self.bytes_sent = 0
+        self._random = random.Random(config.seed)
+        self._bucket = (
+            _TokenBucket(config.rate_limit, config.burst)
+            if config.rate_limit else None
+        )
+        self._profiles: dict[int, dict] = {}
+        self._usernames: dict[int, str] = {}
+        self._bodies: dict[tuple[int, str], bytes] = {}
+        self._upstream: ClientSession | None = None
+
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.router.add_get(f"{API_PATH}/users", self._users)
+        self.app.router.add_get(f"{API_PATH}/users/{{id}}", self._user)
+        self.app.router.add_get(
+            f"{API_PATH}/friends/users/{{id}}/following", self._following
+        )
+        self.app.on_cleanup.append(self._async_close_upstream)
+
+    @web.middleware
+    async def _middleware(
+            self,
+            request: web.Request,
+            handler: object,
+    ) -> web.StreamResponse:
+        """Apply latency, rate limiting, errors, record and replay."""
+        resource = request.match_info.route.resource
+        self.requests[resource.canonical if resource else request.path] += 1
+        config = self.config
+        if config.latency or config.jitter:
+            await asyncio.sleep(
+                config.latency + self._random.uniform(0, config.jitter)
+            )
+
+        if self._bucket is not None and (wait := self._bucket.take()):
+            response = web.Response(
+                status=429, headers={hdrs.RETRY_AFTER: str(math.ceil(wait))}
+            )
+        elif self._random.random() < config.error_rate:
+            response = web.Response(status=503)
+        elif config.replay is not None:
+            response = self._replay(request)
+        elif config.record is not None:
+            response = await self._async_record(request)
+        else:
+            response = await handler(request)
+
+        self.statuses[response.status] += 1
+        self.bytes_sent += len(response.body or b"")
+        return response
+
+    async def _users(self, request: web.Request) -> web.Response:
+        """Answer the lookup of a user id by username."""
+        username = request.query.get("username", "")
+        if not username:
+            return web.json_response({"users": []})
+        # Stable id per username, the profile then has the same username
+        user_id = int.from_bytes(
+            hashlib.blake2b(username.encode(), digest_size=4).digest()
+        )
+        self._usernames[user_id] = username
+        return web.json_response({
+            "users": [{"id": user_id, "name": username.title(),
+                       "username": username}],
+        })
+
+    async def _user(self, request: web.Request) -> web.Response:
+        """Answer a profile, honouring projections and If-None-Match."""
+        try:
+            user_id = int(request.match_info["id"])
+        except ValueError:
+            return web.Response(status=404)
+
+        profile = self._profiles.get(user_id)
+        if profile is None:
+            profile = self._profiles[user_id] = json.loads(
+                generate_profile(
+                    self.config.courses, self.config.skills, seed=user_id
+                )
+            )
+            username = self._usernames.get(user_id, f"user{user_id}")
+            profile.update(id=user_id, name=username.title(), username=username)
+        elif self._random.random() < self.config.activity:
+            self._gain_xp(user_id, profile)
+
+        fields = request.query.get("fields", "")
+        body = self._bodies.get((user_id, fields))
+        if body is None:
+            data = project(profile, parse_fields(fields)) if fields else profile
+            body = self._bodies[user_id, fields] = json.dumps(data).encode()
+
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        if request.headers.get(hdrs.IF_NONE_MATCH) == etag:
+            return web.Response(status=304, headers={hdrs.ETAG: etag})
+        return web.Response(
+            body=body,
+            content_type="application/json",
+            headers={hdrs.ETAG: etag},
+        )
+
+    async def _following(self, request: web.Request) -> web.Response:
+        """Answer the users a user follows, the same ones on every request."""
+        try:
+            user_id = int(request.match_info["id"])
+        except ValueError:
+            return web.Response(status=404)
+        followed = random.Random(user_id).sample(range(1, 10_000), FOLLOWING_COUNT)
+        users = []
+        for followed_id in followed:
+            username = self._usernames.get(followed_id, f"user{followed_id}")
+            users.append({
+                "userId": followed_id,
+                "displayName": username.title(),
+                "username": username,
+            })
+        return web.json_response({"following": {"users": users}})
+
+    def _gain_xp(self, user_id: int, profile: dict) -> None:
+        """Add the XP of a lesson to a random course of a profile."""
+        xp = self._random.randint(5, 40)
+        profile["totalXp"] += xp
+        if profile["courses"]:
+            self._random.choice(profile["courses"])["xp"] += xp
+        for key in [key for key in self._bodies if key[0] == user_id]:
+            del self._bodies[key]
+
+    def _recording(self, request: web.Request) -> Path:
+        """Return the file of the recording of a request."""
+        directory = self.config.record or self.config.replay
+        key = hashlib.blake2b(
+            request.rel_url.path_qs.encode(), digest_size=16
+        ).hexdigest()
+        return directory / f"{key}.json"
+
+    def _replay(self, request: web.Request) -> web.Response:
+        """Answer with a recorded response, 404 if there is none."""
+        path = self._recording(request)
+        if not path.exists():
+            return web.Response(status=404)
+        recording = json.loads(path.read_text())
+        headers = recording["headers"]
+        if (
+                hdrs.ETAG in headers
+                and request.headers.get(hdrs.IF_NONE_MATCH) == headers[hdrs.ETAG]
+        ):
+            return web.Response(status=304, headers={hdrs.ETAG: headers[hdrs.ETAG]})
+        return web.Response(
+            status=recording["status"],
+            body=recording["body"].encode(),
+            headers=headers,
+        )
+
+    async def _async_record(self, request: web.Request) -> web.Response:
+        """Forward a request upstream and record the response."""
+        if self._upstream is None:
+            self._upstream = ClientSession()
+        async with self._upstream.get(
+                f"{self.config.upstream.rstrip('/')}{request.rel_url}",
+                headers={
+                    key: value for key, value in request.headers.items()
+                    if key in (hdrs.USER_AGENT, hdrs.ACCEPT)
+                },
+        ) as upstream:
+            body = await upstream.read()
+            headers = {
+                key: upstream.headers[key]
+                for key in _RECORDED_HEADERS if key in upstream.headers
+            }
+            status = upstream.status
+
+        self.config.record.mkdir(parents=True, exist_ok=True)
+        self._recording(request).write_text(json.dumps({
+            "url": str(request.rel_url),
+            "status": status,
+            "headers": headers,
+            "body": body.decode(),
+        }))
+        return web.Response(status=status, body=body, headers=headers)
+
+    async def _async_close_upstream(self, _app: web.Application) -> None:
+        """Close the session of the recorder."""
+        if self._upstream is not None:
+            await self._upstream.close()
+
+
+async def async_start(
+        config: FakeConfig,
+        host: str = "127.0.0.1",
+        port: int = 0,
+) -> tuple[FakeDuolingo, web.AppRunner, str]:
+    """Start a fake server, return it, its runner and the API base URL."""
+    server = FakeDuolingo(config)
+    runner = web.AppRunner(server.app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # noqa: SLF001
+    return server, runner, f"http://{host}:{port}{API_PATH}"
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options of FakeConfig to a parser."""
+    defaults = FakeConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--courses", type=int, default=defaults.courses)
+    parser.add_argument("--skills", type=int, default=defaults.skills)
+    parser.add_argument(
+        "--activity", type=float, default=defaults.activity,
+        help="probability that a profile gained XP since the last request",
+    )
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument(
+        "--rate-limit", type=float, default=defaults.rate_limit,
+        help="requests per second before answering 429, 0 for no limit",
+    )
+    parser.add_argument("--burst", type=int, default=defaults.burst)
+    parser.add_argument("--record", type=Path, default=None)
+    parser.add_argument("--replay", type=Path, default=None)
+    parser.add_argument("--upstream", default=defaults.upstream)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeConfig:
+    """Return the FakeConfig given on the command line."""
+    return FakeConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        courses=args.courses,
+        skills=args.skills,
+        activity=args.activity,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+        record=args.record,
+        replay=args.replay,
+        upstream=args.upstream,
+        seed=args.seed,
+    )
+
+
+async def _async_serve(config: FakeConfig, host: str, port: int) -> None:
+    """Serve until interrupted, then print the request counts."""
+    server, runner, url = await async_start(config, host, port)
+    print(f"Serving {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        print(f"Requests: {dict(server.requests)}")
+        print(f"Statuses: {dict(server.statuses)}")
+
+
+def main() -> int:
+    """Run the fake server."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.record is not None and args.replay is not None:
+        parser.error("--record and --replay are exclusive")
+
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_async_serve(config_from_args(args), args.host, args.port))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+"""Drive many Duolingo coordinators against the fake API.
+
+Creates ``--entries`` coordinators over ``--users`` distinct user ids on one
+hub, so entries of the same user share their fetches, and refreshes all of
+them for ``--rounds`` rounds. The fake server of fake_duolingo.py runs on
+its own thread and event loop, or ``--url`` points at one started
+separately, e.g. to replay recorded responses:
+
+    python script/load_test.py --entries 50 --users 40 --latency 0.3
+    python script/load_test.py --entries 50 --rate-limit 5 --burst 10
+    python script/load_test.py --entries 20 --url http://127.0.0.1:8080/2017-06-30
+
+Reports the requests the server answered per status, the refresh latency
+percentiles, the failed refreshes per exception, the event loop lag and the
+wait of jobs queued on the executor.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from datetime import timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fake_duolingo import (  # noqa: E402
+    FakeDuolingo,
+    add_arguments,
+    async_start,
+    config_from_args,
+)
+
+# Period of the event loop and executor probes in seconds
+LOOP_PROBE_INTERVAL = 0.005
+EXECUTOR_PROBE_INTERVAL = 0.05
+# Event loop lag from which the loop counts as blocked, in seconds
+BLOCKED_THRESHOLD = 0.01
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ServerThread:
+    """Fake server running on its own thread and event loop."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        """Start the server and wait until it listens."""
+        self.server: FakeDuolingo | None = None
+        self._loop = asyncio.new_event_loop()
+        started: Future[str] = Future()
+
+        async def async_start_server() -> None:
+            try:
+                self.server, self._runner, url = await async_start(
+                    config_from_args(args)
+                )
+            except Exception as err:  # noqa: BLE001
+                started.set_exception(err)
+            else:
+                started.set_result(url)
+
+        def run() -> None:
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(async_start_server())
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        self.url = started.result()
+
+    def stop(self) -> None:
+        """Stop the server and its thread."""
+        asyncio.run_coroutine_threadsafe(
+            self._runner.cleanup(), self._loop
+        ).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+class LoopMonitor:
+    """Measure the lag of the event loop and the wait of executor jobs."""
+
+    def __init__(self, hass: object) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.lags: list[float] = []
+        self.executor_waits: list[float] = []
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start probing."""
+        self._tasks = [
+            asyncio.create_task(self._async_probe_loop()),
+            asyncio.create_task(self._async_probe_executor()),
+        ]
+
+    async def stop(self) -> None:
+        """Stop probing."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    @property
+    def blocked(self) -> float:
+        """Return the total lag of the loop above the threshold, in seconds."""
+        return sum(lag for lag in self.lags if lag >= BLOCKED_THRESHOLD)
+
+    async def _async_probe_loop(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(LOOP_PROBE_INTERVAL)
+            self.lags.append(
+                time.perf_counter() - start - LOOP_PROBE_INTERVAL
+            )
+
+    async def _async_probe_executor(self) -> None:
+        while True:
+            start = time.perf_counter()
+            started = await self.hass.async_add_executor_job(time.perf_counter)
+            self.executor_waits.append(started - start)
+            await asyncio.sleep(EXECUTOR_PROBE_INTERVAL)
+
+
+async def async_run(args: argparse.Namespace, url: str) -> dict[str, object]:
+    """Refresh all coordinators for all rounds, return the measurements."""
+    # Imported once the fake server runs, which needs none of them
+    from pytest_homeassistant_custom_component.common import (  # noqa: PLC0415
+        async_test_home_assistant,
+    )
+
+    from custom_components.duolingo import hub as hub_module  # noqa: PLC0415
+    from custom_components.duolingo.api import DuolingoApi  # noqa: PLC0415
+    from custom_components.duolingo.const import PLATFORMS  # noqa: PLC0415
+    from custom_components.duolingo.coordinator import (  # noqa: PLC0415
+        DuolingoDataUpdateCoordinator,
+    )
+    from custom_components.duolingo.dto import (  # noqa: PLC0415
+        UserIdentifiersDto,
+    )
+    from custom_components.duolingo.hub import DuolingoHub  # noqa: PLC0415
+    from custom_components.duolingo.metrics import (  # noqa: PLC0415
+        SHORT_CIRCUITED,
+    )
+
+    DuolingoApi.BASE_URL = url
+    # Rounds follow each other within the freshness window, whose results
+    # would be served without a request. The load test exercises the API.
+    hub_module.FRESHNESS_WINDOW = timedelta()
+    rng = random.Random(args.seed)
+    latencies: list[float] = []
+    failures: Counter[str] = Counter()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        async with async_test_home_assistant(storage_dir=config_dir) as hass:
+            hub = DuolingoHub(hass)
+            hub.async_set_max_concurrent("load", args.max_concurrent)
+            coordinators = []
+            for index in range(args.entries):
+                user_id = 1 + index % args.users
+                coordinator = DuolingoDataUpdateCoordinator(
+                    hass,
+                    hub,
+                    UserIdentifiersDto(user_id, f"User {user_id}", f"user{user_id}"),
+                    f"load_{index}",
+                )
+                coordinator.platforms.extend(PLATFORMS)
+                coordinators.append(coordinator)
+
+            async def async_refresh(
+                    coordinator: DuolingoDataUpdateCoordinator,
+                    delay: float,
+            ) -> None:
+                await asyncio.sleep(delay)
+                start = time.perf_counter()
+                await coordinator.async_refresh()
+                latencies.append(time.perf_counter() - start)
+                if not coordinator.last_update_success:
+                    error = coordinator.last_exception
+                    cause = error.__cause__ if error is not None else None
+                    failures[type(cause or error).__name__] += 1
+
+            monitor = LoopMonitor(hass)
+            monitor.start()
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                await asyncio.gather(*(
+                    async_refresh(coordinator, rng.uniform(0, args.spread))
+                    for coordinator in coordinators
+                ))
+                await asyncio.sleep(args.pause)
+            elapsed = time.perf_counter() - start
+            await monitor.stop()
+
+            short_circuited = sum(
+                hub.api(user_id).metrics.counters[SHORT_CIRCUITED]
+                for user_id in {c.identifiers.id for c in coordinators}
+            )
+            breaker = hub.breaker.state
+            for coordinator in coordinators:
+                hub.async_unregister(coordinator)
+                await coordinator.async_shutdown()
+            await hass.async_stop(force=True)
+
+    return {
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "failures": failures,
+        "short_circuited": short_circuited,
+        "breaker": breaker,
+        "monitor": monitor,
+    }
+
+
+def _report(
+        args: argparse.Namespace,
+        result: dict[str, object],
+        server: FakeDuolingo | None,
+) -> None:
+    """Print the measurements."""
+    latencies = result["latencies"]
+    monitor = result["monitor"]
+    print(
+        f"{args.entries} entries of {args.users} users, {args.rounds} rounds "
+        f"in {result['elapsed']:.2f} s"
+    )
+    if server is not None:
+        print(f"  requests       {sum(server.requests.values())}")
+        for resource, count in sorted(server.requests.items()):
+            print(f"    {resource:<28} {count}")
+        for status, count in sorted(server.statuses.items()):
+            print(f"    status {status:<21} {count}")
+        print(f"  bytes sent     {server.bytes_sent / 1024:.0f} KiB")
+    print(
+        f"  refreshes      {len(latencies)}, "
+        f"{result['short_circuited']} short-circuited polls, "
+        f"circuit {result['breaker']}"
+    )
+    for name, count in sorted(result["failures"].items()):
+        print(f"    failed       {count} {name}")
+    print(
+        f"  refresh        p50 {percentile(latencies, 0.5) * 1000:8.2f} ms"
+        f"   p99 {percentile(latencies, 0.99) * 1000:8.2f} ms"
+        f"   max {max(latencies, default=0) * 1000:8.2f} ms"
+    )
+    print(
+        f"  loop lag       p50 {percentile(monitor.lags, 0.5) * 1000:8.2f} ms"
+        f"   p99 {percentile(monitor.lags, 0.99) * 1000:8.2f} ms"
+        f"   max {max(monitor.lags, default=0) * 1000:8.2f} ms"
+        f"   blocked {monitor.blocked * 1000:.0f} ms"
+    )
+    waits = monitor.executor_waits
+    print(
+        f"  executor wait  p50 {percentile(waits, 0.5) * 1000:8.2f} ms"
+        f"   p99 {percentile(waits, 0.99) * 1000:8.2f} ms"
+        f"   max {max(waits, default=0) * 1000:8.2f} ms"
+    )
+
+
+def main() -> int:
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=50)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument(
+        "--spread", type=float, default=1.0,
+        help="refreshes of a round start at random within this many seconds",
+    )
+    parser.add_argument(
+        "--pause", type=float, default=0.5,
+        help="seconds between the end of a round and the next one",
+    )
+    parser.add_argument("--max-concurrent", type=int, default=4)
+    parser.add_argument(
+        "--verbose", action="store_true",
+        help="show the errors logged by the integration",
+    )
+    parser.add_argument(
+        "--url", default=None,
+        help="API base URL of a server started separately",
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+    args.users = min(args.users, args.entries)
+    if not args.verbose:
+        # Failed refreshes are counted in the report instead
+        logging.getLogger("custom_components.duolingo").setLevel(
+            logging.CRITICAL
+        )
+
+    server_thread = ServerThread(args) if args.url is None else None
+    try:
+        result = asyncio.run(
+            async_run(args, args.url or server_thread.url)
+        )
+    finally:
+        if server_thread is not None:
+            server_thread.stop()
+    _report(args, result, server_thread.server if server_thread else None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
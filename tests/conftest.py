@@ -0,0 +1,27 @@
+"""Fixtures for the Duolingo tests."""
+from functools import partial
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(
+        enable_custom_integrations,  # noqa: ARG001 - requests the fixture
+):
+    """Enable the custom integration in all tests."""
+    return
+
+
+@pytest.fixture
+def eager_hass(
+        hass: HomeAssistant,
+        monkeypatch: pytest.MonkeyPatch,
+) -> HomeAssistant:
+    """Return hass starting background tasks eagerly, as HA 2025.1 does."""
+    monkeypatch.setattr(
+        hass,
+        "async_create_background_task",
+        partial(hass.async_create_background_task, eager_start=True),
+    )
+    return hass
@@ -0,0 +1,176 @@
+"""Tests for fetching and applying pushed profiles."""
+import json
+from datetime import datetime
+from http import HTTPStatus
+from unittest.mock import MagicMock
+from zoneinfo import ZoneInfo
+
+import pytest
+from freezegun.api import FrozenDateTimeFactory
+
+from custom_components.duolingo.api import (
+    ABSENT_FIELDS_RECHECK,
+    DuolingoApi,
+    pushed_user_to_dto,
+)
+from custom_components.duolingo.dto import UserDto
+
+TODAY = datetime(2024, 6, 10, 18, 0, tzinfo=ZoneInfo("Europe/Berlin"))
+
+CURRENT = UserDto(
+    id=1,
+    name="Anna",
+    username="anna",
+    total_xp=1000,
+    courses_xp={"DUOLINGO_ES_EN": 800, "DUOLINGO_FR_EN": 200},
+    streak_today=True,
+    streak_length=12,
+)
+
+
+def test_unchanged_push_returns_current_user() -> None:
+    """A push repeating known values returns the current user itself."""
+    assert pushed_user_to_dto(
+        {"id": 1, "totalXp": 1000}, CURRENT, TODAY
+    ) is CURRENT
+
+
+def test_courses_merged_by_id() -> None:
+    """Pushed courses update or add courses, the others are kept."""
+    user = pushed_user_to_dto(
+        {
+            "id": 1,
+            "courses": [
+                {"id": "DUOLINGO_ES_EN", "xp": 850},
+                {"id": "DUOLINGO_DE_EN", "xp": 5},
+            ],
+        },
+        CURRENT,
+        TODAY,
+    )
+
+    assert dict(user.courses_xp) == {
+        "DUOLINGO_ES_EN": 850,
+        "DUOLINGO_FR_EN": 200,
+        "DUOLINGO_DE_EN": 5,
+    }
+    assert user.total_xp == CURRENT.total_xp
+
+
+def test_xp_gained_adds_to_total_and_course() -> None:
+    """An XP delta adds to the total and to the given course."""
+    user = pushed_user_to_dto(
+        {"id": 1, "xpGained": 20, "courseId": "DUOLINGO_FR_EN"},
+        CURRENT,
+        TODAY,
+    )
+
+    assert user.total_xp == CURRENT.total_xp + 20
+    assert dict(user.courses_xp) == {
+        "DUOLINGO_ES_EN": 800,
+        "DUOLINGO_FR_EN": 220,
+    }
+    # Already extended today
+    assert (user.streak_today, user.streak_length) == (True, 12)
+
+
+def test_xp_gained_extends_streak_once() -> None:
+    """The first XP of the day extends the streak, later XP does not."""
+    current = UserDto(
+        id=1,
+        name="Anna",
+        username="anna",
+        total_xp=1000,
+        courses_xp={},
+        streak_today=False,
+        streak_length=12,
+    )
+
+    user = pushed_user_to_dto({"id": 1, "xpGained": 10}, current, TODAY)
+    assert (user.total_xp, user.streak_today, user.streak_length) == (
+        1010, True, 13
+    )
+    user = pushed_user_to_dto({"id": 1, "xpGained": 10}, user, TODAY)
+    assert (user.total_xp, user.streak_today, user.streak_length) == (
+        1020, True, 13
+    )
+
+
+@pytest.mark.parametrize(
+    "streak_data",
+    [{}, {"xpGoal": 50}, {"currentStreak": {}}],
+)
+def test_partial_streak_keeps_streak(streak_data: dict) -> None:
+    """Streak keys missing from a push keep their current values."""
+    user = pushed_user_to_dto(
+        {"id": 1, "streakData": streak_data}, CURRENT, TODAY
+    )
+
+    assert user is CURRENT
+
+
+def test_pushed_streak_keys_override() -> None:
+    """Only the pushed keys of the current streak are replaced."""
+    user = pushed_user_to_dto(
+        {"id": 1, "streakData": {"currentStreak": {"length": 15}}},
+        CURRENT,
+        TODAY,
+    )
+
+    assert (user.streak_today, user.streak_length) == (True, 15)
+
+
+def test_pushed_streak_ended() -> None:
+    """A currentStreak of None ends the streak."""
+    user = pushed_user_to_dto(
+        {"id": 1, "streakData": {"currentStreak": None}}, CURRENT, TODAY
+    )
+
+    assert (user.streak_today, user.streak_length) == (False, 0)
+
+
+async def test_absent_field_requested_again(
+        freezer: FrozenDateTimeFactory,
+) -> None:
+    """A field the full document lacked is requested again later on."""
+    freezer.move_to(TODAY)
+    profile = {"id": 1, "name": "Anna", "username": "anna", "totalXp": 1000}
+    requested = []
+
+    async def async_get(
+            *_args: object,
+            params: dict[str, str] | None = None,
+            **_kwargs: object,
+    ) -> tuple[int, dict[str, str], bytes]:
+        fields = params["fields"] if params else ""
+        requested.append(fields)
+        top_level = {field.split("{", 1)[0] for field in fields.split(",")}
+        body = {
+            key: value for key, value in profile.items()
+            if not fields or key in top_level
+        }
+        return HTTPStatus.OK, {}, json.dumps(body).encode()
+
+    api = DuolingoApi(MagicMock(), 1, "Europe/Berlin")
+    api._async_get = async_get  # noqa: SLF001 - no requests sent
+    keys = {UserDto.TOTAL_XP_KEY, UserDto.STREAK_LENGTH_KEY}
+    projected = "id,name,streakData{currentStreak},totalXp,username"
+
+    # No streak yet, the full document lacks it as well
+    assert (await api.async_get_user_data(keys)).streak_length == 0
+    assert requested == [projected, ""]
+
+    # The absent field is left out of the next polls
+    requested.clear()
+    profile["streakData"] = {
+        "currentStreak": {"length": 1, "endDate": "2024-06-10"},
+    }
+    assert (await api.async_get_user_data(keys)).streak_length == 0
+    assert requested == ["id,name,totalXp,username"]
+
+    # Until it is requested again
+    requested.clear()
+    freezer.tick(ABSENT_FIELDS_RECHECK)
+    user = await api.async_get_user_data(keys)
+    assert (user.streak_today, user.streak_length) == (True, 1)
+    assert requested == [projected]
@@ -0,0 +1,139 @@
+"""Tests for the coordinator starting a new day at local midnight."""
+from collections.abc import AsyncGenerator
+from dataclasses import replace
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import pytest
+from freezegun.api import FrozenDateTimeFactory
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.duolingo.const import BINARY_SENSOR, SENSOR
+from custom_components.duolingo.coordinator import (
+    DAY_KEY,
+    DuolingoDataUpdateCoordinator,
+)
+from custom_components.duolingo.dto import UserDto, UserIdentifiersDto
+from custom_components.duolingo.hub import DuolingoHub
+
+USER = UserDto(
+    id=1,
+    name="Anna",
+    username="anna",
+    total_xp=100,
+    courses_xp={},
+    streak_today=True,
+    streak_length=12,
+)
+
+
+def _local(hour: int, minute: int = 0, second: int = 0, day: int = 10) -> datetime:
+    """Return a time in the local time zone of Home Assistant."""
+    return datetime(
+        2024, 6, day, hour, minute, second, tzinfo=dt_util.DEFAULT_TIME_ZONE
+    )
+
+
+@pytest.fixture
+async def coordinator(
+        hass: HomeAssistant,
+        freezer: FrozenDateTimeFactory,
+) -> AsyncGenerator[DuolingoDataUpdateCoordinator]:
+    """Return a coordinator tracking midnight whose API returns USER."""
+    freezer.move_to(_local(23))
+    coordinator = DuolingoDataUpdateCoordinator(
+        hass,
+        DuolingoHub(hass),
+        UserIdentifiersDto(1, "Anna", "anna"),
+        "entry",
+    )
+    coordinator.platforms = [SENSOR, BINARY_SENSOR]
+    coordinator.hub.api(1).async_get_user_data = AsyncMock(return_value=USER)
+    async_stop = coordinator.async_track_midnight()
+    yield coordinator
+    async_stop()
+
+
+async def _async_move_to(
+        hass: HomeAssistant,
+        freezer: FrozenDateTimeFactory,
+        moment: datetime,
+) -> None:
+    """Move the time forward and run the timers due by then."""
+    freezer.move_to(moment)
+    async_fire_time_changed(hass, moment)
+    await hass.async_block_till_done()
+
+
+async def test_midnight_rolls_over(
+        hass: HomeAssistant,
+        freezer: FrozenDateTimeFactory,
+        coordinator: DuolingoDataUpdateCoordinator,
+) -> None:
+    """The streak of yesterday and the daily XP expire at local midnight."""
+    await coordinator.async_refresh()
+    freezer.move_to(_local(23, 30))
+    api = coordinator.hub.api(1)
+    api.async_get_user_data.return_value = replace(USER, total_xp=130)
+    await coordinator.async_refresh()
+    assert coordinator.history.xp_today(dt_util.now()) == 30
+    assert coordinator.user.streak_today
+
+    await _async_move_to(hass, freezer, _local(0, day=11))
+
+    assert coordinator.changed_keys == {DAY_KEY, UserDto.STREAK_TODAY_KEY}
+    assert not coordinator.user.streak_today
+    assert coordinator.user.streak_length == USER.streak_length
+    assert coordinator.history.xp_today(dt_util.now()) == 0
+    assert api.async_get_user_data.await_count == 2
+
+    # The timer starts the following day too
+    coordinator.data = replace(coordinator.user, streak_today=True)
+    await _async_move_to(hass, freezer, _local(0, day=12))
+    assert not coordinator.user.streak_today
+
+
+async def test_poll_spanning_midnight(
+        freezer: FrozenDateTimeFactory,
+        coordinator: DuolingoDataUpdateCoordinator,
+) -> None:
+    """A poll started before midnight does not extend the new day."""
+    freezer.move_to(_local(23, 59, 59))
+
+    async def async_get_user_data(_keys: set[str]) -> UserDto:
+        freezer.move_to(_local(0, 0, 1, day=11))
+        return USER
+
+    coordinator.hub.api(1).async_get_user_data.side_effect = (
+        async_get_user_data
+    )
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success
+    assert not coordinator.user.streak_today
+    assert coordinator.user.total_xp == USER.total_xp
+
+
+async def test_fresh_user_not_reused_after_midnight(
+        hass: HomeAssistant,
+        freezer: FrozenDateTimeFactory,
+        coordinator: DuolingoDataUpdateCoordinator,
+) -> None:
+    """A user fetched before midnight is not served once it rolled over."""
+    api = coordinator.hub.api(1)
+    freezer.move_to(_local(23, 59, 50))
+    await coordinator.async_refresh()
+    # A refresh forced right after a poll reuses the fetched user
+    await coordinator.async_refresh()
+    assert api.async_get_user_data.await_count == 1
+
+    await _async_move_to(hass, freezer, _local(0, 0, 5, day=11))
+    assert not coordinator.user.streak_today
+
+    api.async_get_user_data.return_value = replace(USER, streak_today=False)
+    await coordinator.async_refresh()
+
+    assert api.async_get_user_data.await_count == 2
+    assert not coordinator.user.streak_today
@@ -0,0 +1,77 @@
+"""Tests for the profile decoders."""
+import json
+
+import pytest
+
+from custom_components.duolingo.decoder import decode_profile, project
+
+PROFILE = {
+    "id": 1,
+    "name": 'Quote " and \\ backslash',
+    "username": "café",
+    "totalXp": 120,
+    "bio": 'brackets ] } [ { and "quotes" in a string',
+    "streakData": {
+        "currentStreak": {"length": 3, "endDate": "2024-06-01"},
+        "previousStreak": {"length": 10},
+    },
+    "courses": [
+        {"id": "DUOLINGO_ES_EN", "xp": 100, "title": "Spanish [es]"},
+        {"id": "DUOLINGO_FR_EN", "xp": 20, "skills": [{"id": "}"}, []]},
+    ],
+    "xpGains": [{"xp": 10, "eventType": "LESSON"}] * 3,
+    "unicode\\key": "☃ 😀",
+    "empty": {},
+    "nothing": None,
+}
+
+EXPECTED = {
+    "id": 1,
+    "name": 'Quote " and \\ backslash',
+    "username": "café",
+    "totalXp": 120,
+    "streakData": {
+        "currentStreak": {"length": 3, "endDate": "2024-06-01"},
+    },
+    "courses": [
+        {"id": "DUOLINGO_ES_EN", "xp": 100},
+        {"id": "DUOLINGO_FR_EN", "xp": 20},
+    ],
+}
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_decode_profile(indent: int | None) -> None:
+    """Only the parts of the spec are kept, whatever the formatting."""
+    body = json.dumps(PROFILE, indent=indent).encode()
+
+    assert decode_profile(body) == EXPECTED
+
+
+def test_project_other_spec() -> None:
+    """Values not matching the shape of the spec are kept as they are."""
+    spec = {"courses": {"id": None}, "streakData": [None]}
+
+    assert project(PROFILE, spec) == {
+        "courses": PROFILE["courses"],
+        "streakData": PROFILE["streakData"],
+    }
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b'{"id": 1} {"id": 2}',
+        b'{"id": 1 "name": "A"}',
+        b'{"id": 1, "courses": [{"id": "A", "xp": 1}',
+    ],
+)
+def test_invalid_document(body: bytes) -> None:
+    """Invalid documents raise."""
+    with pytest.raises(json.JSONDecodeError):
+        decode_profile(body)
+
+
+def test_not_an_object() -> None:
+    """Documents other than objects are rejected."""
+    assert decode_profile(b'[{"id": 1}]') is None
@@ -0,0 +1,161 @@
+"""Tests for the XP history."""
+from array import array
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.duolingo.coordinator import history_store
+from custom_components.duolingo.history import (
+    HISTORY_RETENTION,
+    TOTAL_SERIES,
+    XpHistory,
+    XpSeries,
+)
+
+TZ = ZoneInfo("Europe/Berlin")
+# A Monday
+MONDAY = datetime(2024, 6, 10, 12, 0, tzinfo=TZ)
+HOUR = 3600
+
+
+def _series(*samples: tuple[int, int]) -> XpSeries:
+    """Return a series of (timestamp, value) samples."""
+    series = XpSeries()
+    for timestamp, value in samples:
+        series.append(timestamp, value)
+    return series
+
+
+def test_unchanged_value_not_appended() -> None:
+    """Only changes of the value are stored."""
+    series = _series((0, 10), (60, 10), (120, 12))
+
+    assert series.as_list() == [[0, 120], [10, 12]]
+    assert not series.append(180, 12)
+
+
+def test_xp_today_and_this_week() -> None:
+    """XP is counted from the last total of the previous day and week."""
+    history = XpHistory()
+    history.record(MONDAY, 100, {})
+    history.record(MONDAY + timedelta(hours=2), 130, {})
+    assert history.xp_today(MONDAY) == 30
+    assert history.xp_this_week(MONDAY) == 30
+
+    # Tuesday starts from the last total of Monday
+    tuesday = MONDAY + timedelta(days=1)
+    history.record(tuesday, 150, {})
+    assert history.xp_today(tuesday) == 20
+    assert history.xp_this_week(tuesday) == 50
+
+    # The next Monday starts a new week
+    monday = MONDAY + timedelta(days=7)
+    history.record(monday, 200, {})
+    assert history.xp_today(monday) == 50
+    assert history.xp_this_week(monday) == 50
+    assert history.xp_this_week(monday + timedelta(days=7)) == 0
+
+
+def test_xp_today_of_another_day() -> None:
+    """Nothing was earned on a day without any record yet."""
+    history = XpHistory()
+    history.record(MONDAY, 100, {})
+
+    assert history.xp_today(MONDAY + timedelta(days=1)) == 0
+
+
+def test_day_of_local_time_zone() -> None:
+    """Days start at local midnight, not at midnight UTC."""
+    history = XpHistory()
+    # 23:30 UTC on Monday is already Tuesday in Berlin
+    history.record(datetime(2024, 6, 10, 21, 0, tzinfo=TZ), 100, {})
+    tuesday = datetime(2024, 6, 10, 23, 30, tzinfo=ZoneInfo("UTC")).astimezone(
+        TZ
+    )
+    history.record(tuesday, 110, {})
+
+    assert history.xp_today(tuesday) == 10
+
+
+def test_rate_over_window() -> None:
+    """The rate counts XP gained in the last 24 hours only."""
+    history = XpHistory()
+    history.record(MONDAY, 100, {})
+    history.record(MONDAY + timedelta(hours=1), 148, {})
+
+    assert history.rate(TOTAL_SERIES, MONDAY + timedelta(hours=2)) == 2.0
+    # The 48 XP drop out of the window a day later
+    assert history.rate(TOTAL_SERIES, MONDAY + timedelta(hours=26)) == 0.0
+    assert history.rate("DUOLINGO_ES_EN", MONDAY) == 0.0
+
+
+def test_compact_downsamples_old_samples() -> None:
+    """Old samples keep the last of each hour, recent ones are kept."""
+    now = 100 * HOUR
+    series = _series(
+        # Two hours ago are kept at full resolution
+        (0, 1), (60, 2), (HOUR + 60, 3), (HOUR + 120, 4),
+        (now - HOUR, 5), (now - HOUR + 60, 6),
+    )
+
+    series.compact(now)
+
+    assert series.as_list() == [
+        [60, HOUR + 120, now - HOUR, now - HOUR + 60],
+        [2, 4, 5, 6],
+    ]
+
+
+def test_compact_evicts_expired_samples() -> None:
+    """Expired samples are dropped, the last of them remains as anchor."""
+    retention = int(HISTORY_RETENTION.total_seconds())
+    now = retention + 10 * 24 * HOUR
+    series = _series((0, 1), (HOUR, 2), (now - retention + HOUR, 3))
+
+    series.compact(now)
+
+    # The value at the start of the retention window is still known
+    assert series.as_list() == [[HOUR, now - retention + HOUR], [2, 3]]
+
+
+def test_dropped_course_removed_after_retention() -> None:
+    """Series of courses gone for longer than the retention are deleted."""
+    history = XpHistory()
+    history.record(MONDAY, 100, {"DUOLINGO_ES_EN": 50, "DUOLINGO_FR_EN": 50})
+    history.record(MONDAY + timedelta(days=1), 110, {"DUOLINGO_ES_EN": 60})
+    assert set(history.series) == {
+        TOTAL_SERIES, "DUOLINGO_ES_EN", "DUOLINGO_FR_EN"
+    }
+
+    history.record(
+        MONDAY + HISTORY_RETENTION + timedelta(days=1),
+        120,
+        {"DUOLINGO_ES_EN": 70},
+    )
+
+    assert set(history.series) == {TOTAL_SERIES, "DUOLINGO_ES_EN"}
+
+
+async def test_store_round_trip(hass: HomeAssistant) -> None:
+    """The history survives a save and load through the Store."""
+    history = XpHistory()
+    history.record(MONDAY, 100, {"DUOLINGO_ES_EN": 50})
+    history.record(MONDAY + timedelta(hours=1), 120, {"DUOLINGO_ES_EN": 70})
+    tuesday = MONDAY + timedelta(days=1)
+    history.record(tuesday, 130, {"DUOLINGO_ES_EN": 80})
+
+    await history_store(hass, "entry").async_save(history.as_dict())
+    restored = XpHistory.from_dict(
+        await history_store(hass, "entry").async_load()
+    )
+
+    assert restored.as_dict() == history.as_dict()
+    for series in restored.series.values():
+        assert isinstance(series.times, array)
+        assert series.times.typecode == series.values.typecode == "q"
+    assert restored.xp_today(tuesday) == 10
+    assert restored.xp_this_week(tuesday) == 30
+    # Recording goes on from the restored day
+    restored.record(tuesday + timedelta(hours=1), 135, {})
+    assert restored.xp_today(tuesday) == 15
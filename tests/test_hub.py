@@ -0,0 +1,80 @@
+"""Tests for the hub sharing fetches between entries."""
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.duolingo.breaker import CircuitOpenError
+from custom_components.duolingo.dto import UserDto, UserIdentifiersDto
+from custom_components.duolingo.hub import DuolingoHub
+
+USER = UserDto.from_dict({"id": 1, "name": "A", "username": "a"})
+
+
+class _Coordinator:
+    """Stand-in for a coordinator registered with the hub."""
+
+    identifiers = UserIdentifiersDto(1, "A", "a")
+    user_keys = frozenset({UserDto.TOTAL_XP_KEY})
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.received: list[UserDto] = []
+
+    def async_set_user(self, user: UserDto) -> None:
+        """Record a user fetched on behalf of another coordinator."""
+        self.received.append(user)
+
+
+@pytest.fixture
+async def hub(eager_hass: HomeAssistant) -> DuolingoHub:
+    """Return a hub whose fetches start eagerly."""
+    return DuolingoHub(eager_hass)
+
+
+async def test_fetch_refused_by_open_circuit(hub: DuolingoHub) -> None:
+    """A fetch failing before its first await leaves no state behind."""
+    coordinator = _Coordinator()
+    hub.async_register(coordinator)
+    hub.breaker.record_failure(retry_after=None)
+    hub.breaker.record_failure(retry_after=None)
+    hub.breaker.record_failure(retry_after=None)
+
+    with pytest.raises(CircuitOpenError):
+        await hub.async_fetch(coordinator)
+    assert not hub.is_fetching(1)
+    assert not hub._inflight  # noqa: SLF001 - no stale task left
+    assert not hub._waiters  # noqa: SLF001 - no waiter left
+
+    # Once the circuit closes the user is fetched again
+    hub.breaker.record_success()
+    api = hub.api(1)
+    api.async_get_user_data = AsyncMock(return_value=USER)
+    assert await hub.async_fetch(coordinator) is USER
+    api.async_get_user_data.assert_awaited_once()
+    assert not hub._inflight  # noqa: SLF001 - no stale task left
+
+
+async def test_concurrent_fetches_share_one_request(hub: DuolingoHub) -> None:
+    """Coordinators of the same user join the fetch in progress."""
+    first, second, idle = _Coordinator(), _Coordinator(), _Coordinator()
+    for coordinator in (first, second, idle):
+        hub.async_register(coordinator)
+    api = hub.api(1)
+
+    async def async_get_user_data(_keys: set[str]) -> UserDto:
+        await asyncio.sleep(0)
+        return USER
+
+    api.async_get_user_data = AsyncMock(side_effect=async_get_user_data)
+
+    results = await asyncio.gather(
+        hub.async_fetch(first), hub.async_fetch(second)
+    )
+
+    assert results == [USER, USER]
+    api.async_get_user_data.assert_awaited_once()
+    # Only the coordinator not waiting for the fetch receives it
+    assert (first.received, second.received, idle.received) == ([], [], [USER])
+    assert not hub._inflight  # noqa: SLF001 - no stale task left
@@ -0,0 +1,239 @@
+"""Tests for the leaderboard of several users."""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.duolingo.dto import UserDto, UserIdentifiersDto
+from custom_components.duolingo.leaderboard import (
+    STREAK_METRIC,
+    TOTAL_XP_METRIC,
+    DuolingoLeaderboardCoordinator,
+    Leaderboard,
+    Ranking,
+)
+
+SPANISH = UserDto.course_key("DUOLINGO_ES_EN")
+FRENCH = UserDto.course_key("DUOLINGO_FR_EN")
+
+
+def _user(
+        user_id: int,
+        total_xp: int,
+        courses_xp: dict[str, int] | None = None,
+) -> UserDto:
+    """Return a member with a total and course XP."""
+    return UserDto(
+        id=user_id,
+        name=f"User {user_id}",
+        username=f"user{user_id}",
+        total_xp=total_xp,
+        courses_xp=courses_xp or {},
+        streak_today=False,
+        streak_length=user_id,
+    )
+
+
+def _identifiers(user_id: int) -> UserIdentifiersDto:
+    """Return the identifiers of a member."""
+    return UserIdentifiersDto(user_id, f"User {user_id}", f"user{user_id}")
+
+
+def test_ranking_ties_by_lower_id() -> None:
+    """Members with the same value are ranked by the lower user id."""
+    ranking = Ranking()
+    ranking.update(3, 10)
+    ranking.update(2, 20)
+    ranking.update(1, 10)
+
+    assert ranking.top(3) == [(2, 20), (1, 10), (3, 10)]
+    assert ranking.top(1) == [(2, 20)]
+
+
+def test_ranking_lazy_deletion() -> None:
+    """Stale and removed entries are skipped and dropped when reached."""
+    ranking = Ranking()
+    ranking.update(1, 30)
+    ranking.update(2, 20)
+    ranking.update(1, 10)
+    assert ranking.remove(2)
+    assert not ranking.remove(2)
+    assert not ranking.update(1, 10)
+
+    assert ranking.top(5) == [(1, 10)]
+    assert len(ranking) == 1
+    # The stale entries above the top were popped by top()
+    assert ranking._heap == [(-10, 1)]  # noqa: SLF001 - heap state
+
+
+def test_ranking_value_set_again_not_duplicated() -> None:
+    """A value changed A to B to A leaves two entries but one rank."""
+    ranking = Ranking()
+    ranking.update(1, 10)
+    ranking.update(1, 20)
+    ranking.update(1, 10)
+    ranking.update(2, 5)
+
+    assert ranking.top(5) == [(1, 10), (2, 5)]
+    # Reading again gives the same ranks
+    assert ranking.top(5) == [(1, 10), (2, 5)]
+
+
+def test_ranking_compaction() -> None:
+    """The heap is rebuilt once stale entries make up most of it."""
+    ranking = Ranking()
+    ranking.update(1, 0)
+    ranking.update(2, 0)
+    for value in range(1, 100):
+        ranking.update(1, value)
+        assert len(ranking._heap) <= 2 * len(ranking) + 8  # noqa: SLF001
+
+    assert ranking.top(2) == [(1, 99), (2, 0)]
+
+
+def test_course_metrics_appear_and_disappear() -> None:
+    """Course rankings follow the courses of the members."""
+    leaderboard = Leaderboard()
+
+    assert leaderboard.update(_user(1, 100, {"DUOLINGO_ES_EN": 100})) == {
+        TOTAL_XP_METRIC, STREAK_METRIC, SPANISH,
+    }
+    assert leaderboard.update(
+        _user(1, 150, {"DUOLINGO_ES_EN": 100, "DUOLINGO_FR_EN": 50})
+    ) == {TOTAL_XP_METRIC, FRENCH}
+    assert leaderboard.top(FRENCH, 5) == [(leaderboard.users[1], 50)]
+
+    # The course is dropped from the profile
+    assert leaderboard.update(_user(1, 150, {"DUOLINGO_ES_EN": 100})) == {
+        FRENCH,
+    }
+    assert leaderboard.top(FRENCH, 5) == []
+    assert leaderboard.top("unknown", 5) == []
+
+
+def test_rename_changes_all_metrics() -> None:
+    """A renamed member rewrites every ranking it appears in."""
+    leaderboard = Leaderboard()
+    user = _user(1, 100, {"DUOLINGO_ES_EN": 100})
+    leaderboard.update(user)
+
+    renamed = UserDto.from_dict({**user.to_dict, UserDto.NAME_KEY: "Anna"})
+
+    assert leaderboard.update(renamed) == {
+        TOTAL_XP_METRIC, STREAK_METRIC, SPANISH,
+    }
+    assert leaderboard.update(renamed) == set()
+
+
+def test_remove_member() -> None:
+    """A removed member leaves every ranking."""
+    leaderboard = Leaderboard()
+    leaderboard.update(_user(1, 100, {"DUOLINGO_ES_EN": 100}))
+    leaderboard.update(_user(2, 50))
+
+    assert leaderboard.remove(1) == {TOTAL_XP_METRIC, STREAK_METRIC, SPANISH}
+    assert leaderboard.remove(1) == set()
+    assert [user.id for user, _ in leaderboard.top(TOTAL_XP_METRIC, 5)] == [2]
+
+
+@pytest.fixture
+def users() -> dict[int, UserDto | Exception]:
+    """Return the results of member fetches by user id."""
+    return {}
+
+
+@pytest.fixture
+def hub(users: dict[int, UserDto | Exception]) -> MagicMock:
+    """Return a stand-in hub fetching members from users."""
+
+    async def async_fetch_api(api: int, keys: set[str]) -> UserDto:  # noqa: ARG001
+        result = users[api]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return MagicMock(
+        # The API client of a member is its user id
+        create_api=MagicMock(side_effect=lambda user_id: user_id),
+        async_fetch_api=AsyncMock(side_effect=async_fetch_api),
+        async_get_followed_users=AsyncMock(return_value=[]),
+    )
+
+
+def _coordinator(
+        hass: HomeAssistant,
+        hub: MagicMock,
+        members: list[int],
+        followed_by: int | None = None,
+) -> DuolingoLeaderboardCoordinator:
+    """Return a leaderboard of members."""
+    return DuolingoLeaderboardCoordinator(
+        hass,
+        hub,
+        title="Friends",
+        members=[_identifiers(user_id) for user_id in members],
+        followed_by=None if followed_by is None else _identifiers(followed_by),
+        top_n=3,
+    )
+
+
+async def test_failed_members_keep_last_values(
+        hass: HomeAssistant,
+        hub: MagicMock,
+        users: dict[int, UserDto | Exception],
+) -> None:
+    """The update fails only when every member failed."""
+    coordinator = _coordinator(hass, hub, [1, 2])
+    users.update({1: _user(1, 100), 2: _user(2, 50)})
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success
+
+    # One member failing keeps its last values
+    users.update({1: _user(1, 120), 2: RuntimeError("gone")})
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success
+    assert coordinator.changed_metrics == {TOTAL_XP_METRIC}
+    assert coordinator.data.top(TOTAL_XP_METRIC, 3) == [
+        (users[1], 120), (coordinator.data.users[2], 50),
+    ]
+
+    # Every member failing fails the update
+    users[1] = RuntimeError("gone")
+    await coordinator.async_refresh()
+    assert not coordinator.last_update_success
+    assert coordinator.changed_metrics is None
+
+    # The first update after a failure rewrites every entity
+    users.update({1: _user(1, 120), 2: _user(2, 50)})
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success
+    assert coordinator.changed_metrics is None
+
+
+async def test_unfollowed_members_removed(
+        hass: HomeAssistant,
+        hub: MagicMock,
+        users: dict[int, UserDto | Exception],
+        monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Users no longer followed leave the leaderboard."""
+    coordinator = _coordinator(hass, hub, [], followed_by=1)
+    users.update({1: _user(1, 100), 2: _user(2, 50), 3: _user(3, 70)})
+    hub.async_get_followed_users.return_value = [
+        _identifiers(2), _identifiers(3),
+    ]
+    await coordinator.async_refresh()
+    assert set(coordinator.data.users) == {1, 2, 3}
+
+    # A day later the tracked account no longer follows user 3
+    hub.async_get_followed_users.return_value = [_identifiers(2)]
+    monkeypatch.setattr(coordinator, "_following_fetched", -1e9)
+    await coordinator.async_refresh()
+
+    assert set(coordinator.data.users) == {1, 2}
+    assert [user.id for user, _ in coordinator.data.top(TOTAL_XP_METRIC, 3)] == [
+        1, 2,
+    ]
+    assert TOTAL_XP_METRIC in coordinator.changed_metrics
+    hub.create_api.assert_any_call(3)
+    assert set(coordinator._apis) == {1, 2}  # noqa: SLF001 - client dropped
@@ -0,0 +1,75 @@
+"""Tests for the username resolver of the config flow."""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.duolingo.api import DuolingoApi
+from custom_components.duolingo.breaker import CircuitBreaker, CircuitOpenError
+from custom_components.duolingo.dto import UserIdentifiersDto
+from custom_components.duolingo.resolver import UsernameResolver
+
+IDENTIFIERS = UserIdentifiersDto(1, "A", "Anna")
+
+
+@pytest.fixture
+def breaker() -> CircuitBreaker:
+    """Return a closed circuit breaker."""
+    return CircuitBreaker()
+
+
+@pytest.fixture
+async def resolver(
+        eager_hass: HomeAssistant,
+        breaker: CircuitBreaker,
+) -> UsernameResolver:
+    """Return a resolver whose lookups start eagerly."""
+    return UsernameResolver(eager_hass, AsyncMock(), breaker)
+
+
+async def test_lookup_refused_by_open_circuit(
+        resolver: UsernameResolver,
+        breaker: CircuitBreaker,
+) -> None:
+    """A refused lookup is neither cached nor kept in flight."""
+    breaker.record_failure(retry_after=None)
+    breaker.record_failure(retry_after=None)
+    breaker.record_failure(retry_after=None)
+
+    with pytest.raises(CircuitOpenError):
+        await resolver.async_resolve("anna")
+    assert not resolver._inflight  # noqa: SLF001 - no stale task left
+
+    breaker.record_success()
+    with patch.object(
+            DuolingoApi,
+            "async_get_user_identifiers",
+            AsyncMock(return_value=IDENTIFIERS),
+    ) as lookup:
+        assert await resolver.async_resolve("anna") is IDENTIFIERS
+        assert await resolver.async_resolve(" ANNA ") is IDENTIFIERS
+    lookup.assert_awaited_once()
+
+
+async def test_concurrent_lookups_share_one_request(
+        resolver: UsernameResolver,
+) -> None:
+    """Lookups of the same username in any case wait for one request."""
+
+    async def async_get_user_identifiers(*_args: object) -> UserIdentifiersDto:
+        await asyncio.sleep(0)
+        return IDENTIFIERS
+
+    with patch.object(
+            DuolingoApi,
+            "async_get_user_identifiers",
+            AsyncMock(side_effect=async_get_user_identifiers),
+    ) as lookup:
+        results = await asyncio.gather(
+            resolver.async_resolve("anna"), resolver.async_resolve("Anna")
+        )
+
+    assert results == [IDENTIFIERS, IDENTIFIERS]
+    lookup.assert_awaited_once()
+    assert not resolver._inflight  # noqa: SLF001 - no stale task left
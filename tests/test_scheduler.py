@@ -0,0 +1,98 @@
+"""Tests for the polling schedule."""
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from custom_components.duolingo.scheduler import (
+    DEFAULT_INTERVAL,
+    PollScheduler,
+)
+
+TZ = ZoneInfo("Europe/Berlin")
+
+
+def _local(hour: int, minute: int = 0, day: int = 10) -> datetime:
+    """Return a local time in June, away from DST transitions."""
+    return datetime(2024, 6, day, hour, minute, tzinfo=TZ)
+
+
+@pytest.mark.parametrize(
+    ("now", "streak_today", "expected"),
+    [
+        # A 20 minute interval would poll at 01:10
+        (_local(0, 50), False, _local(6)),
+        # A 2 hour interval would poll at 02:10
+        (_local(0, 10), True, _local(6)),
+        # Inside the quiet hours
+        (_local(3), False, _local(6)),
+        # Polls before the quiet hours are kept
+        (_local(22, 10), True, _local(0, 10, day=11)),
+        (_local(0, 30), False, _local(0, 50)),
+        (_local(6), False, _local(6, 20)),
+    ],
+)
+def test_no_poll_in_quiet_hours(
+        now: datetime,
+        streak_today: bool,  # noqa: FBT001 - parametrized
+        expected: datetime,
+) -> None:
+    """A poll falling into the quiet hours is moved to their end."""
+    scheduler = PollScheduler()
+
+    assert now + scheduler.next_interval(
+        now, streak_today=streak_today
+    ) == expected
+
+
+def test_push_safety_net_waits_for_quiet_end() -> None:
+    """The poll after a push does not wake up during the night."""
+    scheduler = PollScheduler()
+    now = _local(22)
+    scheduler.record_push(now)
+
+    assert now + scheduler.next_interval(now, streak_today=True) == _local(
+        6, day=11
+    )
+
+
+def test_budget_paces_awake_hours() -> None:
+    """The budget is spread over the hours outside of the quiet hours."""
+    scheduler = PollScheduler(daily_budget=40)
+    now = _local(0)
+
+    # 19 awake hours for 40 polls
+    assert scheduler.next_interval(now, streak_today=False) == timedelta(
+        minutes=28, seconds=30
+    )
+
+
+def test_budget_pacing_skips_quiet_hours() -> None:
+    """A paced poll landing in the night waits until the morning."""
+    scheduler = PollScheduler(daily_budget=10)
+    now = _local(0)
+
+    assert now + scheduler.next_interval(
+        now, streak_today=False
+    ) == _local(6)
+
+
+def test_spent_budget_waits_for_next_day() -> None:
+    """Polls beyond the budget wait for the end of the next night."""
+    scheduler = PollScheduler(daily_budget=2)
+    now = _local(12)
+    scheduler.record_poll(now)
+    scheduler.record_poll(now)
+
+    assert now + scheduler.next_interval(
+        now, streak_today=False
+    ) == _local(6, day=11)
+
+
+def test_default_interval_during_the_day() -> None:
+    """Nothing expected, the default interval applies."""
+    scheduler = PollScheduler()
+
+    assert scheduler.next_interval(
+        _local(12), streak_today=False
+    ) == DEFAULT_INTERVAL
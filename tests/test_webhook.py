@@ -0,0 +1,118 @@
+"""Tests for the webhook receiving pushed profiles."""
+import asyncio
+import json
+from http import HTTPStatus
+from unittest.mock import MagicMock
+
+import pytest
+from aiohttp import hdrs, web
+from aiohttp.streams import StreamReader
+from aiohttp.test_utils import make_mocked_request
+from homeassistant.components import webhook
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+from custom_components.duolingo.dto import UserDto, UserIdentifiersDto
+from custom_components.duolingo.webhook import async_set_webhook
+
+WEBHOOK_ID = "duolingo_test"
+URL = f"/api/webhook/{WEBHOOK_ID}"
+
+USER = UserDto(
+    id=1,
+    name="Anna",
+    username="anna",
+    total_xp=1000,
+    courses_xp={},
+    streak_today=False,
+    streak_length=3,
+)
+
+
+def _request(body: bytes) -> web.Request:
+    """Return a POST request of the webhook carrying body."""
+    payload = StreamReader(MagicMock(), 2**16, loop=asyncio.get_running_loop())
+    payload.feed_data(body)
+    payload.feed_eof()
+    return make_mocked_request(
+        hdrs.METH_POST,
+        URL,
+        headers={hdrs.CONTENT_TYPE: "application/json"},
+        payload=payload,
+    )
+
+
+async def _async_post(hass: HomeAssistant, body: bytes) -> web.Response:
+    """Pass a request to the webhook as the HTTP view of Home Assistant."""
+    return await webhook.async_handle_webhook(hass, WEBHOOK_ID, _request(body))
+
+
+@pytest.fixture
+async def coordinator(hass: HomeAssistant) -> MagicMock:
+    """Return a stand-in coordinator receiving the pushes of a webhook."""
+    coordinator = MagicMock(
+        identifiers=UserIdentifiersDto(1, "Anna", "anna"),
+        user=USER,
+        webhook_id=None,
+    )
+    assert await async_setup_component(hass, "webhook", {})
+    async_set_webhook(hass, "Anna", WEBHOOK_ID, coordinator)
+    return coordinator
+
+
+async def test_push_applied(
+        hass: HomeAssistant,
+        coordinator: MagicMock,
+) -> None:
+    """A valid push of the observed user is passed to the hub."""
+    response = await _async_post(
+        hass, json.dumps({"id": 1, "xpGained": 10}).encode()
+    )
+
+    assert response.status == HTTPStatus.OK
+    user = coordinator.hub.async_push_user.call_args.args[0]
+    assert user.total_xp == USER.total_xp + 10
+
+
+@pytest.mark.parametrize(
+    ("body", "message"),
+    [
+        # Invalid JSON
+        (b'{"id": 1', "Invalid profile"),
+        # Not an object
+        (b"[1]", "Invalid profile"),
+        # Missing id
+        (b'{"totalXp": 10}', "Invalid profile"),
+        # Negative XP
+        (b'{"id": 1, "xpGained": -5}', "Invalid profile"),
+        # Another user id
+        (b'{"id": 2, "totalXp": 10}', "Profile of another user"),
+        # Another username
+        (b'{"id": 1, "username": "bob"}', "Profile of another user"),
+    ],
+)
+async def test_push_rejected(
+        hass: HomeAssistant,
+        coordinator: MagicMock,
+        body: bytes,
+        message: str,
+) -> None:
+    """Invalid pushes and pushes of other users are rejected."""
+    response = await _async_post(hass, body)
+
+    assert response.status == HTTPStatus.BAD_REQUEST
+    assert response.text.startswith(message)
+    coordinator.hub.async_push_user.assert_not_called()
+
+
+async def test_unregistered_webhook(
+        hass: HomeAssistant,
+        coordinator: MagicMock,
+) -> None:
+    """Pushes are no longer accepted once the webhook is unregistered."""
+    async_set_webhook(hass, "Anna", None, coordinator)
+
+    await _async_post(hass, json.dumps({"id": 1, "xpGained": 10}).encode())
+
+    assert coordinator.webhook_id is None
+    coordinator.hub.async_push_user.assert_not_called()